@@ -10,15 +10,22 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 
-print("="*60)
-print("📊 ANALISADOR DE LEADS META ADS")
-print("="*60)
+from cache_dados import CacheDados
+from instrumentacao import instrumentacao, instrumentado
+from janelas import MotorJanelas
+from previsao import HISTORICO_PADRAO, HORIZONTE_PADRAO, prever_campanhas
 
 class AnalisadorMetaAds:
-    def __init__(self, arquivo_csv=None):
+    def __init__(self, arquivo_csv=None, usar_cache=True, armazem=None, sessao=None):
         self.arquivo_csv = arquivo_csv
         self.dados = None
+        self.cache = CacheDados() if usar_cache else None
+        # ArmazemSQLite opcional: as janelas de calcular_metricas viram consultas SQL
+        self.armazem = armazem
+        # SessaoAnalise de um AnalisadorMetaProfissional: reaproveita dados, janelas e previsão dele
+        self.sessao = sessao
 
+    @instrumentado('meta_ads.carregar_dados')
     def carregar_dados(self):
         """Carrega dados do CSV do META Ads"""
         print("\n1️⃣ CARREGANDO DADOS...")
@@ -31,12 +38,34 @@ class AnalisadorMetaAds:
                 return False
 
             self.arquivo_csv = arquivos_csv[0]
+            if len(arquivos_csv) > 1:
+                print(f"⚠️  {len(arquivos_csv)} arquivos CSV na pasta, usando {self.arquivo_csv}")
+                print("   Para analisar todos: python lote.py")
 
         print(f"✅ Arquivo: {self.arquivo_csv}")
 
+        if self.sessao is not None and self._dados_da_sessao():
+            self.dados = self.sessao.analisador.dados
+            print(f"♻️  Dados reaproveitados da sessão: {len(self.dados)} linhas")
+            return True
+
+        if self.armazem is not None and self.armazem.ja_absorvido(self.arquivo_csv):
+            self.dados = self.armazem.por_dia()
+            print(f"♻️  Arquivo já está no banco: {len(self.dados)} dias")
+            return True
+
+        if self.cache:
+            em_cache = self.cache.carregar(self.arquivo_csv, 'meta_ads')
+            if em_cache is not None:
+                self.dados = em_cache
+                print(f"⚡ Linhas carregadas do cache: {len(self.dados)}")
+                return True
+
         try:
             # Ler o CSV
-            self.dados = pd.read_csv(self.arquivo_csv)
+            with instrumentacao.etapa('meta_ads.read_csv') as etapa:
+                self.dados = pd.read_csv(self.arquivo_csv)
+                etapa.linhas = len(self.dados)
             print(f"✅ Linhas carregadas: {len(self.dados)}")
 
             # Mostrar colunas disponíveis
@@ -66,15 +95,26 @@ class AnalisadorMetaAds:
                 if col_antiga in self.dados.columns:
                     self.dados = self.dados.rename(columns={col_antiga: col_nova})
 
-            # Converter Data para datetime
-            if 'Data' in self.dados.columns:
-                self.dados['Data'] = pd.to_datetime(self.dados['Data'])
+            with instrumentacao.etapa('meta_ads.converter_tipos', linhas=len(self.dados)):
+                # Converter Data para datetime
+                if 'Data' in self.dados.columns:
+                    self.dados['Data'] = pd.to_datetime(self.dados['Data'])
+
+                # Garantir que colunas numéricas sejam números
+                colunas_numericas = ['Impressoes', 'Cliques', 'Gasto', 'Leads']
+                for col in colunas_numericas:
+                    if col in self.dados.columns:
+                        self.dados[col] = pd.to_numeric(self.dados[col], errors='coerce').fillna(0)
 
-            # Garantir que colunas numéricas sejam números
-            colunas_numericas = ['Impressoes', 'Cliques', 'Gasto', 'Leads']
-            for col in colunas_numericas:
-                if col in self.dados.columns:
-                    self.dados[col] = pd.to_numeric(self.dados[col], errors='coerce').fillna(0)
+            if self.cache:
+                try:
+                    self.cache.salvar(self.arquivo_csv, self.dados, 'meta_ads')
+                except Exception as e:
+                    print(f"⚠️  Cache não atualizado: {e}")
+
+            if self.armazem is not None:
+                linhas = self.armazem.absorver(self.dados, origem=self.arquivo_csv)
+                print(f"🗄️  Banco atualizado: {linhas} linhas Data x Campanha")
 
             return True
 
@@ -82,6 +122,13 @@ class AnalisadorMetaAds:
             print(f"❌ Erro ao carregar dados: {e}")
             return False
 
+    def _dados_da_sessao(self):
+        """True se a sessão já tem carregado o mesmo arquivo"""
+        profissional = self.sessao.analisador
+        return (profissional.dados is not None and profissional.arquivo_csv is not None
+                and os.path.abspath(profissional.arquivo_csv) == os.path.abspath(self.arquivo_csv))
+
+    @instrumentado('meta_ads.calcular_metricas')
     def calcular_metricas(self):
         """Calcula todas as métricas importantes"""
         if self.dados is None or self.dados.empty:
@@ -93,43 +140,41 @@ class AnalisadorMetaAds:
         hoje = datetime.now().date()
         ontem = hoje - timedelta(days=1)
 
-        # Converter datas para comparar
-        if 'Data' in self.dados.columns:
-            self.dados['Data_date'] = pd.to_datetime(self.dados['Data']).dt.date
-
-        # DADOS DE HOJE (se existir na planilha)
-        dados_hoje = self.dados[self.dados['Data_date'] == hoje] if 'Data_date' in self.dados.columns else pd.DataFrame()
-
-        # DADOS DE ONTEM
-        dados_ontem = self.dados[self.dados['Data_date'] == ontem] if 'Data_date' in self.dados.columns else self.dados.tail(1)
-
-        # ÚLTIMOS 7 DIAS
-        sete_dias_atras = hoje - timedelta(days=7)
-        if 'Data_date' in self.dados.columns:
-            dados_7dias = self.dados[self.dados['Data_date'] >= sete_dias_atras]
-        else:
-            dados_7dias = self.dados.tail(7)
-
-        # ESTE MÊS (desde o dia 1)
-        inicio_mes = hoje.replace(day=1)
-        if 'Data_date' in self.dados.columns:
-            dados_mes = self.dados[self.dados['Data_date'] >= inicio_mes]
-        else:
-            dados_mes = self.dados
-
         # CALCULAR TOTAIS
         def calcular_totais(df):
             return {
                 'Gasto': df['Gasto'].sum() if 'Gasto' in df.columns else 0,
                 'Leads': df['Leads'].sum() if 'Leads' in df.columns else 0,
                 'Cliques': df['Cliques'].sum() if 'Cliques' in df.columns else 0,
-                'Impressoes': df['Impressoes'].sum() if 'Impressoes' in df.columns else 0
+                'Impressoes': df['Impressoes'].sum() if 'Impressoes' in df.columns else 0,
+                'linhas': len(df),
+                'dias': len(df)
             }
 
-        totais_hoje = calcular_totais(dados_hoje)
-        totais_ontem = calcular_totais(dados_ontem)
-        totais_7dias = calcular_totais(dados_7dias)
-        totais_mes = calcular_totais(dados_mes)
+        sete_dias_atras = hoje - timedelta(days=7)
+        inicio_mes = hoje.replace(day=1)
+
+        if self.armazem is not None or 'Data' in self.dados.columns:
+            # Todas as janelas saem das mesmas somas acumuladas (ou do SQLite), sem máscaras
+            if self.sessao is not None and self.dados is self.sessao.analisador.dados:
+                motor = self.sessao.analisador.motor_janelas()
+            else:
+                motor = self.armazem.janelas() if self.armazem is not None else MotorJanelas(self.dados)
+            janelas = motor.consultar({
+                'hoje': (hoje, hoje),
+                'ontem': (ontem, ontem),
+                '7_dias': (sete_dias_atras, None),
+                'mes': (inicio_mes, None),
+            })
+            totais_hoje = janelas['hoje']
+            totais_ontem = janelas['ontem']
+            totais_7dias = janelas['7_dias']
+            totais_mes = janelas['mes']
+        else:
+            totais_hoje = calcular_totais(pd.DataFrame())
+            totais_ontem = calcular_totais(self.dados.tail(1))
+            totais_7dias = calcular_totais(self.dados.tail(7))
+            totais_mes = calcular_totais(self.dados)
 
         # CALCULAR MÉTRICAS
         def calcular_cac(gasto, leads):
@@ -161,13 +206,13 @@ class AnalisadorMetaAds:
                 'cac': calcular_cac(totais_7dias['Gasto'], totais_7dias['Leads']),
                 'ctr': calcular_ctr(totais_7dias['Cliques'], totais_7dias['Impressoes']),
                 'taxa_conversao': calcular_taxa_conversao(totais_7dias['Leads'], totais_7dias['Cliques']),
-                'dias': len(dados_7dias)
+                'dias': totais_7dias['dias']
             },
             'mes': {
                 'gasto': totais_mes['Gasto'],
                 'leads': totais_mes['Leads'],
                 'cac': calcular_cac(totais_mes['Gasto'], totais_mes['Leads']),
-                'dias': len(dados_mes)
+                'dias': totais_mes['dias']
             }
         }
 
@@ -194,17 +239,24 @@ class AnalisadorMetaAds:
             'leads': metricas['mes']['leads'] / metricas['mes']['dias'] if metricas['mes']['dias'] > 0 else 0
         }
 
-        # Previsão do mês (baseado na média)
-        dias_no_mes = 30
-        metricas['previsao_mes'] = {
-            'leads': metricas['mes']['media_diaria']['leads'] * dias_no_mes,
-            'gasto': metricas['mes']['media_diaria']['gasto'] * dias_no_mes,
-            'cac': metricas['mes']['cac']
-        }
+        # Previsão dos próximos 30 dias (Holt-Winters por campanha, com intervalo)
+        if self.sessao is not None and self.dados is self.sessao.analisador.dados:
+            previsao = self.sessao.analisador.previsao(HORIZONTE_PADRAO)
+        elif self.armazem is not None:
+            ultima = self.armazem.ultima_data()
+            historico = self.armazem.dados(inicio=ultima - timedelta(days=HISTORICO_PADRAO - 1) if ultima is not None else None)
+            previsao = prever_campanhas(historico, HORIZONTE_PADRAO)
+        else:
+            previsao = prever_campanhas(self.dados, HORIZONTE_PADRAO) if 'Data' in self.dados.columns else None
+        if previsao:
+            metricas['previsao_mes'] = dict(previsao['total'], por_campanha=previsao['campanhas'])
+        else:
+            metricas['previsao_mes'] = {'leads': 0, 'gasto': 0, 'cac': 0}
 
         print("✅ Métricas calculadas!")
         return metricas
 
+    @instrumentado('meta_ads.gerar_relatorio')
     def gerar_relatorio(self, metricas):
         """Gera relatório formatado"""
         print("\n" + "="*60)
@@ -221,40 +273,38 @@ class AnalisadorMetaAds:
         print(f"   • CAC: R$ {metricas['hoje']['cac']:,.2f}")
         print(f"   • CTR: {metricas['hoje']['ctr']:.2f}%")
         print(f"   • Conversão: {metricas['hoje']['taxa_conversao']:.2f}%")
-#!/usr/bin/env python3
-"""
-ANALISADOR DE LEADS META ADS - PORTUGUÊS
-Versão SIMPLIFICADA para teste
-"""
 
-print("="*60)
-print("📊 ANALISADOR DE LEADS META ADS")
-print("="*60)
+# ================= TESTE RÁPIDO =================
+def teste_rapido():
+    """Versão SIMPLIFICADA para teste: confere pandas e lê o primeiro CSV da pasta"""
+    print("="*60)
+    print("📊 ANALISADOR DE LEADS META ADS")
+    print("="*60)
 
-print("\n🧪 TESTANDO SE TUDO FUNCIONA...")
+    print("\n🧪 TESTANDO SE TUDO FUNCIONA...")
 
-# Tentar importar pandas
-try:
-    import pandas as pd
-    print("✅ Pandas importado com sucesso!")
-except ImportError:
-    print("❌ Pandas não instalado!")
-    print("💡 Execute: pip install pandas")
-    exit()
+    # Tentar importar pandas
+    try:
+        import pandas as pd
+        print("✅ Pandas importado com sucesso!")
+    except ImportError:
+        print("❌ Pandas não instalado!")
+        print("💡 Execute: pip install pandas")
+        return
 
-print("\n📁 BUSCANDO ARQUIVOS CSV...")
+    print("\n📁 BUSCANDO ARQUIVOS CSV...")
 
-import os
+    import os
 
-# Procurar arquivos CSV
-arquivos_csv = [f for f in os.listdir('.') if f.endswith('.csv')]
+    # Procurar arquivos CSV
+    arquivos_csv = [f for f in os.listdir('.') if f.endswith('.csv')]
 
-if not arquivos_csv:
-    print("❌ Nenhum arquivo CSV encontrado!")
-    print("💡 Criando arquivo de teste...")
+    if not arquivos_csv:
+        print("❌ Nenhum arquivo CSV encontrado!")
+        print("💡 Criando arquivo de teste...")
 
-    # Criar dados de exemplo
-    dados_exemplo = """Data,Campanha,Impressoes,Cliques,Gasto,Leads
+        # Criar dados de exemplo
+        dados_exemplo = """Data,Campanha,Impressoes,Cliques,Gasto,Leads
 2024-12-01,Campanha Educação,10000,500,250.00,25
 2024-12-02,Campanha Educação,12000,600,300.00,30
 2024-12-03,Campanha Educação,11000,550,275.00,28
@@ -262,57 +312,60 @@ if not arquivos_csv:
 2024-12-05,Campanha Educação,14000,700,350.00,35
 2024-12-06,Campanha Educação,15000,750,375.00,38"""
 
-    with open('dados_teste.csv', 'w') as f:
-        f.write(dados_exemplo)
-
-    print("✅ Arquivo 'dados_teste.csv' criado!")
-    arquivo_csv = 'dados_teste.csv'
-else:
-    arquivo_csv = arquivos_csv[0]
-    print(f"✅ Arquivo encontrado: {arquivo_csv}")
-
-# Ler o CSV
-print(f"\n📊 LENDO ARQUIVO: {arquivo_csv}")
-try:
-    df = pd.read_csv(arquivo_csv)
-    print(f"✅ Dados carregados: {len(df)} linhas")
-    print(f"📋 Colunas: {list(df.columns)}")
-
-    # Mostrar primeiras linhas
-    print("\n📄 PRIMEIRAS LINHAS:")
-    print(df.head())
-
-    # Calcular totais básicos
-    if 'Gasto' in df.columns:
-        gasto_total = df['Gasto'].sum()
-        print(f"\n💰 GASTO TOTAL: R$ {gasto_total:,.2f}")
-
-    if 'Leads' in df.columns:
-        leads_total = df['Leads'].sum()
-        print(f"👥 LEADS TOTAL: {leads_total}")
-
-    if 'Gasto' in df.columns and 'Leads' in df.columns:
-        cac = gasto_total / leads_total if leads_total > 0 else 0
-        print(f"🎯 CAC (Custo por Lead): R$ {cac:,.2f}")
-
-    if 'Cliques' in df.columns and 'Impressoes' in df.columns:
-        ctr = (df['Cliques'].sum() / df['Impressoes'].sum() * 100) if df['Impressoes'].sum() > 0 else 0
-        print(f"🖱️  CTR: {ctr:.2f}%")
-
-    # Salvar relatório simples
-    print("\n💾 SALVANDO RELATÓRIO...")
-    df.to_csv('relatorio_simples.csv', index=False, encoding='utf-8-sig')
-    print("✅ Relatório salvo: 'relatorio_simples.csv'")
-
-except Exception as e:
-    print(f"❌ Erro ao processar CSV: {e}")
-
-print("\n" + "="*60)
-print("✅ TESTE CONCLUÍDO COM SUCESSO!")
-print("="*60)
-
-print("\n🎯 PRÓXIMOS PASSOS:")
-print("1. Exporte SEUS dados do META Ads como CSV")
-print("2. Substitua 'dados_teste.csv' pelo seu arquivo")
-print("3. Execute: python3 analisador_meta.py")
-print("\n📞 Dúvidas? Irving - ruas.dev.br")
+        with open('dados_teste.csv', 'w') as f:
+            f.write(dados_exemplo)
+
+        print("✅ Arquivo 'dados_teste.csv' criado!")
+        arquivo_csv = 'dados_teste.csv'
+    else:
+        arquivo_csv = arquivos_csv[0]
+        print(f"✅ Arquivo encontrado: {arquivo_csv}")
+
+    # Ler o CSV
+    print(f"\n📊 LENDO ARQUIVO: {arquivo_csv}")
+    try:
+        df = pd.read_csv(arquivo_csv)
+        print(f"✅ Dados carregados: {len(df)} linhas")
+        print(f"📋 Colunas: {list(df.columns)}")
+
+        # Mostrar primeiras linhas
+        print("\n📄 PRIMEIRAS LINHAS:")
+        print(df.head())
+
+        # Calcular totais básicos
+        if 'Gasto' in df.columns:
+            gasto_total = df['Gasto'].sum()
+            print(f"\n💰 GASTO TOTAL: R$ {gasto_total:,.2f}")
+
+        if 'Leads' in df.columns:
+            leads_total = df['Leads'].sum()
+            print(f"👥 LEADS TOTAL: {leads_total}")
+
+        if 'Gasto' in df.columns and 'Leads' in df.columns:
+            cac = gasto_total / leads_total if leads_total > 0 else 0
+            print(f"🎯 CAC (Custo por Lead): R$ {cac:,.2f}")
+
+        if 'Cliques' in df.columns and 'Impressoes' in df.columns:
+            ctr = (df['Cliques'].sum() / df['Impressoes'].sum() * 100) if df['Impressoes'].sum() > 0 else 0
+            print(f"🖱️  CTR: {ctr:.2f}%")
+
+        # Salvar relatório simples
+        print("\n💾 SALVANDO RELATÓRIO...")
+        df.to_csv('relatorio_simples.csv', index=False, encoding='utf-8-sig')
+        print("✅ Relatório salvo: 'relatorio_simples.csv'")
+
+    except Exception as e:
+        print(f"❌ Erro ao processar CSV: {e}")
+
+    print("\n" + "="*60)
+    print("✅ TESTE CONCLUÍDO COM SUCESSO!")
+    print("="*60)
+
+    print("\n🎯 PRÓXIMOS PASSOS:")
+    print("1. Exporte SEUS dados do META Ads como CSV")
+    print("2. Substitua 'dados_teste.csv' pelo seu arquivo")
+    print("3. Execute: python3 analisador_meta.py")
+    print("\n📞 Dúvidas? Irving - ruas.dev.br")
+
+if __name__ == "__main__":
+    teste_rapido()
@@ -8,19 +8,177 @@ Versão 2.0: Análise completa com recomendações automáticas
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
+import re
+import shutil
+from urllib.parse import quote
 
-print("="*70)
-print("📊 ANALISADOR PROFISSIONAL META ADS")
-print("="*70)
+from anomalias import detectar_anomalias
+from cache_dados import CacheDados
+from cubo_rollup import CuboRollup
+from dimensoes import DIMENSOES, dimensoes_presentes, somar_por
+from exportar_site import DIAS_SERIE, PASTA_SITE_PADRAO, exportar_site
+from instrumentacao import instrumentacao, instrumentado
+from janelas import MotorJanelas
+from leads_crm import cruzar_leads
+from previsao import HISTORICO_PADRAO, HORIZONTE_PADRAO, prever_campanhas
+from ranking import RankingCampanhas
+from regras import acoes_por_campanha, carregar_regras
+from renderizacao import PASTA_RELATORIOS_PADRAO, escrita_atomica, metricas_chave, montar_contexto, renderizar_campanhas
+from sessao import SessaoAnalise, memorizado
+from simulador_orcamento import (CANDIDATOS_PADRAO, DIAS_HISTORICO, LIMITE_AUMENTO, LIMITE_REDUCAO,
+                                  SORTEIOS_PADRAO, simular_campanhas)
+from tendencias import calcular_tendencias, tendencia_global
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Colunas somáveis usadas nos agregados por Data x Campanha
+COLUNAS_CHAVE = ['Data', 'Campanha']
+COLUNAS_SOMA = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance']
+
+# Streaming: arquivos acima deste tamanho são lidos em blocos
+LIMITE_STREAMING_BYTES = 512 * 1024 * 1024
+TAMANHO_CHUNK_PADRAO = 250_000
+CHUNKS_POR_CONSOLIDACAO = 8
+
+COLUNAS_PADRONIZADAS = ['Data', 'Campanha', 'Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance', 'CPM', 'CPC', *DIMENSOES]
+
+# Quebras das exportações detalhadas: padrão do cabeçalho (minúsculo) -> dimensão.
+# Testadas antes das métricas ("Impression device" não é Impressoes) e na
+# ordem da lista ("Platform position" é Posicionamento, não Plataforma).
+# Conjunto/anúncio só pelo nome: "Orçamento do conjunto" não é a quebra.
+PADROES_DIMENSOES = [
+    (re.compile(r'\bad ?set name\b|^ad ?set$|nome do conjunto|^conjunto'), 'Conjunto'),
+    (re.compile(r'\bad name\b|^ad$|nome do an[úu]ncio|^an[úu]ncio$'), 'Anuncio'),
+    (re.compile(r'\bage\b|idade'), 'Idade'),
+    (re.compile(r'gender|g[êe]nero'), 'Genero'),
+    (re.compile(r'device|dispositivo'), 'Dispositivo'),
+    (re.compile(r'placement|position|posicionamento'), 'Posicionamento'),
+    (re.compile(r'platform|plataforma'), 'Plataforma'),
+    (re.compile(r'region|regi[ãa]o'), 'Regiao'),
+    (re.compile(r'country|\bpa[íi]s\b'), 'Pais'),
+]
+
+# Leitura tipada: contagens viram inteiros compactos e CPM/CPC float32
+COLUNAS_NUMERICAS = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance', 'CPM', 'CPC']
+COLUNAS_CONTAGEM = ['Leads', 'Cliques', 'Impressoes', 'Alcance']
+COLUNAS_FLOAT32 = ['CPM', 'CPC']
+FORMATOS_DATA = ['%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y', '%Y/%m/%d']
+LINHAS_AMOSTRA_DATA = 200
+# Marcadores de vazio das exportações além dos padrões do pandas ('', 'N/A', 'null'...)
+VALORES_AUSENTES = ['-', '--']
+
+# Exportação do relatório detalhado: formato -> extensão, e compressão dos CSVs
+EXTENSOES_EXPORTACAO = {
+    'csv': '.csv',
+    'csv.gz': '.csv.gz',
+    'csv.zst': '.csv.zst',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+COMPRESSAO_CSV = {'csv': None, 'csv.gz': 'gzip', 'csv.zst': 'zstd'}
+LINHAS_POR_BLOCO_EXPORTACAO = 500_000
+
+# Tendência: últimos N dias corridos vs os N dias anteriores
+JANELA_TENDENCIA = 3
+# Histórico passado pelo detector de anomalias e janela exibida no relatório
+HISTORICO_ANOMALIAS = 120
+DIAS_ANOMALIAS = 7
+
+
+@lru_cache(maxsize=128)
+def mapear_colunas(cabecalho):
+    """Mapeia um cabeçalho (tupla de nomes) para os nomes padronizados
+
+    O resultado é memorizado por assinatura de cabeçalho: exportações com o
+    mesmo layout (e os blocos de um mesmo arquivo) reaproveitam o mapeamento.
+    Não altere o dicionário retornado.
+    """
+    mapeamento = {}
+    
+    for col in cabecalho:
+        col_lower = str(col).lower()
+        
+        # Colunas que já vêm com o nome padronizado (ex.: "Cliques") são mantidas
+        if col in COLUNAS_PADRONIZADAS:
+            mapeamento[col] = col
+        elif 'date' in col_lower or 'data' in col_lower:
+            mapeamento[col] = 'Data'
+        elif 'camp' in col_lower:
+            mapeamento[col] = 'Campanha'
+        elif any(padrao.search(col_lower) for padrao, _ in PADROES_DIMENSOES):
+            mapeamento[col] = next(dim for padrao, dim in PADROES_DIMENSOES if padrao.search(col_lower))
+        elif 'spend' in col_lower or 'gasto' in col_lower or 'amount' in col_lower or 'custo' in col_lower:
+            mapeamento[col] = 'Gasto'
+        elif 'lead' in col_lower or 'result' in col_lower or 'convers' in col_lower:
+            mapeamento[col] = 'Leads'
+        elif 'click' in col_lower:
+            mapeamento[col] = 'Cliques'
+        elif 'impress' in col_lower:
+            mapeamento[col] = 'Impressoes'
+        elif 'reach' in col_lower or 'alcance' in col_lower:
+            mapeamento[col] = 'Alcance'
+        elif 'cpm' in col_lower:
+            mapeamento[col] = 'CPM'
+        elif 'cpc' in col_lower:
+            mapeamento[col] = 'CPC'
+    
+    return mapeamento
+
+def formato_exportacao(nome_arquivo):
+    """Formato de exportação pela extensão do arquivo (padrão: csv)"""
+    nome = nome_arquivo.lower()
+    if nome.endswith('.arrow'):
+        return 'feather'
+    for formato, extensao in sorted(EXTENSOES_EXPORTACAO.items(), key=lambda item: -len(item[1])):
+        if nome.endswith(extensao):
+            return formato
+    return 'csv'
+
+
+def remover_extensao(nome_arquivo):
+    """relatorio.csv.gz -> relatorio (também para .parquet, .feather, .arrow)"""
+    nome = nome_arquivo
+    for extensao in sorted(set(EXTENSOES_EXPORTACAO.values()) | {'.arrow'}, key=len, reverse=True):
+        if nome.lower().endswith(extensao):
+            return nome[:-len(extensao)]
+    return os.path.splitext(nome)[0]
+
+
+def trocar_pasta_particionada(nova, destino):
+    """Põe a pasta `nova` no lugar de `destino`, que só pode conter partições (chave=valor)"""
+    if os.path.exists(destino):
+        if not os.path.isdir(destino) or any('=' not in nome for nome in os.listdir(destino)):
+            raise ValueError(f"{destino} existe e não é uma exportação particionada; escolha outro nome")
+        antiga = destino + f'.{os.getpid()}.antiga'
+        os.replace(destino, antiga)
+        os.replace(nova, destino)
+        shutil.rmtree(antiga, ignore_errors=True)
+    else:
+        os.replace(nova, destino)
 
 class AnalisadorMetaProfissional:
-    def __init__(self):
+    def __init__(self, arquivo_csv=None, regras=None):
         self.dados = None
-        self.arquivo_csv = None
+        self.arquivo_csv = arquivo_csv
+        # Arquivo de regras de recomendação (None: $META_REGRAS ou regras_padrao.json)
+        self.regras = regras
+        self.linhas_lidas = 0
+        self.modo_agregado = False
+        self.formato_data = None
+        self.armazem = None
+        # Resultados derivados compartilhados por relatório, exportação e métricas
+        self.sessao = SessaoAnalise(self)
         
     def encontrar_arquivo_csv(self):
         """Encontra automaticamente arquivos CSV na pasta"""
+        if self.arquivo_csv and os.path.exists(self.arquivo_csv):
+            return self.arquivo_csv
+        
         arquivos_csv = [f for f in os.listdir('.') if f.endswith('.csv')]
         
         if not arquivos_csv:
@@ -36,10 +194,24 @@ class AnalisadorMetaProfissional:
             if nome in arquivos_csv:
                 return nome
         
+        if len(arquivos_csv) > 1:
+            print(f"⚠️  {len(arquivos_csv)} arquivos CSV na pasta, usando {arquivos_csv[0]}")
+            print("   Para analisar todos: python lote.py")
+        
         return arquivos_csv[0]
     
-    def carregar_dados(self):
-        """Carrega e prepara os dados"""
+    @instrumentado('profissional.carregar_dados')
+    def carregar_dados(self, streaming=None, tamanho_chunk=TAMANHO_CHUNK_PADRAO, usar_cache=True):
+        """Carrega e prepara os dados
+
+        Com streaming=True o CSV é lido em blocos de `tamanho_chunk` linhas e
+        cada bloco é consolidado por Data x Campanha, de modo que a memória
+        depende do tamanho do bloco e não do arquivo. Com streaming=None o
+        modo é escolhido pelo tamanho do arquivo (LIMITE_STREAMING_BYTES).
+
+        Com usar_cache=True o resultado preparado é guardado em CacheDados e
+        reaproveitado enquanto o conteúdo do arquivo não mudar.
+        """
         print("\n📥 CARREGANDO DADOS...")
         
         self.arquivo_csv = self.encontrar_arquivo_csv()
@@ -48,110 +220,446 @@ class AnalisadorMetaProfissional:
         
         print(f"✅ Arquivo: {self.arquivo_csv}")
         
+        if streaming is None:
+            streaming = os.path.getsize(self.arquivo_csv) > LIMITE_STREAMING_BYTES
+        
+        cache = CacheDados() if usar_cache else None
+        variante = 'agregado' if streaming else 'completo'
+        
+        if cache:
+            em_cache = cache.carregar(self.arquivo_csv, variante)
+            if em_cache is not None:
+                self.dados = em_cache
+                self.linhas_lidas = len(em_cache)
+                self.modo_agregado = streaming
+                print(f"⚡ {len(self.dados)} linhas carregadas do cache")
+                return True
+        
         try:
-            # Ler CSV
-            self.dados = pd.read_csv(self.arquivo_csv)
-            print(f"✅ {len(self.dados)} linhas carregadas")
-            
-            # Padronizar nomes de colunas
-            self._padronizar_colunas()
-            
-            # Converter tipos de dados
-            self._converter_tipos()
-            
-            # Adicionar colunas calculadas
-            self._adicionar_colunas_calculadas()
-            
-            return True
-            
+            if streaming:
+                carregado = self._carregar_em_chunks(tamanho_chunk)
+            else:
+                carregado = self._carregar_completo()
         except Exception as e:
             print(f"❌ Erro ao carregar dados: {e}")
             return False
+        
+        if carregado and cache:
+            try:
+                cache.salvar(self.arquivo_csv, self.dados, variante)
+            except Exception as e:
+                print(f"⚠️  Cache não atualizado: {e}")
+        
+        return carregado
     
-    def _padronizar_colunas(self):
-        """Padroniza nomes de colunas em português"""
-        mapeamento = {}
+    @instrumentado('profissional.carregar_com_armazem')
+    def carregar_com_armazem(self, armazem):
+        """Absorve a exportação no SQLite (se for nova); janelas e rankings viram consultas SQL
+        
+        Só os totais diários ficam em self.dados: o histórico Data x Campanha
+        permanece no banco.
+        """
+        self.arquivo_csv = self.encontrar_arquivo_csv()
+        if not self.arquivo_csv:
+            return False
+        
+        if armazem.ja_absorvido(self.arquivo_csv):
+            print(f"\n♻️  {self.arquivo_csv} já está no banco")
+        else:
+            if not self.carregar_dados():
+                return False
+            linhas = armazem.absorver(self.dados, origem=self.arquivo_csv)
+            print(f"🗄️  Banco atualizado: {linhas} linhas Data x Campanha")
+        
+        self.armazem = armazem
+        self.dados = self._adicionar_colunas_calculadas(armazem.por_dia())
+        self.modo_agregado = True
+        print(f"✅ {len(self.dados)} dias no banco ({armazem.caminho})")
+        return not self.dados.empty
+    
+    @instrumentado('profissional.carregar_com_cubo')
+    def carregar_com_cubo(self, cubo):
+        """Absorve a exportação no cubo (se for nova) e analisa o histórico do cubo"""
+        self.arquivo_csv = self.encontrar_arquivo_csv()
+        if not self.arquivo_csv:
+            return False
+        
+        if cubo.ja_absorvido(self.arquivo_csv):
+            print(f"\n♻️  {self.arquivo_csv} já está no cubo")
+        else:
+            if not self.carregar_dados():
+                return False
+            linhas = cubo.absorver(self.dados, origem=self.arquivo_csv)
+            print(f"🧊 Cubo atualizado: {linhas} linhas Data x Campanha")
         
-        for col in self.dados.columns:
-            col_lower = str(col).lower()
+        self.dados = self._adicionar_colunas_calculadas(cubo.dados())
+        self.modo_agregado = True
+        print(f"✅ {len(self.dados)} linhas carregadas do cubo ({cubo.diretorio})")
+        return not self.dados.empty
+    
+    def _carregar_completo(self):
+        """Lê o CSV inteiro e prepara o DataFrame linha a linha"""
+        # Ler CSV só com as colunas usadas, já renomeadas
+        leitura, renomear = self._esquema_leitura()
+        with instrumentacao.etapa('profissional.read_csv') as etapa:
+            self.dados = pd.read_csv(self.arquivo_csv, **leitura).rename(columns=renomear)
+            etapa.linhas = len(self.dados)
+        self.linhas_lidas = len(self.dados)
+        print(f"✅ {len(self.dados)} linhas carregadas")
+        print(f"📋 Colunas padronizadas: {list(self.dados.columns)}")
+        
+        # Converter tipos de dados
+        self.dados = self._converter_tipos(self.dados)
+        
+        # Adicionar colunas calculadas
+        self.dados = self._adicionar_colunas_calculadas(self.dados)
+        
+        return True
+    
+    @instrumentado('profissional.carregar_em_chunks', linhas=lambda self, _: self.linhas_lidas)
+    def _carregar_em_chunks(self, tamanho_chunk):
+        """Lê o CSV em blocos e mantém apenas os agregados Data x Campanha"""
+        print(f"🌊 Modo streaming: blocos de {tamanho_chunk:,} linhas")
+        
+        acumulado = None
+        pendentes = []
+        self.linhas_lidas = 0
+        
+        leitura, renomear = self._esquema_leitura()
+        for chunk in pd.read_csv(self.arquivo_csv, chunksize=tamanho_chunk, **leitura):
+            chunk = self._converter_tipos(chunk.rename(columns=renomear))
+            self.linhas_lidas += len(chunk)
+            pendentes.append(self._agregar_chunk(chunk))
             
-            if 'date' in col_lower or 'data' in col_lower:
-                mapeamento[col] = 'Data'
-            elif 'camp' in col_lower:
-                mapeamento[col] = 'Campanha'
-            elif 'spend' in col_lower or 'gasto' in col_lower or 'amount' in col_lower or 'custo' in col_lower:
-                mapeamento[col] = 'Gasto'
-            elif 'lead' in col_lower or 'result' in col_lower or 'convers' in col_lower:
-                mapeamento[col] = 'Leads'
-            elif 'click' in col_lower:
-                mapeamento[col] = 'Cliques'
-            elif 'impress' in col_lower:
-                mapeamento[col] = 'Impressoes'
-            elif 'reach' in col_lower or 'alcance' in col_lower:
-                mapeamento[col] = 'Alcance'
-            elif 'cpm' in col_lower:
-                mapeamento[col] = 'CPM'
-            elif 'cpc' in col_lower:
-                mapeamento[col] = 'CPC'
+            # Consolidar periodicamente para manter a memória limitada
+            if len(pendentes) >= CHUNKS_POR_CONSOLIDACAO:
+                acumulado = self._consolidar_agregados([acumulado] + pendentes)
+                pendentes = []
+        
+        acumulado = self._consolidar_agregados([acumulado] + pendentes)
+        if acumulado is None:
+            print("❌ Arquivo sem linhas de dados!")
+            return False
+        
+        self.dados = self._adicionar_colunas_calculadas(acumulado)
+        self.modo_agregado = True
+        print(f"✅ {self.linhas_lidas} linhas lidas → {len(self.dados)} linhas agregadas")
+        print(f"📋 Colunas padronizadas: {list(self.dados.columns)}")
+        return True
+    
+    def _agregar_chunk(self, chunk):
+        """Soma as métricas de um bloco por Data x Campanha (x quebras, se houver)"""
+        chaves = [c for c in COLUNAS_CHAVE if c in chunk.columns] + dimensoes_presentes(chunk)
+        metricas = [c for c in COLUNAS_SOMA if c in chunk.columns]
+        
+        if 'Data' in chaves:
+            chunk['Data'] = chunk['Data'].dt.normalize()
+        if 'Campanha' in chaves:
+            chunk['Campanha'] = chunk['Campanha'].astype('string').fillna('(sem nome)')
+        
+        return somar_por(chunk, chaves, metricas)
+    
+    def _consolidar_agregados(self, parciais):
+        """Funde agregados parciais em um único agregado"""
+        parciais = [p for p in parciais if p is not None and not p.empty]
+        if not parciais:
+            return None
+        if len(parciais) == 1:
+            return parciais[0]
+        
+        combinado = pd.concat(parciais, ignore_index=True)
+        # Categorias de cada bloco são diferentes: a união mantém as quebras categóricas
+        for dimensao in dimensoes_presentes(combinado):
+            combinado[dimensao] = pd.api.types.union_categoricals(
+                [p[dimensao] for p in parciais], sort_categories=True, ignore_order=True)
+        
+        chaves = [c for c in COLUNAS_CHAVE if c in combinado.columns] + dimensoes_presentes(combinado)
+        return somar_por(combinado, chaves, [c for c in combinado.columns if c not in chaves])
+    
+    @instrumentado('profissional.esquema_leitura', linhas=lambda self, _: None)
+    def _esquema_leitura(self):
+        """Lê só o cabeçalho e monta as opções do read_csv tipado
+
+        Retorna (opções do read_csv, renomeação para os nomes padronizados).
+        Só as colunas reconhecidas são lidas; Campanha e as quebras (Conjunto,
+        Idade, Genero...) viram categóricas. Se o
+        cabeçalho não tiver nenhuma coluna reconhecida, lê o arquivo inteiro.
+        """
+        cabecalho = tuple(pd.read_csv(self.arquivo_csv, nrows=0).columns)
+        mapeamento = mapear_colunas(cabecalho)
+        
+        # Primeira coluna de cada destino (ex.: "Data de início" e "Data de término")
+        renomear = {}
+        for original in cabecalho:
+            destino = mapeamento.get(original)
+            if destino and destino not in renomear.values():
+                renomear[original] = destino
+        
+        if not renomear:
+            return {}, {}
+        
+        leitura = {
+            'usecols': list(renomear),
+            'na_values': VALORES_AUSENTES,
+            'dtype': {orig: 'category' for orig, dest in renomear.items() if dest == 'Campanha' or dest in DIMENSOES},
+        }
+        
+        coluna_data = next((orig for orig, dest in renomear.items() if dest == 'Data'), None)
+        if coluna_data is not None:
+            self.formato_data = self._detectar_formato_data(coluna_data)
+        
+        return leitura, renomear
+    
+    def _detectar_formato_data(self, coluna):
+        """Descobre um formato explícito de data a partir de uma amostra"""
+        amostra = pd.read_csv(self.arquivo_csv, usecols=[coluna], nrows=LINHAS_AMOSTRA_DATA, dtype=str)[coluna].dropna()
+        if amostra.empty:
+            return None
+        
+        for formato in FORMATOS_DATA:
+            try:
+                pd.to_datetime(amostra, format=formato)
+                return formato
+            except (ValueError, TypeError):
+                continue
+        return None
+    
+    def _padronizar_colunas(self, dados):
+        """Padroniza nomes de colunas em português"""
+        mapeamento = mapear_colunas(tuple(dados.columns))
         
         if mapeamento:
-            self.dados = self.dados.rename(columns=mapeamento)
-            print(f"📋 Colunas padronizadas: {list(self.dados.columns)}")
+            dados = dados.rename(columns=mapeamento)
+        return dados
     
-    def _converter_tipos(self):
+    @instrumentado('profissional.converter_tipos', linhas=lambda self, dados: len(dados))
+    def _converter_tipos(self, dados):
         """Converte tipos de dados"""
-        # Converter Data para datetime
-        if 'Data' in self.dados.columns:
-            self.dados['Data'] = pd.to_datetime(self.dados['Data'], errors='coerce')
+        # Converter Data para datetime (formato explícito quando detectado)
+        if 'Data' in dados.columns:
+            dados['Data'] = pd.to_datetime(dados['Data'], format=self.formato_data, errors='coerce')
         
-        # Converter colunas numéricas
-        colunas_numericas = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance', 'CPM', 'CPC']
-        for col in colunas_numericas:
-            if col in self.dados.columns:
-                self.dados[col] = pd.to_numeric(self.dados[col], errors='coerce').fillna(0)
+        # Converter colunas numéricas (só as que vieram como texto passam pelo to_numeric)
+        for col in COLUNAS_NUMERICAS:
+            if col not in dados.columns:
+                continue
+            
+            serie = dados[col]
+            if not pd.api.types.is_numeric_dtype(serie):
+                serie = pd.to_numeric(serie, errors='coerce')
+            if serie.hasnans:
+                serie = serie.fillna(0)
+            
+            if col in COLUNAS_CONTAGEM:
+                if pd.api.types.is_integer_dtype(serie) or (serie % 1 == 0).all():
+                    serie = pd.to_numeric(serie, downcast='integer')
+            elif col in COLUNAS_FLOAT32:
+                serie = serie.astype('float32')
+            dados[col] = serie
+        return dados
     
-    def _adicionar_colunas_calculadas(self):
+    @instrumentado('profissional.colunas_calculadas', linhas=lambda self, dados: len(dados))
+    def _adicionar_colunas_calculadas(self, dados):
         """Adiciona colunas calculadas"""
-        if 'Gasto' in self.dados.columns and 'Leads' in self.dados.columns:
-            self.dados['CAC'] = np.where(
-                self.dados['Leads'] > 0,
-                self.dados['Gasto'] / self.dados['Leads'],
+        if 'Gasto' in dados.columns and 'Leads' in dados.columns:
+            dados['CAC'] = np.where(
+                dados['Leads'] > 0,
+                dados['Gasto'] / dados['Leads'],
                 0
             )
         
-        if 'Cliques' in self.dados.columns and 'Impressoes' in self.dados.columns:
-            self.dados['CTR'] = np.where(
-                self.dados['Impressoes'] > 0,
-                (self.dados['Cliques'] / self.dados['Impressoes']) * 100,
+        if 'Cliques' in dados.columns and 'Impressoes' in dados.columns:
+            dados['CTR'] = np.where(
+                dados['Impressoes'] > 0,
+                (dados['Cliques'] / dados['Impressoes']) * 100,
                 0
             )
         
-        if 'Cliques' in self.dados.columns and 'Leads' in self.dados.columns:
-            self.dados['Taxa_Conversao'] = np.where(
-                self.dados['Cliques'] > 0,
-                (self.dados['Leads'] / self.dados['Cliques']) * 100,
+        if 'Cliques' in dados.columns and 'Leads' in dados.columns:
+            dados['Taxa_Conversao'] = np.where(
+                dados['Cliques'] > 0,
+                (dados['Leads'] / dados['Cliques']) * 100,
                 0
             )
+        return dados
+    
+    @memorizado('motor_janelas')
+    def motor_janelas(self):
+        """Motor de janelas sobre self.dados (refeito só quando os dados mudam)"""
+        if self.armazem is not None:
+            return self.armazem.janelas()
+        return MotorJanelas(self.dados)
+    
+    @memorizado('ranking_campanhas')
+    def ranking_campanhas(self):
+        """RankingCampanhas dos dados (no armazém, o GROUP BY roda no SQLite)"""
+        if self.armazem is not None:
+            return self.armazem.ranking()
+        if 'Campanha' not in self.dados.columns:
+            return None
+        return RankingCampanhas().atualizar(self.dados)
+    
+    @memorizado('dados_recentes')
+    def dados_recentes(self, dias):
+        """Linhas Data x Campanha dos últimos `dias` dias dos dados
+        
+        Fora do armazém devolve self.dados inteiro (as tendências já recortam o
+        fim do histórico); no armazém, só esse trecho sai do banco.
+        """
+        if self.armazem is None:
+            return self.dados
+        ultima = self.armazem.ultima_data()
+        return self.armazem.dados(inicio=ultima - timedelta(days=dias - 1) if ultima is not None else None)
+    
+    @memorizado('tendencia_global')
+    def tendencia_global(self, janela=JANELA_TENDENCIA):
+        """Últimos `janela` dias vs anteriores, somando todas as campanhas"""
+        recentes = self.dados_recentes(2 * janela)
+        with instrumentacao.etapa('profissional.relatorio.tendencia_global', linhas=len(recentes)):
+            return tendencia_global(recentes, janela)
     
+    @memorizado('tendencias_campanha')
+    def tendencias_campanha(self, janela=JANELA_TENDENCIA):
+        """Mesma comparação para cada campanha (um DataFrame por campanha)"""
+        recentes = self.dados_recentes(2 * janela)
+        with instrumentacao.etapa('profissional.relatorio.tendencias_campanha', linhas=len(recentes)):
+            return calcular_tendencias(recentes, janela)
+    
+    @memorizado('previsao')
+    @instrumentado('profissional.previsao', linhas=lambda self, previsao: len(previsao['campanhas']) if previsao else 0)
+    def previsao(self, horizonte=HORIZONTE_PADRAO):
+        """Previsão Holt-Winters de Leads/Gasto/CAC por campanha e total para os próximos dias"""
+        if self.dados is None or 'Data' not in self.dados.columns:
+            return None
+        return prever_campanhas(self.dados_recentes(HISTORICO_PADRAO), horizonte)
+    
+    @memorizado('anomalias')
+    @instrumentado('profissional.anomalias', linhas=lambda self, tabela: len(tabela))
+    def anomalias(self, dias=DIAS_ANOMALIAS, so_pioras=True):
+        """Dias anômalos de CAC/CTR/Taxa_Conversao por campanha nos últimos `dias` dias"""
+        if self.dados is None or 'Data' not in self.dados.columns:
+            return None
+        historico = self.dados_recentes(HISTORICO_ANOMALIAS)
+        detector = detectar_anomalias(historico)
+        ultima = pd.to_datetime(historico['Data']).max()
+        desde = ultima.normalize() - timedelta(days=dias - 1) if pd.notna(ultima) else None
+        return detector.anomalias(desde=desde, so_pioras=so_pioras)
+    
+    @memorizado('simulacao_orcamento')
+    @instrumentado('profissional.simulacao_orcamento', linhas=lambda self, simulacao: simulacao['candidatos'] * simulacao['sorteios'] if simulacao else 0)
+    def simulacao_orcamento(self, orcamento=None, dias=DIAS_HISTORICO, candidatos=CANDIDATOS_PADRAO,
+                            sorteios=SORTEIOS_PADRAO, limite_reducao=LIMITE_REDUCAO, limite_aumento=LIMITE_AUMENTO):
+        """Monte Carlo da melhor divisão do `orcamento` diário entre as campanhas (ver simulador_orcamento.py)"""
+        if self.dados is None or 'Data' not in self.dados.columns:
+            return None
+        return simular_campanhas(self.dados_recentes(dias), orcamento, dias, candidatos=candidatos, sorteios=sorteios,
+                                 limite_reducao=limite_reducao, limite_aumento=limite_aumento)
+    
+    def dimensoes(self):
+        """Quebras presentes nos dados (Conjunto, Anuncio, Idade, Genero...)"""
+        return dimensoes_presentes(self.dados) if self.dados is not None else []
+    
+    @memorizado('quebra')
+    @instrumentado('profissional.quebra', linhas=lambda self, tabela: len(tabela) if tabela is not None else 0)
+    def quebra(self, *dimensoes, dias=None):
+        """Drill-down: métricas por combinação das `dimensoes` (só as que ocorrem), maior gasto primeiro
+        
+        Aceita quebras e Campanha/Data, ex.: quebra('Campanha', 'Idade',
+        'Genero'). Com `dias`, só os últimos `dias` dias dos dados.
+        """
+        if self.dados is None or not dimensoes:
+            return None
+        ausentes = [d for d in dimensoes if d not in self.dados.columns]
+        if ausentes:
+            raise ValueError(f"dimensões ausentes nos dados: {', '.join(ausentes)} "
+                             f"(disponíveis: {', '.join(self.dimensoes()) or 'nenhuma'})")
+        
+        dados = self.dados
+        if dias and 'Data' in dados.columns:
+            limite = dados['Data'].max().normalize() - timedelta(days=dias - 1)
+            dados = dados[dados['Data'] >= limite]
+        
+        metricas = [c for c in COLUNAS_SOMA if c in dados.columns]
+        tabela = self._adicionar_colunas_calculadas(somar_por(dados, list(dimensoes), metricas))
+        if 'Gasto' in tabela.columns:
+            tabela = tabela.sort_values('Gasto', ascending=False, kind='stable', ignore_index=True)
+        return tabela
+    
+    @instrumentado('profissional.cruzar_leads', linhas=lambda self, cruzamento: cruzamento.estatisticas['linhas'] if cruzamento else 0)
+    def cruzar_leads(self, caminho_leads, **opcoes):
+        """CAC real: leads do CRM em `caminho_leads`, deduplicados, contra o gasto Data x Campanha
+        
+        Opções de leads_crm.cruzar_leads (modo='bloom', capacidade, taxa_erro,
+        por_data). Não é memorizado: o arquivo de leads é lido a cada chamada.
+        """
+        if self.dados is None:
+            return None
+        gasto = self.armazem.dados() if self.armazem is not None else self.dados
+        if 'Campanha' not in gasto.columns:
+            raise ValueError("o gasto precisa da coluna Campanha para cruzar com os leads")
+        return cruzar_leads(caminho_leads, gasto, **opcoes)
+    
+    @memorizado('motor_regras')
+    def motor_regras(self):
+        """Regras de recomendação compiladas (ver regras.py)"""
+        return carregar_regras(self.regras)
+    
+    @memorizado('recomendacoes', depende_do_dia=True)
+    @instrumentado('profissional.recomendacoes', linhas=lambda self, tabela: len(tabela) if tabela is not None else 0)
+    def recomendacoes(self):
+        """Ações disparadas pelas regras: uma linha por (regra, janela, campanha ou conta)"""
+        if self.dados is None or self.dados.empty:
+            return None
+        motor = self.motor_regras()
+        if self.armazem is None:
+            return motor.avaliar(self.dados)
+        
+        # No armazém só sai do banco o trecho que a janela mais longa usa
+        ultima = self.armazem.ultima_data()
+        referencia = ultima if motor.referencia == 'ultima_data' and ultima is not None else pd.Timestamp(datetime.now().date())
+        return motor.avaliar(self.armazem.dados(inicio=motor.inicio(referencia)), referencia)
+    
+    @instrumentado('profissional.exportar_site', linhas=lambda self, manifesto: manifesto['estatisticas']['arquivos'] if manifesto else 0)
+    def exportar_site(self, pasta=PASTA_SITE_PADRAO, dias_serie=DIAS_SERIE):
+        """Fatias JSON pré-agregadas (+ .gz/.br) para as páginas estáticas; retorna o manifesto"""
+        if self.dados is None:
+            return None
+        dados = self.armazem.dados() if self.armazem is not None else self.dados
+        return exportar_site(dados, pasta, self.recomendacoes(), self.previsao(), dias_serie=dias_serie)
+    
+    @instrumentado('profissional.gerar_relatorios_campanhas', linhas=lambda self, resumo: resumo['arquivos'] if resumo else 0)
+    def gerar_relatorios_campanhas(self, pasta=PASTA_RELATORIOS_PADRAO, processos=None):
+        """Um relatório de texto por campanha em `pasta`, renderizado por templates num pool de processos"""
+        contexto = montar_contexto(self)
+        if contexto is None:
+            return None
+        return renderizar_campanhas(contexto, pasta, conta=self.arquivo_csv or '', processos=processos)
+    
+    @memorizado('analisar_periodo', depende_do_dia=True)
     def analisar_periodo(self, periodo_dias=7):
-        """Analisa um período específico"""
+        """Analisa um período específico (periodo_dias=None: todo o período)"""
         if self.dados is None or self.dados.empty:
             return None
         
         # Filtrar últimos N dias
         if 'Data' in self.dados.columns:
-            data_limite = datetime.now() - timedelta(days=periodo_dias)
-            dados_periodo = self.dados[self.dados['Data'] >= data_limite].copy()
+            if periodo_dias is None:
+                totais = self.motor_janelas().intervalo()
+            else:
+                data_limite = datetime.now() - timedelta(days=periodo_dias)
+                totais = self.motor_janelas().desde(data_limite)
         else:
-            dados_periodo = self.dados.tail(periodo_dias).copy()
+            dados_periodo = self.dados if periodo_dias is None else self.dados.tail(periodo_dias)
+            totais = {col: dados_periodo[col].sum() for col in COLUNAS_SOMA if col in dados_periodo.columns}
+            totais['dias'] = len(dados_periodo)
         
         # Calcular métricas do período
         resultados = {
-            'dias': len(dados_periodo),
-            'gasto_total': dados_periodo['Gasto'].sum() if 'Gasto' in dados_periodo.columns else 0,
-            'leads_total': dados_periodo['Leads'].sum() if 'Leads' in dados_periodo.columns else 0,
-            'cliques_total': dados_periodo['Cliques'].sum() if 'Cliques' in dados_periodo.columns else 0,
-            'impressoes_total': dados_periodo['Impressoes'].sum() if 'Impressoes' in dados_periodo.columns else 0,
+            'dias': totais['dias'],
+            'gasto_total': totais.get('Gasto', 0),
+            'leads_total': totais.get('Leads', 0),
+            'cliques_total': totais.get('Cliques', 0),
+            'impressoes_total': totais.get('Impressoes', 0),
         }
         
         # Calcular médias
@@ -163,6 +671,7 @@ class AnalisadorMetaProfissional:
         
         return resultados
     
+    @instrumentado('profissional.gerar_relatorio_completo')
     def gerar_relatorio_completo(self):
         """Gera relatório completo com análise"""
         if self.dados is None:
@@ -178,11 +687,15 @@ class AnalisadorMetaProfissional:
             ('HOJE', 1),
             ('ÚLTIMOS 7 DIAS', 7),
             ('ÚLTIMOS 30 DIAS', 30),
-            ('TODO PERÍODO', len(self.dados))
+            ('TODO PERÍODO', None)
         ]
         
+        # Todas as janelas saem do mesmo motor de somas acumuladas
+        with instrumentacao.etapa('profissional.relatorio.janelas'):
+            analises = {dias: self.analisar_periodo(dias) for _, dias in periodos}
+        
         for nome_periodo, dias in periodos:
-            analise = self.analisar_periodo(dias)
+            analise = analises[dias]
             if analise and analise['dias'] > 0:
                 print(f"\n📊 {nome_periodo}:")
                 print("-"*40)
@@ -196,130 +709,275 @@ class AnalisadorMetaProfissional:
                     print(f"   • Média/dia: R$ {analise['gasto_diario']:,.2f} | {analise['leads_diario']:.1f} leads")
         
         # Análise por campanha (top 5)
-        if 'Campanha' in self.dados.columns:
+        with instrumentacao.etapa('profissional.relatorio.ranking', linhas=len(self.dados)):
+            ranking = self.ranking_campanhas()
+            top_campanhas = ranking.top(5, por='Leads') if ranking is not None else None
+        
+        if top_campanhas is not None:
             print(f"\n🏆 TOP 5 CAMPANHAS (por Leads):")
             print("-"*40)
             
-            top_campanhas = self.dados.groupby('Campanha').agg({
-                'Gasto': 'sum',
-                'Leads': 'sum',
-                'Cliques': 'sum'
-            }).reset_index()
-            
-            top_campanhas['CAC'] = top_campanhas['Gasto'] / top_campanhas['Leads'].replace(0, np.nan)
-            top_campanhas = top_campanhas.sort_values('Leads', ascending=False).head(5)
-            
             for idx, row in top_campanhas.iterrows():
-                print(f"   {row['Campanha'][:30]:30} | {row['Leads']:.0f} leads | CAC: R$ {row['CAC']:,.2f}")
+                print(f"   {str(row['Campanha'])[:30]:30} | {row['Leads']:.0f} leads | CAC: R$ {row['CAC']:,.2f}")
         
-        # Tendências
-        if 'Data' in self.dados.columns and len(self.dados) >= 3:
-            print(f"\n📈 TENDÊNCIA (últimos 3 dias vs anterior):")
+        # Quebras da exportação (idade, gênero, posicionamento...): top 3 de cada
+        dimensoes = self.dimensoes()
+        if dimensoes and 'Leads' in self.dados.columns:
+            print(f"\n🧩 QUEBRAS (top 3 por Leads):")
             print("-"*40)
             
-            if len(self.dados) >= 6:
-                ultimos_3 = self.dados.tail(3)
-                anteriores_3 = self.dados.iloc[-6:-3]
+            for dimensao in dimensoes:
+                tabela = self.quebra(dimensao)
+                print(f"   • {dimensao} ({len(tabela)} valores):")
+                for _, row in tabela.nlargest(3, 'Leads').iterrows():
+                    print(f"      {str(row[dimensao])[:30]:30} | {row['Leads']:.0f} leads | CAC: R$ {row['CAC']:,.2f}")
+        
+        # Tendências (janelas de dias corridos, por campanha)
+        if 'Data' in self.dados.columns:
+            tendencia = self.tendencia_global()
+            
+            if tendencia:
+                print(f"\n📈 TENDÊNCIA (últimos {JANELA_TENDENCIA} dias vs anteriores):")
+                print("-"*40)
+                
+                for taxa, rotulo in [('CAC', 'CAC'), ('CTR', 'CTR'), ('Taxa_Conversao', 'Conversão')]:
+                    if taxa not in tendencia:
+                        continue
+                    variacao = np.nan_to_num(tendencia[taxa]['variacao'])
+                    seta = "🔼" if variacao > 0 else "🔽" if variacao < 0 else "➡️"
+                    print(f"   • {rotulo}: {seta} {variacao:+.1f}%")
                 
-                if not anteriores_3.empty:
-                    cac_ultimos = ultimos_3['Gasto'].sum() / ultimos_3['Leads'].sum() if ultimos_3['Leads'].sum() > 0 else 0
-                    cac_anteriores = anteriores_3['Gasto'].sum() / anteriores_3['Leads'].sum() if anteriores_3['Leads'].sum() > 0 else 0
-                    
-                    variacao_cac = ((cac_ultimos - cac_anteriores) / cac_anteriores * 100) if cac_anteriores > 0 else 0
-                    
-                    seta = "🔼" if variacao_cac > 0 else "🔽" if variacao_cac < 0 else "➡️"
-                    print(f"   • CAC: {seta} {variacao_cac:+.1f}%")
+                por_campanha = self.tendencias_campanha()
+                if len(por_campanha) > 1 and 'CAC_variacao' in por_campanha.columns:
+                    altas = por_campanha['CAC_variacao'].dropna()
+                    altas = altas[altas > 0].nlargest(3)
+                    if not altas.empty:
+                        print("   • Maiores altas de CAC:")
+                        for campanha, variacao in altas.items():
+                            print(f"      {str(campanha)[:30]:30} | CAC 🔼 {variacao:+.1f}%")
+        
+        # Anomalias por campanha (o que a média da conta esconde)
+        anomalias = self.anomalias()
+        if anomalias is not None:
+            print(f"\n🚨 ANOMALIAS POR CAMPANHA (últimos {DIAS_ANOMALIAS} dias):")
+            print("-"*40)
+            
+            if anomalias.empty:
+                print("   ✅ Nenhuma campanha fora do próprio padrão")
+            for _, row in anomalias.head(10).iterrows():
+                seta = "🔼" if row['Direcao'] == 'alta' else "🔽"
+                if row['Metrica'] == 'CAC':
+                    valores = f"R$ {row['Valor']:,.2f} (mediana R$ {row['Mediana']:,.2f})"
+                else:
+                    valores = f"{row['Valor']:.2f}% (mediana {row['Mediana']:.2f}%)"
+                print(f"   {row['Data']:%d/%m} {str(row['Campanha'])[:30]:30} | {row['Metrica']} {seta} {valores}")
+            if len(anomalias) > 10:
+                print(f"   ... e mais {len(anomalias) - 10}")
         
         # Recomendações automáticas
         print(f"\n💡 RECOMENDAÇÕES AUTOMÁTICAS:")
         print("-"*40)
         
-        # Analisar últimos 7 dias para recomendações
-        analise_7dias = self.analisar_periodo(7)
+        # Regras da conta (regras.py): grupos exclusivos na ordem do arquivo
+        recomendacoes = self.recomendacoes()
+        if recomendacoes is not None:
+            grupos = self.motor_regras().grupos('conta')
+            for _, row in recomendacoes[recomendacoes['Nivel'] == 'conta'].iterrows():
+                separador = "\n" if grupos.index(row['Grupo']) > 0 else ""
+                print(f"{separador}   {row['Titulo']}")
+                for acao in row['Acoes']:
+                    print(f"      • {acao}")
+            
+            # Regras por campanha: mais graves e de maior gasto primeiro
+            if self.motor_regras().grupos('campanha') and 'Campanha' in self.dados.columns:
+                acoes = acoes_por_campanha(recomendacoes)
+                print(f"\n🎯 AÇÕES POR CAMPANHA ({acoes['Campanha'].nunique()} campanhas acionaram regras):")
+                print("-"*40)
+                
+                if acoes.empty:
+                    print("   ✅ Nenhuma campanha acionou as regras")
+                for _, row in acoes.head(10).iterrows():
+                    acao = f" → {row['Acoes'][0]}" if row['Acoes'] else ""
+                    print(f"   [{row['Severidade']}] {str(row['Campanha'])[:30]:30} | {row['Titulo']} ({row['Janela']}){acao}")
+                if len(acoes) > 10:
+                    print(f"   ... e mais {len(acoes) - 10}")
         
-        if analise_7dias and analise_7dias.get('cac_medio', 0) > 0:
-            cac = analise_7dias['cac_medio']
+        # Previsão do mês (Holt-Winters com sazonalidade semanal, por campanha)
+        previsao = self.previsao()
+        if previsao and previsao['total']['leads'] > 0:
+            total = previsao['total']
             
-            if cac > 80:
-                print("   ⚠️  CAC MUITO ALTO (> R$ 80)")
-                print("      • Reduza orçamento de campanhas ineficientes")
-                print("      • Reveja segmentação e criativos")
-                print("      • Considere pausar campanhas problemáticas")
-            elif cac > 50:
-                print("   ⚠️  CAC ALTO (R$ 50-80)")
-                print("      • Otimize lances e orçamentos")
-                print("      • Teste novas audiências")
-                print("      • Melhore landing pages")
-            elif cac > 20:
-                print("   ✅ CAC RAZOÁVEL (R$ 20-50)")
-                print("      • Mantenha estratégia atual")
-                print("      • Pequenos ajustes de otimização")
-                print("      • Escale campanhas com melhor ROI")
-            else:
-                print("   🎉 CAC EXCELENTE (< R$ 20)")
-                print("      • AUMENTE ORÇAMENTO")
-                print("      • Duplique campanhas vencedoras")
-                print("      • Expanda para novas audiências")
-        
-        # Verificar CTR
-        if analise_7dias and analise_7dias.get('ctr_medio', 0) > 0:
-            ctr = analise_7dias['ctr_medio']
+            print(f"\n🔮 PREVISÃO PRÓXIMOS {previsao['horizonte']} DIAS "
+                  f"(Holt-Winters semanal, {previsao['dias_historico']} dias de histórico, intervalo {previsao['nivel']:.0%}):")
+            print(f"   • Leads: {total['leads']:.0f} ({total['leads_min']:.0f} a {total['leads_max']:.0f})")
+            print(f"   • Gasto: R$ {total['gasto']:,.2f} (R$ {total['gasto_min']:,.2f} a R$ {total['gasto_max']:,.2f})")
+            print(f"   • CAC estimado: R$ {total['cac']:,.2f} (R$ {total['cac_min']:,.2f} a R$ {total['cac_max']:,.2f})")
             
-            if ctr < 1:
-                print("\n   ⚠️  CTR BAIXO (< 1%)")
-                print("      • Teste novos criativos")
-                print("      • Melhore copy e headlines")
-                print("      • Ajuste segmentação")
-            elif ctr > 3:
-                print("\n   ✅ CTR ALTO (> 3%)")
-                print("      • Criativos funcionando bem!")
-                print("      • Mantenha ou teste variações")
-        
-        # Previsão do mês
-        if analise_7dias and analise_7dias.get('leads_diario', 0) > 0:
-            leads_diario = analise_7dias['leads_diario']
-            gasto_diario = analise_7dias.get('gasto_diario', 0)
+            campanhas = previsao['campanhas']
+            if len(campanhas) > 1:
+                print("   • Mais leads previstos:")
+                for campanha, row in campanhas.nlargest(3, 'Leads').iterrows():
+                    print(f"      {str(campanha)[:30]:30} | {row['Leads']:.0f} leads | CAC: R$ {row['CAC']:,.2f}")
+        
+        # Realocação do mesmo orçamento entre campanhas (retorno decrescente, Monte Carlo)
+        simulacao = self.simulacao_orcamento()
+        if simulacao:
+            total = simulacao['total']
+            
+            print(f"\n💰 REALOCAÇÃO DE ORÇAMENTO (Monte Carlo, {simulacao['candidatos']:,} divisões x "
+                  f"{simulacao['sorteios']:,} sorteios, últimos {simulacao['dias_historico']} dias):")
+            print(f"   • Orçamento diário: R$ {total['orcamento']:,.2f}")
+            print(f"   • Leads/dia: {total['leads_atual']:.1f} → {total['leads']:.1f} "
+                  f"({total['leads_min']:.1f} a {total['leads_max']:.1f}) | {total['ganho']:+.1f}%")
+            print(f"   • CAC: R$ {total['cac_atual']:,.2f} → R$ {total['cac']:,.2f} | "
+                  f"melhor que a divisão atual em {total['prob_melhor']:.0%} dos sorteios")
             
-            print(f"\n🔮 PREVISÃO MENSAL (baseado em média diária):")
-            print(f"   • Leads/mês: {leads_diario * 30:.0f}")
-            print(f"   • Gasto/mês: R$ {gasto_diario * 30:,.2f}")
-            print(f"   • CAC estimado: R$ {analise_7dias.get('cac_medio', 0):,.2f}")
+            campanhas = simulacao['campanhas']
+            for rotulo, linhas in [("Aumentar", campanhas[campanhas['Variacao'] > 1].nlargest(3, 'Variacao')),
+                                   ("Reduzir", campanhas[campanhas['Variacao'] < -1].nsmallest(3, 'Variacao'))]:
+                if linhas.empty:
+                    continue
+                print(f"   • {rotulo}:")
+                for campanha, row in linhas.iterrows():
+                    print(f"      {str(campanha)[:30]:30} | R$ {row['Gasto_atual']:,.2f} → R$ {row['Gasto_sugerido']:,.2f}/dia ({row['Variacao']:+.0f}%)")
         
         print("\n" + "="*70)
         print("✅ RELATÓRIO GERADO COM SUCESSO!")
         print("="*70)
     
-    def exportar_relatorio_detalhado(self, nome_arquivo="relatorio_detalhado.csv"):
-        """Exporta relatório detalhado para CSV"""
+    @memorizado('tabela_detalhada')
+    def _tabela_detalhada(self, por_campanha=False):
+        """Tabela do relatório detalhado, montada a partir dos agregados sem copiar self.dados
+        
+        Retorna (tabela, datas_normalizadas). Com por_campanha=True mantém uma
+        linha por Data x Campanha em vez de somar as campanhas do dia.
+        """
+        dados = self.dados
+        if 'Data' not in dados.columns or (not self.modo_agregado and not por_campanha and len(dados) <= 10):
+            return dados, False
+        
+        # Data já vem convertida do carregamento: só normaliza para o dia
+        dia = dados['Data'] if pd.api.types.is_datetime64_any_dtype(dados['Data']) else pd.to_datetime(dados['Data'])
+        chaves = [dia.dt.normalize()]
+        if por_campanha and 'Campanha' in dados.columns:
+            chaves.append(dados['Campanha'])
+        
+        # Dados agregados (streaming) ou por campanha: somar e recalcular as taxas
+        if self.modo_agregado or por_campanha:
+            metricas = [c for c in COLUNAS_SOMA if c in dados.columns]
+            relatorio = dados.groupby(chaves, observed=True)[metricas].sum().reset_index()
+            return self._adicionar_colunas_calculadas(relatorio), True
+        
+        # Se tiver muitos dados, resumir por dia
+        agregacoes = {'Gasto': 'sum', 'Leads': 'sum', 'Cliques': 'sum', 'Impressoes': 'sum',
+                      'CAC': 'mean', 'CTR': 'mean', 'Taxa_Conversao': 'mean'}
+        agregacoes = {c: f for c, f in agregacoes.items() if c in dados.columns}
+        return dados.groupby(chaves).agg(agregacoes).reset_index(), True
+    
+    @staticmethod
+    def _gravar_tabela(tabela, caminho, formato, datas_normalizadas):
+        """Grava em blocos num arquivo temporário e renomeia (leitores nunca veem um arquivo pela metade)"""
+        temporario = caminho + f'.{os.getpid()}.tmp'
+        
+        if formato in COMPRESSAO_CSV:
+            opcoes = {
+                'index': False,
+                'chunksize': LINHAS_POR_BLOCO_EXPORTACAO,
+                # CSV simples mantém o BOM para o Excel; os comprimidos são para outros programas
+                'encoding': 'utf-8-sig' if formato == 'csv' else 'utf-8',
+                'date_format': '%Y-%m-%d' if datas_normalizadas else None,
+            }
+            if formato == 'csv.zst' and zstandard is None:
+                # Sem o pacote zstandard, o codec zstd do pyarrow faz a compressão
+                import pyarrow as pa
+                with pa.CompressedOutputStream(temporario, 'zstd') as saida:
+                    tabela.to_csv(saida, mode='wb', **opcoes)
+            else:
+                tabela.to_csv(temporario, compression=COMPRESSAO_CSV[formato], **opcoes)
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError(f"formato {formato} requer pyarrow (pip install pyarrow)")
+            
+            # Esquema do primeiro bloco: com iloc[:0] as colunas object do pandas 2 viram tipo null;
+            # colunas só com nulos nesse bloco são gravadas como texto
+            primeiro = pa.Schema.from_pandas(tabela.iloc[:LINHAS_POR_BLOCO_EXPORTACAO], preserve_index=False)
+            esquema = pa.schema(
+                [pa.field(c.name, pa.string()) if pa.types.is_null(c.type) else c for c in primeiro],
+                metadata=primeiro.metadata,
+            )
+            if formato == 'parquet':
+                escritor = pq.ParquetWriter(temporario, esquema, compression='zstd')
+            else:
+                opcoes = pa.ipc.IpcWriteOptions(compression='zstd')
+                escritor = pa.ipc.new_file(temporario, esquema, options=opcoes)
+            with escritor:
+                for inicio in range(0, len(tabela), LINHAS_POR_BLOCO_EXPORTACAO):
+                    bloco = tabela.iloc[inicio:inicio + LINHAS_POR_BLOCO_EXPORTACAO]
+                    escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+        
+        os.replace(temporario, caminho)
+    
+    @instrumentado('profissional.exportar_relatorio_detalhado')
+    def exportar_relatorio_detalhado(self, nome_arquivo="relatorio_detalhado.csv", formato=None, particionar=None):
+        """Exporta relatório detalhado (CSV, CSV gzip/zstd, Parquet ou Feather)
+        
+        O formato vem da extensão (.csv, .csv.gz, .csv.zst, .parquet,
+        .feather/.arrow) ou de `formato`. Com particionar='mes' ou 'campanha'
+        grava uma pasta com um arquivo por partição, no estilo Hive:
+        relatorio_detalhado/mes=2024-12/dados.parquet.
+        """
         if self.dados is None:
             return False
         
         try:
-            # Criar relatório resumido
-            relatorio = self.dados.copy()
+            formato = formato or formato_exportacao(nome_arquivo)
+            if formato not in EXTENSOES_EXPORTACAO:
+                raise ValueError(f"formato desconhecido: {formato}")
+            if particionar not in (None, 'mes', 'campanha'):
+                raise ValueError("particionar deve ser 'mes' ou 'campanha'")
+            
+            relatorio, normalizadas = self._tabela_detalhada(por_campanha=particionar == 'campanha')
             
-            # Se tiver muitos dados, resumir por dia
-            if 'Data' in relatorio.columns and len(relatorio) > 10:
-                relatorio['Data'] = pd.to_datetime(relatorio['Data']).dt.date
-                relatorio = relatorio.groupby('Data').agg({
-                    'Gasto': 'sum',
-                    'Leads': 'sum',
-                    'Cliques': 'sum',
-                    'Impressoes': 'sum',
-                    'CAC': 'mean',
-                    'CTR': 'mean',
-                    'Taxa_Conversao': 'mean'
-                }).reset_index()
+            with instrumentacao.etapa('profissional.gravar_relatorio', linhas=len(relatorio)):
+                if not particionar:
+                    self._gravar_tabela(relatorio, nome_arquivo, formato, normalizadas)
+                    print(f"\n💾 Relatório detalhado salvo: {nome_arquivo}")
+                    return True
+                
+                coluna = 'Data' if particionar == 'mes' else 'Campanha'
+                if coluna not in relatorio.columns:
+                    raise ValueError(f"particionar por {particionar} requer a coluna {coluna}")
+                
+                chave = relatorio['Data'].dt.strftime('%Y-%m') if particionar == 'mes' else relatorio['Campanha'].astype(str)
+                pasta = remover_extensao(nome_arquivo)
+                # Partições vão para uma pasta temporária que substitui a anterior inteira:
+                # meses, campanhas ou formatos de uma exportação antiga não sobram no dataset
+                temporaria = pasta + f'.{os.getpid()}.tmp'
+                shutil.rmtree(temporaria, ignore_errors=True)
+                particoes = 0
+                try:
+                    for valor, parte in relatorio.groupby(chave, sort=True):
+                        destino = os.path.join(temporaria, f"{particionar}={quote(str(valor), safe=' ')}")
+                        os.makedirs(destino, exist_ok=True)
+                        self._gravar_tabela(parte, os.path.join(destino, 'dados' + EXTENSOES_EXPORTACAO[formato]),
+                                            formato, normalizadas)
+                        particoes += 1
+                    trocar_pasta_particionada(temporaria, pasta)
+                except BaseException:
+                    shutil.rmtree(temporaria, ignore_errors=True)
+                    raise
             
-            # Salvar CSV
-            relatorio.to_csv(nome_arquivo, index=False, encoding='utf-8-sig')
-            print(f"\n💾 Relatório detalhado salvo: {nome_arquivo}")
+            print(f"\n💾 Relatório detalhado salvo: {pasta}/ ({particoes} partições por {particionar})")
             return True
             
         except Exception as e:
             print(f"❌ Erro ao exportar relatório: {e}")
             return False
     
+    @instrumentado('profissional.salvar_metricas_chave')
     def salvar_metricas_chave(self, nome_arquivo="metricas_chave.txt"):
         """Salva métricas chave em arquivo de texto"""
         if self.dados is None:
@@ -328,27 +986,20 @@ class AnalisadorMetaProfissional:
         try:
             analise_7dias = self.analisar_periodo(7)
             
-            with open(nome_arquivo, 'w', encoding='utf-8') as f:
-                f.write("="*60 + "\n")
-                f.write("📊 MÉTRICAS CHAVE META ADS\n")
-                f.write("="*60 + "\n\n")
+            linhas = []
+            recomendacoes = self.recomendacoes()
+            if recomendacoes is not None:
+                conta = recomendacoes[(recomendacoes['Nivel'] == 'conta') & recomendacoes['Resumo'].notna()]
+                linhas.extend(conta['Resumo'])
                 
-                f.write(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
-                f.write(f"Arquivo analisado: {self.arquivo_csv}\n\n")
-                
-                if analise_7dias:
-                    f.write("📈 ÚLTIMOS 7 DIAS:\n")
-                    f.write(f"• Gasto Total: R$ {analise_7dias['gasto_total']:,.2f}\n")
-                    f.write(f"• Leads Total: {analise_7dias['leads_total']:.0f}\n")
-                    f.write(f"• CAC Médio: R$ {analise_7dias.get('cac_medio', 0):,.2f}\n")
-                    f.write(f"• CTR Médio: {analise_7dias.get('ctr_medio', 0):.2f}%\n")
-                    f.write(f"• Média/dia: {analise_7dias.get('leads_diario', 0):.1f} leads\n\n")
-                
-                f.write("🎯 RECOMENDAÇÕES:\n")
-                if analise_7dias and analise_7dias.get('cac_medio', 0) > 50:
-                    f.write("- CAC alto: Otimizar campanhas e revisar segmentação\n")
-                elif analise_7dias and analise_7dias.get('cac_medio', 0) < 20:
-                    f.write("- CAC excelente: Aumentar orçamento das melhores campanhas\n")
+                acoes = acoes_por_campanha(recomendacoes)
+                linhas.extend(f"{row['Campanha']}: {row['Titulo']} ({row['Janela']})" for _, row in acoes.head(10).iterrows())
+                if len(acoes) > 10:
+                    linhas.append(f"... e mais {len(acoes) - 10} ações por campanha")
+            
+            # Texto montado pelo template e gravado de uma vez (temporário + os.replace)
+            with escrita_atomica(nome_arquivo) as f:
+                f.write(metricas_chave(analise_7dias, linhas, self.arquivo_csv))
             
             print(f"📝 Métricas chave salvas: {nome_arquivo}")
             return True
@@ -358,15 +1009,26 @@ class AnalisadorMetaProfissional:
             return False
 
 # ================= PROGRAMA PRINCIPAL =================
-def main():
+def main(diretorio_cubo=os.environ.get('META_CUBO_DIR'), banco_sqlite=os.environ.get('META_SQLITE')):
     """Função principal"""
+    print("="*70)
+    print("📊 ANALISADOR PROFISSIONAL META ADS")
+    print("="*70)
     print("🚀 Iniciando Analisador Profissional META Ads...\n")
     
     # Criar analisador
     analisador = AnalisadorMetaProfissional()
     
-    # Carregar dados
-    if not analisador.carregar_dados():
+    # Carregar dados (direto do CSV, do banco SQLite ou do cubo histórico)
+    if banco_sqlite:
+        from armazem_sqlite import ArmazemSQLite
+        carregado = analisador.carregar_com_armazem(ArmazemSQLite(banco_sqlite))
+    elif diretorio_cubo:
+        carregado = analisador.carregar_com_cubo(CuboRollup(diretorio_cubo))
+    else:
+        carregado = analisador.carregar_dados()
+    
+    if not carregado:
         print("\n💡 DICA: Exporte seus dados do META Ads como CSV e salve na pasta.")
         return
     
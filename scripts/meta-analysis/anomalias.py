@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+DETECTOR DE ANOMALIAS POR CAMPANHA (STREAMING)
+Arquitetura de Performance - ruas.dev.br
+
+Processa as linhas conforme chegam (CSV inteiro, blocos do streaming ou
+linhas novas do observador) e mantém, por campanha e por taxa (CAC, CTR,
+Taxa_Conversao), só estatísticas de tamanho fixo:
+
+  • Welford: contagem, média e soma dos quadrados dos desvios
+  • EWMA: média e variância exponenciais (reagem a mudanças de patamar)
+  • P² (Jain & Chlamtac): 5 marcadores que estimam quartis e mediana sem
+    guardar as observações
+
+Um dia de uma campanha só é avaliado quando chega um dia posterior dela (ou
+em finalizar()), então dias ainda parciais não geram alarme. O dia é
+anômalo quando o z robusto (mediana e IQR do P²), o z de Welford e o z da
+EWMA passam dos limiares; a avaliação usa as estatísticas de antes do dia,
+que em seguida é incorporado. As campanhas de um bloco são atualizadas
+juntas em arrays NumPy, um dia por vez para cada campanha.
+
+Dias anteriores ao dia aberto de uma campanha já não podem ser avaliados em
+ordem e são descartados (contados em linhas_atrasadas). Para uma leitura em
+blocos de um arquivo ordenado por data, em qualquer sentido, use acumular()
+em cada bloco e descarregar() no fim da leitura. Em ordem crescente, os dias
+anteriores à maior data já lida são fechados a cada bloco e só fica pendente
+o último dia de cada campanha. Em ordem decrescente (exportações do
+Gerenciador) nenhum dia pode ser fechado antes do fim da leitura: as somas
+Campanha x dia ficam pendentes (uma linha por campanha e dia, não por linha
+do arquivo) e são fechadas em ordem de data em descarregar().
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Taxa: (numerador, denominador, multiplicador, direção que é piora)
+TAXAS_ANOMALIA = {
+    'CAC': ('Gasto', 'Leads', 1, 1),
+    'CTR': ('Cliques', 'Impressoes', 100, -1),
+    'Taxa_Conversao': ('Leads', 'Cliques', 100, -1),
+}
+METRICAS_BASE = ['Gasto', 'Leads', 'Cliques', 'Impressoes']
+
+LIMIAR_ROBUSTO = 3.5
+LIMIAR_EWMA = 3.0
+MINIMO_DIAS = 14
+ALFA_EWMA = 0.2
+MAX_REGISTROS = 1000
+
+# Marcadores do P² para p = 0.5: mínimo, Q1, mediana, Q3, máximo
+_P2_INCREMENTOS = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+_SEM_DIA = np.iinfo(np.int64).min
+
+
+class _Estatisticas:
+    """Welford + EWMA + P² de uma taxa, uma linha por campanha"""
+
+    def __init__(self, alfa):
+        self.alfa = alfa
+        self.n = np.zeros(0, dtype=np.int64)
+        self.media = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.ewm = np.zeros(0)
+        self.ewv = np.zeros(0)
+        self.marcadores = np.zeros((0, 5))
+        self.posicoes = np.zeros((0, 5))
+
+    def crescer(self, capacidade):
+        extra = capacidade - len(self.n)
+        self.n = np.concatenate([self.n, np.zeros(extra, dtype=np.int64)])
+        for nome in ('media', 'm2', 'ewm', 'ewv'):
+            setattr(self, nome, np.concatenate([getattr(self, nome), np.zeros(extra)]))
+        self.marcadores = np.vstack([self.marcadores, np.zeros((extra, 5))])
+        self.posicoes = np.vstack([self.posicoes, np.zeros((extra, 5))])
+
+    def pontuar(self, ids, x):
+        """(z Welford, z EWMA, z robusto, mediana) de x com o estado atual"""
+        n = self.n[ids]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            desvio = np.sqrt(self.m2[ids] / np.maximum(n - 1, 1))
+            z_welford = (x - self.media[ids]) / np.maximum(desvio, 1e-12)
+
+            mediana = self.marcadores[ids, 2]
+            # Piso na escala: séries quase constantes não viram alarme a cada centavo
+            piso = 0.05 * np.abs(mediana) + 1e-9
+            escala = np.maximum((self.marcadores[ids, 3] - self.marcadores[ids, 1]) / 1.349, piso)
+            z_robusto = (x - mediana) / escala
+            z_ewma = (x - self.ewm[ids]) / np.maximum(np.sqrt(self.ewv[ids]), np.maximum(piso, 0.05 * np.abs(self.ewm[ids])))
+        return z_welford, z_ewma, z_robusto, mediana
+
+    def atualizar(self, ids, x):
+        n = self.n[ids]
+
+        # Welford
+        delta = x - self.media[ids]
+        self.media[ids] += delta / (n + 1)
+        self.m2[ids] += delta * (x - self.media[ids])
+
+        # EWMA (a primeira observação só inicializa)
+        primeira = n == 0
+        diferenca = x - self.ewm[ids]
+        incremento = self.alfa * diferenca
+        self.ewm[ids] = np.where(primeira, x, self.ewm[ids] + incremento)
+        self.ewv[ids] = np.where(primeira, 0.0, (1 - self.alfa) * (self.ewv[ids] + diferenca * incremento))
+
+        self._atualizar_p2(ids, x, n)
+        self.n[ids] = n + 1
+
+    def _atualizar_p2(self, ids, x, n):
+        # As 5 primeiras observações preenchem os marcadores diretamente
+        iniciais = n < 5
+        if iniciais.any():
+            self.marcadores[ids[iniciais], n[iniciais]] = x[iniciais]
+            completos = ids[iniciais & (n == 4)]
+            self.marcadores[completos] = np.sort(self.marcadores[completos], axis=1)
+            self.posicoes[completos] = np.arange(1, 6)
+
+        ativos = ~iniciais
+        if not ativos.any():
+            return
+        ids, x, total = ids[ativos], x[ativos], n[ativos] + 1
+        q = self.marcadores[ids]
+        pos = self.posicoes[ids]
+
+        # Célula onde x cai; extremos acompanham mínimo e máximo
+        celula = (x[:, None] >= q[:, 1:4]).sum(axis=1)
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        pos += np.arange(5)[None, :] > celula[:, None]
+        desejadas = 1 + (total - 1)[:, None] * _P2_INCREMENTOS
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in (1, 2, 3):
+                d = desejadas[:, i] - pos[:, i]
+                sobe = (d >= 1) & (pos[:, i + 1] - pos[:, i] > 1)
+                desce = (d <= -1) & (pos[:, i - 1] - pos[:, i] < -1)
+                ajustar = sobe | desce
+                if not ajustar.any():
+                    continue
+                s = np.where(sobe, 1.0, -1.0)
+                qi, qa, qp = q[:, i], q[:, i - 1], q[:, i + 1]
+                ni, na, np_ = pos[:, i], pos[:, i - 1], pos[:, i + 1]
+
+                parabolica = qi + s / (np_ - na) * (
+                    (ni - na + s) * (qp - qi) / (np_ - ni) + (np_ - ni - s) * (qi - qa) / (ni - na)
+                )
+                vizinho_q = np.where(sobe, qp, qa)
+                vizinho_n = np.where(sobe, np_, na)
+                linear = qi + s * (vizinho_q - qi) / (vizinho_n - ni)
+                novo = np.where((qa < parabolica) & (parabolica < qp), parabolica, linear)
+
+                q[:, i] = np.where(ajustar, novo, qi)
+                pos[:, i] += np.where(ajustar, s, 0.0)
+
+        self.marcadores[ids] = q
+        self.posicoes[ids] = pos
+
+
+class DetectorAnomalias:
+    def __init__(self, limiar=LIMIAR_ROBUSTO, limiar_ewma=LIMIAR_EWMA, minimo_dias=MINIMO_DIAS,
+                 alfa=ALFA_EWMA, max_registros=MAX_REGISTROS):
+        self.limiar = limiar
+        self.limiar_ewma = limiar_ewma
+        self.minimo_dias = minimo_dias
+        self.campanhas = []
+        self._codigos = {}
+        self._estatisticas = {taxa: _Estatisticas(alfa) for taxa in TAXAS_ANOMALIA}
+        # Dia ainda aberto de cada campanha e suas somas (METRICAS_BASE)
+        self._dia = np.zeros(0, dtype=np.int64)
+        self._somas = np.zeros((0, len(METRICAS_BASE)))
+        # Só as anomalias mais recentes ficam guardadas
+        self.registros = deque(maxlen=max_registros)
+        self.dias_avaliados = 0
+        self.linhas_atrasadas = 0
+        # Blocos de acumular() ainda não fechados: (códigos, dias, somas)
+        self._pendentes = []
+        # Sentido de data da leitura em curso (1, -1 ou None) e último dia lido
+        self._sentido = None
+        self._ultimo_lido = None
+
+    # ---------- estado ----------
+
+    def _codificar(self, nomes):
+        """Códigos estáveis das campanhas, criando estado para as novas"""
+        codigos = np.empty(len(nomes), dtype=np.int64)
+        for i, nome in enumerate(nomes):
+            codigo = self._codigos.get(nome)
+            if codigo is None:
+                codigo = self._codigos[nome] = len(self.campanhas)
+                self.campanhas.append(nome)
+            codigos[i] = codigo
+
+        capacidade = len(self._dia)
+        if len(self.campanhas) > capacidade:
+            nova = max(len(self.campanhas), 2 * capacidade, 64)
+            self._dia = np.concatenate([self._dia, np.full(nova - capacidade, _SEM_DIA)])
+            self._somas = np.vstack([self._somas, np.zeros((nova - capacidade, len(METRICAS_BASE)))])
+            for estatisticas in self._estatisticas.values():
+                estatisticas.crescer(nova)
+        return codigos
+
+    @staticmethod
+    def _somar_por_dia(dados):
+        """(nomes, códigos locais, dias, somas, dias na ordem do bloco) por Campanha x dia, ordenado"""
+        dias = pd.to_datetime(dados['Data'], errors='coerce').to_numpy().astype('datetime64[D]')
+        validos = ~np.isnat(dias)
+        if 'Campanha' in dados.columns:
+            locais, nomes = pd.factorize(dados['Campanha'].to_numpy()[validos], use_na_sentinel=False)
+        else:
+            locais, nomes = np.zeros(validos.sum(), dtype=np.int64), np.array(['(todas)'], dtype=object)
+        dias = dias[validos].astype(np.int64)
+        valores = np.column_stack([
+            dados[m].to_numpy(dtype=np.float64)[validos] if m in dados.columns else np.zeros(validos.sum())
+            for m in METRICAS_BASE
+        ])
+
+        lidos = dias
+        locais, dias, valores = DetectorAnomalias._somar_chaves(locais, dias, valores)
+        return nomes, locais, dias, valores, lidos
+
+    @staticmethod
+    def _somar_chaves(campanhas, dias, valores):
+        """Ordena por Campanha x dia e soma as linhas de mesma chave"""
+        ordem = np.lexsort((dias, campanhas))
+        campanhas, dias, valores = campanhas[ordem], dias[ordem], valores[ordem]
+        if len(dias) == 0:
+            return campanhas, dias, valores
+        inicio = np.flatnonzero(np.r_[True, (np.diff(campanhas) != 0) | (np.diff(dias) != 0)])
+        return campanhas[inicio], dias[inicio], np.add.reduceat(valores, inicio, axis=0)
+
+    # ---------- fluxo ----------
+
+    def atualizar(self, dados):
+        """Incorpora um bloco de linhas; retorna as anomalias dos dias fechados"""
+        self.acumular(dados)
+        return self.descarregar()
+
+    def acumular(self, dados):
+        """Soma um bloco por Campanha x dia; em leitura crescente, fecha os dias já completos
+
+        Retorna as anomalias dos dias fechados (nenhum enquanto o sentido da
+        leitura não é conhecido ou quando ela é decrescente; ver descarregar).
+        """
+        if dados is None or len(dados) == 0 or 'Data' not in dados.columns:
+            return []
+        nomes, locais, dias, valores, lidos = self._somar_por_dia(dados)
+        if len(dias) == 0:
+            return []
+        self._pendentes.append((self._codificar(list(nomes))[locais], dias, valores))
+
+        # O primeiro dia diferente do anterior, entre blocos ou dentro do bloco, dá o sentido
+        if self._sentido is None:
+            anteriores = lidos if self._ultimo_lido is None else np.r_[self._ultimo_lido, lidos]
+            mudancas = np.flatnonzero(np.diff(anteriores))
+            if len(mudancas):
+                self._sentido = 1 if anteriores[mudancas[0] + 1] > anteriores[mudancas[0]] else -1
+        self._ultimo_lido = lidos[-1]
+        if self._sentido != 1:
+            return []
+
+        # Em ordem crescente, os dias antes da maior data lida já chegaram inteiros
+        campanhas, dias, valores = self._juntar_pendentes()
+        fechados = dias < dias.max()
+        self._pendentes = [(campanhas[~fechados], dias[~fechados], valores[~fechados])]
+        return self._fechar(campanhas[fechados], dias[fechados], valores[fechados])
+
+    def descarregar(self):
+        """Fecha, em ordem de data, os blocos acumulados (fim da leitura); retorna as anomalias"""
+        self._sentido = self._ultimo_lido = None
+        if not self._pendentes:
+            return []
+        campanhas, dias, valores = self._juntar_pendentes()
+        self._pendentes = []
+        return self._fechar(campanhas, dias, valores)
+
+    def _juntar_pendentes(self):
+        if len(self._pendentes) == 1:
+            return self._pendentes[0]
+        return self._somar_chaves(*(np.concatenate(partes) for partes in zip(*self._pendentes)))
+
+    def _fechar(self, campanhas, dias, valores):
+        """Incorpora somas Campanha x dia ordenadas; avalia os dias antes do último de cada campanha"""
+        if len(campanhas) == 0:
+            return []
+        aberto = self._dia[campanhas]
+        atrasadas = dias < aberto
+        mesmo_dia = dias == aberto
+        self.linhas_atrasadas += int(atrasadas.sum())
+        np.add.at(self._somas, campanhas[mesmo_dia], valores[mesmo_dia])
+
+        posteriores = dias > aberto
+        campanhas, dias, valores = campanhas[posteriores], dias[posteriores], valores[posteriores]
+        if len(campanhas) == 0:
+            return []
+
+        # O dia aberto de quem recebeu dias posteriores entra na fila para avaliação
+        com_aberto = np.unique(campanhas)
+        com_aberto = com_aberto[self._dia[com_aberto] != _SEM_DIA]
+        campanhas = np.concatenate([com_aberto, campanhas])
+        dias = np.concatenate([self._dia[com_aberto], dias])
+        valores = np.vstack([self._somas[com_aberto], valores])
+
+        ordem = np.lexsort((dias, campanhas))
+        campanhas, dias, valores = campanhas[ordem], dias[ordem], valores[ordem]
+
+        # O último dia de cada campanha fica aberto; os demais são avaliados
+        ultimo = np.r_[campanhas[1:] != campanhas[:-1], True]
+        self._dia[campanhas[ultimo]] = dias[ultimo]
+        self._somas[campanhas[ultimo]] = valores[ultimo]
+        return self._avaliar_em_rodadas(campanhas[~ultimo], dias[~ultimo], valores[~ultimo])
+
+    def finalizar(self):
+        """Avalia os dias ainda abertos (fim de um lote completo)"""
+        novas = self.descarregar()
+        abertos = np.flatnonzero(self._dia != _SEM_DIA)
+        novas += self._avaliar(abertos, self._dia[abertos], self._somas[abertos])
+        self._dia[abertos] = _SEM_DIA
+        self._somas[abertos] = 0
+        return novas
+
+    def _avaliar_em_rodadas(self, campanhas, dias, valores):
+        """Dias em ordem por campanha; cada rodada pega um dia de cada campanha"""
+        if len(campanhas) == 0:
+            return []
+        inicio_grupo = np.flatnonzero(np.r_[True, campanhas[1:] != campanhas[:-1]])
+        tamanhos = np.diff(np.r_[inicio_grupo, len(campanhas)])
+        rodada = np.arange(len(campanhas)) - np.repeat(inicio_grupo, tamanhos)
+
+        novas = []
+        for r in range(int(rodada.max()) + 1):
+            selecao = rodada == r
+            novas.extend(self._avaliar(campanhas[selecao], dias[selecao], valores[selecao]))
+        return novas
+
+    def _avaliar(self, campanhas, dias, valores):
+        """Pontua e incorpora um dia fechado de cada campanha (códigos únicos)"""
+        if len(campanhas) == 0:
+            return []
+        self.dias_avaliados += len(campanhas)
+        colunas = {m: valores[:, i] for i, m in enumerate(METRICAS_BASE)}
+
+        novas = []
+        for taxa, (numerador, denominador, multiplicador, piora) in TAXAS_ANOMALIA.items():
+            num, den = colunas[numerador], colunas[denominador]
+            if taxa == 'CAC':
+                # Dia com gasto e sem leads: CAC tomado como o próprio gasto (limite inferior)
+                validos = num > 0
+                x = num[validos] / np.maximum(den[validos], 1)
+            else:
+                validos = den > 0
+                x = num[validos] / den[validos] * multiplicador
+            ids = campanhas[validos]
+            if len(ids) == 0:
+                continue
+
+            estatisticas = self._estatisticas[taxa]
+            z_welford, z_ewma, z_robusto, mediana = estatisticas.pontuar(ids, x)
+            anomalos = (
+                (estatisticas.n[ids] >= self.minimo_dias)
+                & (np.abs(z_robusto) >= self.limiar)
+                & (np.abs(z_welford) >= self.limiar)
+                & (np.abs(z_ewma) >= self.limiar_ewma)
+            )
+            for j in np.flatnonzero(anomalos):
+                direcao = 1 if z_robusto[j] > 0 else -1
+                registro = {
+                    'Data': pd.Timestamp(np.datetime64(int(dias[validos][j]), 'D')),
+                    'Campanha': self.campanhas[ids[j]],
+                    'Metrica': taxa,
+                    'Valor': float(x[j]),
+                    'Mediana': float(mediana[j]),
+                    'z_robusto': float(z_robusto[j]),
+                    'z_ewma': float(z_ewma[j]),
+                    'z_welford': float(z_welford[j]),
+                    'Direcao': 'alta' if direcao > 0 else 'queda',
+                    'Piora': direcao == piora,
+                }
+                novas.append(registro)
+                self.registros.append(registro)
+            estatisticas.atualizar(ids, x)
+        return novas
+
+    # ---------- consulta ----------
+
+    def anomalias(self, desde=None, so_pioras=False):
+        """Anomalias guardadas (mais recentes primeiro) como DataFrame"""
+        colunas = ['Data', 'Campanha', 'Metrica', 'Valor', 'Mediana', 'z_robusto', 'z_ewma', 'z_welford',
+                   'Direcao', 'Piora']
+        tabela = pd.DataFrame(list(self.registros), columns=colunas)
+        if desde is not None:
+            tabela = tabela[tabela['Data'] >= pd.Timestamp(desde)]
+        if so_pioras:
+            tabela = tabela[tabela['Piora'].astype(bool)]
+        intensidade = tabela['z_robusto'].abs()
+        ordem = np.lexsort((-intensidade.to_numpy(), -tabela['Data'].to_numpy().astype(np.int64)))
+        return tabela.iloc[ordem].reset_index(drop=True)
+
+
+def detectar_anomalias(dados, **opcoes):
+    """Passa um lote completo pelo detector e retorna o detector finalizado"""
+    detector = DetectorAnomalias(**opcoes)
+    detector.atualizar(dados)
+    detector.finalizar()
+    return detector
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+API LOCAL DE MÉTRICAS META ADS (asyncio)
+Arquitetura de Performance - ruas.dev.br
+
+Servidor HTTP/1.1 em um único processo e uma única thread de eventos que
+mantém os resultados do analisador em memória e os serve como JSON para o
+site e os dashboards. Cada resposta é serializada uma vez por versão dos
+dados (com a versão gzip ao lado), então uma requisição custa só o parse
+do cabeçalho e um write. ETag + If-None-Match devolvem 304 sem corpo.
+
+Quando a exportação muda (tamanho ou mtime), os dados são recarregados em
+uma thread à parte e trocados de uma vez; as requisições em andamento
+continuam vendo a versão anterior.
+
+Rotas (GET ou HEAD):
+    /saude                              estado, versão e arquivo carregado
+    /metricas                           hoje, 7 dias, 30 dias e todo o período
+    /periodo?dias=N                     analisar_periodo(N)
+    /ranking?por=Leads&k=5&menor=0&gasto_minimo=0
+
+Uso:
+    python api_metricas.py [ARQUIVO] [--host 127.0.0.1] [--porta 8765] [--cubo DIR]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8765
+INTERVALO_RECARGA = 1.0
+TEMPO_OCIOSO = 15.0
+LIMITE_CABECALHO = 16 * 1024
+# Corpo de requisição é descartado; acima disso a conexão é recusada
+LIMITE_CORPO = 64 * 1024
+TAMANHO_MINIMO_GZIP = 256
+MAXIMO_RESPOSTAS_EM_CACHE = 1024
+
+PERIODOS = {'hoje': 1, '7_dias': 7, '30_dias': 30, 'todo': None}
+
+MOTIVOS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Content Too Large', 431: 'Request Header Fields Too Large',
+           503: 'Service Unavailable'}
+
+
+def _json_padrao(valor):
+    """Tipos numpy/pandas para JSON"""
+    if hasattr(valor, 'item'):
+        return valor.item()
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _serializar(dados):
+    return json.dumps(dados, default=_json_padrao, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class _Resposta:
+    """Corpo pronto (e comprimido) de uma rota em uma versão dos dados"""
+    __slots__ = ('status', 'corpo', 'corpo_gzip', 'etag')
+
+    def __init__(self, status, dados, versao):
+        self.status = status
+        self.corpo = _serializar(dados)
+        self.corpo_gzip = gzip.compress(self.corpo, 6) if len(self.corpo) >= TAMANHO_MINIMO_GZIP else None
+        self.etag = f'"{versao}-{hashlib.blake2b(self.corpo, digest_size=8).hexdigest()}"'
+
+
+class _Estado:
+    """Uma versão carregada dos dados; imutável depois de criada"""
+
+    def __init__(self, analisador, assinatura, versao):
+        from ranking import RankingCampanhas
+
+        self.analisador = analisador
+        self.assinatura = assinatura
+        self.versao = versao
+        self.carregado_em = datetime.now().isoformat(timespec='seconds')
+        self.dia = date.today()
+        self.ranking = None
+        if 'Campanha' in analisador.dados.columns:
+            self.ranking = RankingCampanhas().atualizar(analisador.dados)
+            self.ranking.tabela()
+        self.respostas = {}
+
+
+class ServicoMetricas:
+    def __init__(self, arquivo_csv=None, diretorio_cubo=None, intervalo_recarga=INTERVALO_RECARGA):
+        self.arquivo_csv = arquivo_csv
+        self.diretorio_cubo = diretorio_cubo
+        self.intervalo_recarga = intervalo_recarga
+        self.estado = None
+        self.versao = 0
+        self.requisicoes = 0
+
+    # ---------- dados ----------
+
+    def _assinatura(self):
+        try:
+            info = os.stat(self.arquivo_csv)
+        except (OSError, TypeError):
+            return None
+        return (info.st_size, info.st_mtime_ns)
+
+    def carregar(self):
+        """Carrega a exportação e publica uma nova versão (chamado fora do loop)"""
+        from analisador_profissional import AnalisadorMetaProfissional
+
+        assinatura = self._assinatura()
+        analisador = AnalisadorMetaProfissional(arquivo_csv=self.arquivo_csv)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if self.diretorio_cubo:
+                from cubo_rollup import CuboRollup
+                carregado = analisador.carregar_com_cubo(CuboRollup(self.diretorio_cubo))
+            else:
+                carregado = analisador.carregar_dados()
+        if not carregado:
+            return False
+
+        # Assinatura de antes da leitura: uma mudança durante a carga gera nova recarga
+        if assinatura is None:
+            self.arquivo_csv = analisador.arquivo_csv
+            assinatura = self._assinatura()
+        self.versao += 1
+        estado = _Estado(analisador, assinatura, self.versao)
+        # Rotas fixas já saem serializadas
+        for rota in ('/saude', '/metricas', '/ranking'):
+            self._responder(estado, rota, {})
+        self.estado = estado
+        return True
+
+    async def _vigiar(self):
+        """Recarrega quando a exportação muda"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.intervalo_recarga)
+            estado = self.estado
+            # Janelas são relativas a hoje: na virada do dia as respostas expiram
+            if estado is not None and estado.dia != date.today():
+                estado.respostas = {}
+                estado.dia = date.today()
+            if estado is not None and self._assinatura() == estado.assinatura:
+                continue
+            try:
+                if await loop.run_in_executor(None, self.carregar):
+                    print(f"♻️  Dados recarregados (versão {self.versao})")
+            except Exception as e:
+                print(f"⚠️  Recarga falhou: {e}")
+
+    # ---------- rotas ----------
+
+    def _rota_saude(self, estado, parametros):
+        return 200, {
+            'status': 'ok',
+            'versao': estado.versao,
+            'arquivo': estado.analisador.arquivo_csv,
+            'linhas': len(estado.analisador.dados),
+            'modo_agregado': estado.analisador.modo_agregado,
+            'carregado_em': estado.carregado_em,
+        }
+
+    def _rota_metricas(self, estado, parametros):
+        return 200, {nome: estado.analisador.analisar_periodo(dias) for nome, dias in PERIODOS.items()}
+
+    def _rota_periodo(self, estado, parametros):
+        try:
+            dias = int(parametros.get('dias', '7'))
+        except ValueError:
+            return 400, {'erro': "dias deve ser inteiro"}
+        if dias < 1:
+            return 400, {'erro': "dias deve ser >= 1"}
+        return 200, estado.analisador.analisar_periodo(dias)
+
+    def _rota_ranking(self, estado, parametros):
+        if estado.ranking is None:
+            return 404, {'erro': "exportação sem coluna de campanha"}
+        try:
+            k = int(parametros.get('k', '5'))
+            gasto_minimo = float(parametros.get('gasto_minimo', '0'))
+        except ValueError:
+            return 400, {'erro': "k e gasto_minimo devem ser numéricos"}
+        por = parametros.get('por', 'Leads')
+        menor = parametros.get('menor', '0').lower() in ('1', 'true', 'sim')
+        try:
+            top = estado.ranking.top(max(k, 1), por=por, menor=menor, gasto_minimo=gasto_minimo)
+        except KeyError:
+            return 400, {'erro': f"métrica desconhecida: {por}"}
+        # NaN (ex.: CAC sem leads) não é JSON válido
+        top = top.astype(object).where(top.notna(), None)
+        return 200, {'por': por, 'menor': menor, 'campanhas': top.to_dict(orient='records')}
+
+    ROTAS = {
+        '/saude': _rota_saude,
+        '/metricas': _rota_metricas,
+        '/periodo': _rota_periodo,
+        '/ranking': _rota_ranking,
+    }
+
+    def _responder(self, estado, caminho, parametros):
+        """Resposta da rota, serializada uma vez por versão e parâmetros"""
+        chave = (caminho, tuple(sorted(parametros.items())))
+        resposta = estado.respostas.get(chave)
+        if resposta is None:
+            rota = self.ROTAS.get(caminho)
+            if rota is None:
+                return _Resposta(404, {'erro': f"rota desconhecida: {caminho}"}, estado.versao)
+            status, dados = rota(self, estado, parametros)
+            resposta = _Resposta(status, dados, estado.versao)
+            if len(estado.respostas) < MAXIMO_RESPOSTAS_EM_CACHE:
+                estado.respostas[chave] = resposta
+        return resposta
+
+    # ---------- HTTP ----------
+
+    @staticmethod
+    def _cabecalhos(bruto):
+        linhas = bruto.decode('latin-1').split('\r\n')
+        metodo, alvo, protocolo = linhas[0].split(' ', 2)
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            if ':' in linha:
+                nome, valor = linha.split(':', 1)
+                cabecalhos[nome.strip().lower()] = valor.strip()
+        return metodo, alvo, protocolo, cabecalhos
+
+    @staticmethod
+    def _tamanho_corpo(cabecalhos):
+        """Content-Length como inteiro >= 0; ValueError se não for só dígitos"""
+        texto = cabecalhos.get('content-length', '') or '0'
+        if not (texto.isascii() and texto.isdigit()):
+            raise ValueError(f"Content-Length inválido: {texto!r}")
+        return int(texto)
+
+    @staticmethod
+    def _montar(status, corpo=b'', extras=(), manter=True, tamanho=None):
+        linhas = [
+            f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(corpo) if tamanho is None else tamanho}",
+            "Access-Control-Allow-Origin: *",
+            f"Connection: {'keep-alive' if manter else 'close'}",
+            *extras,
+        ]
+        return ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1') + corpo
+
+    async def atender(self, leitor, escritor):
+        """Uma conexão (com keep-alive)"""
+        try:
+            while True:
+                try:
+                    bruto = await asyncio.wait_for(leitor.readuntil(b'\r\n\r\n'), TEMPO_OCIOSO)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    escritor.write(self._montar(431, manter=False))
+                    await escritor.drain()
+                    return
+
+                try:
+                    metodo, alvo, protocolo, cabecalhos = self._cabecalhos(bruto[:-4])
+                    tamanho_corpo = self._tamanho_corpo(cabecalhos)
+                except ValueError:
+                    escritor.write(self._montar(400, manter=False))
+                    await escritor.drain()
+                    return
+                if tamanho_corpo > LIMITE_CORPO:
+                    escritor.write(self._montar(413, manter=False))
+                    await escritor.drain()
+                    return
+
+                # Corpo de requisição não é usado, mas precisa sair do buffer
+                if tamanho_corpo:
+                    try:
+                        await asyncio.wait_for(leitor.readexactly(tamanho_corpo), TEMPO_OCIOSO)
+                    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                        return
+
+                conexao = cabecalhos.get('connection', '').lower()
+                manter = conexao != 'close' and (protocolo == 'HTTP/1.1' or conexao == 'keep-alive')
+                self.requisicoes += 1
+                escritor.write(self._processar(metodo, alvo, cabecalhos, manter))
+                await escritor.drain()
+                if not manter:
+                    return
+        finally:
+            escritor.close()
+
+    def _processar(self, metodo, alvo, cabecalhos, manter):
+        if metodo not in ('GET', 'HEAD'):
+            return self._montar(405, _serializar({'erro': "use GET"}), ["Allow: GET, HEAD"], manter)
+
+        estado = self.estado
+        if estado is None:
+            return self._montar(503, _serializar({'erro': "dados ainda não carregados"}), ["Retry-After: 1"], manter)
+
+        partes = urlsplit(alvo)
+        parametros = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        resposta = self._responder(estado, partes.path.rstrip('/') or '/', parametros)
+
+        extras = [f"ETag: {resposta.etag}", "Cache-Control: no-cache", "Vary: Accept-Encoding"]
+        if resposta.status == 200 and resposta.etag in cabecalhos.get('if-none-match', ''):
+            return self._montar(304, extras=extras, manter=manter, tamanho=0)
+
+        corpo = resposta.corpo
+        if resposta.corpo_gzip is not None and 'gzip' in cabecalhos.get('accept-encoding', ''):
+            corpo = resposta.corpo_gzip
+            extras.append("Content-Encoding: gzip")
+
+        if metodo == 'HEAD':
+            return self._montar(resposta.status, extras=extras, manter=manter, tamanho=len(corpo))
+        return self._montar(resposta.status, corpo, extras, manter)
+
+    async def iniciar(self, host=HOST_PADRAO, porta=PORTA_PADRAO):
+        """Carrega os dados, abre o socket e começa a vigiar a exportação"""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.carregar):
+            raise RuntimeError("não foi possível carregar os dados")
+
+        servidor = await asyncio.start_server(self.atender, host, porta, backlog=4096, limit=LIMITE_CABECALHO)
+        self._vigia = asyncio.create_task(self._vigiar())
+        return servidor
+
+    async def servir(self, host=HOST_PADRAO, porta=PORTA_PADRAO):
+        servidor = await self.iniciar(host, porta)
+        endereco = servidor.sockets[0].getsockname()
+        print(f"🌐 API de métricas em http://{endereco[0]}:{endereco[1]}/metricas "
+              f"({self.arquivo_csv}, versão {self.versao})")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API local de métricas META Ads")
+    parser.add_argument('arquivo', nargs='?', default=None, help="exportação CSV (padrão: procura na pasta atual)")
+    parser.add_argument('--host', default=HOST_PADRAO)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--cubo', metavar='DIR', default=os.environ.get('META_CUBO_DIR'),
+                        help="serve o histórico do cubo em vez de um único CSV")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_RECARGA, help="segundos entre verificações de mudança")
+    args = parser.parse_args()
+
+    if uvloop is not None:
+        uvloop.install()
+
+    servico = ServicoMetricas(args.arquivo, args.cubo, args.intervalo)
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(servico.servir(args.host, args.porta))
+    except KeyboardInterrupt:
+        print(f"\n👋 {servico.requisicoes:,} requisições em {time.perf_counter() - inicio:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
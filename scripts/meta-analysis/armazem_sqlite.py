@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+ARMAZÉM SQLITE META ADS
+Arquitetura de Performance - ruas.dev.br
+
+Alternativa ao cubo em arquivos: os totais por Data x Campanha ficam num
+banco SQLite local (modo WAL) com chave primária (data, campanha) e índice
+(campanha, data). Campanhas são normalizadas numa tabela própria e uma
+tabela de totais diários e outra de totais mensais por campanha são
+mantidas a cada carga: qualquer janela de período lê no máximo uma linha por
+dia, e rankings de anos de histórico somam meses inteiros já consolidados
+(só os meses incompletos das pontas saem da tabela detalhada). Nada do
+histórico precisa ser carregado na memória.
+
+A carga é uma única transação (executemany) que substitui todo o período
+coberto pela exportação, como no cubo: reenviar uma exportação, ou uma que
+reescreve os últimos dias, não duplica nada, e campanhas ausentes nela
+(removidas ou renomeadas no META) saem desses dias.
+
+Uso:
+    python armazem_sqlite.py absorver dados.csv [outro.csv ...] [--banco meta_ads.db]
+    python armazem_sqlite.py consulta "SELECT Campanha, SUM(Leads) FROM fatos GROUP BY 1" [--banco ...]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cache_dados import CacheDados
+from cubo_rollup import COLUNAS_CHAVE, COLUNAS_CUBO, CuboRollup
+from janelas import METRICAS_PADRAO, MotorJanelas, _para_dia
+
+CAMINHO_PADRAO = os.environ.get('META_SQLITE', 'meta_ads.db')
+LINHAS_POR_LOTE = 100_000
+
+# Colunas do banco (minúsculas) para os nomes padronizados
+COLUNAS_SQL = {coluna: coluna.lower() for coluna in COLUNAS_CUBO}
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS campanhas (
+    id   INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS metricas (
+    data        TEXT    NOT NULL,
+    campanha_id INTEGER NOT NULL REFERENCES campanhas(id),
+    {', '.join(f'{c} REAL NOT NULL DEFAULT 0' for c in COLUNAS_SQL.values())},
+    PRIMARY KEY (data, campanha_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metricas_campanha_data ON metricas (campanha_id, data);
+CREATE TABLE IF NOT EXISTS totais_diarios (
+    data   TEXT PRIMARY KEY,
+    linhas INTEGER NOT NULL,
+    {', '.join(f'{c} REAL NOT NULL' for c in COLUNAS_SQL.values())}
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS totais_mensais (
+    mes         TEXT    NOT NULL,
+    campanha_id INTEGER NOT NULL,
+    linhas      INTEGER NOT NULL,
+    {', '.join(f'{c} REAL NOT NULL' for c in COLUNAS_SQL.values())},
+    PRIMARY KEY (mes, campanha_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS absorvidos (
+    hash         TEXT PRIMARY KEY,
+    arquivo      TEXT,
+    linhas       INTEGER,
+    absorvido_em TEXT
+);
+CREATE VIEW IF NOT EXISTS fatos AS
+    SELECT m.data AS Data, c.nome AS Campanha,
+           {', '.join(f'm.{sql} AS {nome}' for nome, sql in COLUNAS_SQL.items())}
+    FROM metricas m JOIN campanhas c ON c.id = m.campanha_id;
+"""
+
+_SOMAS = ', '.join(f'TOTAL({c})' for c in COLUNAS_SQL.values())
+_COLUNAS = ', '.join(COLUNAS_SQL.values())
+
+
+def _texto_dia(valor):
+    """date/datetime/Timestamp/str -> 'AAAA-MM-DD' (como gravado no banco)"""
+    return str(_para_dia(valor))
+
+
+def _filtro_periodo(inicio, fim, coluna='data'):
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append(f'{coluna} >= ?')
+        parametros.append(_texto_dia(inicio))
+    if fim is not None:
+        condicoes.append(f'{coluna} <= ?')
+        parametros.append(_texto_dia(fim))
+    return (' WHERE ' + ' AND '.join(condicoes)) if condicoes else '', parametros
+
+
+class JanelasSQLite(MotorJanelas):
+    """MotorJanelas respondido pela tabela de totais diários do armazém"""
+
+    def __init__(self, armazem, metricas=METRICAS_PADRAO):
+        self.armazem = armazem
+        self.metricas = [m for m in metricas if m in COLUNAS_SQL]
+        self.inicio, self.fim = armazem.extremos()
+
+    def intervalo(self, inicio=None, fim=None):
+        """Totais entre `inicio` e `fim` (inclusive); None = sem limite"""
+        filtro, parametros = _filtro_periodo(inicio, fim)
+        colunas = ', '.join(f'TOTAL({COLUNAS_SQL[m]})' for m in self.metricas)
+        linha = self.armazem.conexao.execute(
+            f'SELECT COUNT(DISTINCT data), TOTAL(linhas), {colunas} FROM totais_diarios{filtro}', parametros
+        ).fetchone()
+
+        totais = dict(zip(self.metricas, linha[2:]))
+        totais['dias'] = int(linha[0])
+        totais['linhas'] = int(linha[1])
+        return totais
+
+
+class ArmazemSQLite:
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute('PRAGMA temp_store=MEMORY')
+        self.conexao.executescript(ESQUEMA)
+        self._hashes = CacheDados()
+
+    def fechar(self):
+        self.conexao.close()
+
+    def ja_absorvido(self, caminho):
+        """True se este conteúdo de arquivo já foi absorvido"""
+        hash_arquivo = self._hashes.hash_arquivo(caminho)
+        return self.conexao.execute('SELECT 1 FROM absorvidos WHERE hash = ?', (hash_arquivo,)).fetchone() is not None
+
+    # ---------- escrita ----------
+
+    def _ids_campanhas(self, nomes):
+        """Garante as campanhas na tabela e devolve {nome: id}"""
+        self.conexao.executemany('INSERT OR IGNORE INTO campanhas (nome) VALUES (?)', ((n,) for n in nomes))
+        return dict((nome, id_) for id_, nome in self.conexao.execute('SELECT id, nome FROM campanhas'))
+
+    def absorver(self, dados, origem=None):
+        """Substitui o período da exportação (uma transação); retorna as linhas Data x Campanha"""
+        novos = CuboRollup.consolidar(dados)
+        if novos.empty:
+            return 0
+
+        codigos, nomes = pd.factorize(novos['Campanha'])
+        datas = novos['Data'].dt.strftime('%Y-%m-%d').to_numpy()
+        colunas = [novos[c].to_numpy(dtype=np.float64) for c in COLUNAS_CUBO]
+        inserir = (
+            f"INSERT OR REPLACE INTO metricas (data, campanha_id, {', '.join(COLUNAS_SQL.values())}) "
+            f"VALUES ({', '.join('?' * (2 + len(COLUNAS_SQL)))})"
+        )
+
+        with self.conexao:
+            # O período inteiro sai antes: chaves ausentes na exportação não ficam para trás
+            self.conexao.execute('DELETE FROM metricas WHERE data BETWEEN ? AND ?', (datas.min(), datas.max()))
+            ids = self._ids_campanhas(nomes)
+            ids_por_codigo = np.array([ids[n] for n in nomes], dtype=np.int64)[codigos]
+
+            for inicio in range(0, len(novos), LINHAS_POR_LOTE):
+                fatia = slice(inicio, inicio + LINHAS_POR_LOTE)
+                self.conexao.executemany(inserir, zip(
+                    datas[fatia].tolist(), ids_por_codigo[fatia].tolist(), *(c[fatia].tolist() for c in colunas)
+                ))
+
+            # Só os dias (e meses) tocados pela carga têm os totais refeitos
+            self.conexao.execute('DELETE FROM totais_diarios WHERE data BETWEEN ? AND ?', (datas.min(), datas.max()))
+            self.conexao.execute('DELETE FROM totais_mensais WHERE mes BETWEEN ? AND ?',
+                                 (datas.min()[:7], datas.max()[:7]))
+            self.conexao.execute(
+                f'INSERT OR REPLACE INTO totais_diarios '
+                f'SELECT data, COUNT(*), {_SOMAS} FROM metricas WHERE data BETWEEN ? AND ? GROUP BY data',
+                (datas.min(), datas.max()),
+            )
+            self.conexao.execute(
+                f'INSERT OR REPLACE INTO totais_mensais '
+                f'SELECT substr(data, 1, 7), campanha_id, COUNT(*), {_SOMAS} FROM metricas '
+                f'WHERE data BETWEEN ? AND ? GROUP BY 1, +campanha_id',
+                (datas.min()[:7] + '-01', datas.max()[:7] + '-31'),
+            )
+
+            if origem:
+                self.conexao.execute(
+                    'INSERT OR REPLACE INTO absorvidos VALUES (?, ?, ?, ?)',
+                    (self._hashes.hash_arquivo(origem), os.path.abspath(origem), len(novos),
+                     datetime.now().isoformat(timespec='seconds')),
+                )
+        return len(novos)
+
+    # ---------- leitura ----------
+
+    def extremos(self):
+        """(primeiro dia, último dia) como datetime64[D]; (None, None) se vazio"""
+        inicio, fim = self.conexao.execute('SELECT MIN(data), MAX(data) FROM totais_diarios').fetchone()
+        if inicio is None:
+            return None, None
+        return np.datetime64(inicio, 'D'), np.datetime64(fim, 'D')
+
+    def ultima_data(self):
+        fim = self.extremos()[1]
+        return pd.Timestamp(fim) if fim is not None else None
+
+    def janelas(self):
+        """Interface de MotorJanelas com as janelas calculadas no SQLite"""
+        return JanelasSQLite(self)
+
+    def consulta(self, sql, parametros=()):
+        """Consulta ad hoc (ex.: sobre a view `fatos`) como DataFrame"""
+        return pd.read_sql_query(sql, self.conexao, params=parametros)
+
+    def _com_datas(self, tabela):
+        if 'Data' in tabela.columns:
+            tabela['Data'] = pd.to_datetime(tabela['Data'], format='%Y-%m-%d')
+        return tabela
+
+    def dados(self, inicio=None, fim=None):
+        """Linhas Data x Campanha entre `inicio` e `fim`"""
+        filtro, parametros = _filtro_periodo(inicio, fim, 'Data')
+        return self._com_datas(self.consulta(
+            f"SELECT {', '.join(COLUNAS_CHAVE + COLUNAS_CUBO)} FROM fatos{filtro} ORDER BY Data, Campanha", parametros
+        ))
+
+    def por_campanha(self, inicio=None, fim=None):
+        """Totais por campanha: meses inteiros de totais_mensais + pontas de metricas"""
+        inicio = pd.Timestamp(inicio).normalize() if inicio is not None else None
+        fim = pd.Timestamp(fim).normalize() if fim is not None else None
+
+        # Limites como texto; '' e '~' ficam antes/depois de qualquer data
+        de = inicio.strftime('%Y-%m-%d') if inicio is not None else ''
+        ate = fim.strftime('%Y-%m-%d') if fim is not None else '~'
+
+        # Meses completamente dentro de [inicio, fim]
+        primeiro_mes = '' if inicio is None else (
+            inicio if inicio.day == 1 else inicio + pd.offsets.MonthBegin()).strftime('%Y-%m')
+        ultimo_mes = '~' if fim is None else (
+            fim if fim.is_month_end else fim - pd.offsets.MonthEnd()).strftime('%Y-%m')
+
+        detalhe = f'SELECT campanha_id, {_COLUNAS} FROM metricas WHERE data >= ? AND data <= ?'
+        if primeiro_mes > ultimo_mes:
+            partes, parametros = [detalhe], [de, ate]
+        else:
+            partes = [
+                f'SELECT campanha_id, {_COLUNAS} FROM totais_mensais WHERE mes >= ? AND mes <= ?',
+                f'SELECT campanha_id, {_COLUNAS} FROM metricas WHERE data >= ? AND data < ?',
+                f'SELECT campanha_id, {_COLUNAS} FROM metricas WHERE data > ? AND data <= ?',
+            ]
+            parametros = [primeiro_mes, ultimo_mes, de, primeiro_mes + '-01', ultimo_mes + '-31', ate]
+
+        # "+campanha_id": agrupa com sorter em vez de varrer o índice por campanha
+        somas = ', '.join(f'TOTAL({sql}) AS {nome}' for nome, sql in COLUNAS_SQL.items())
+        return self.consulta(
+            f'SELECT c.nome AS Campanha, s.* FROM ('
+            f'SELECT campanha_id, {somas} FROM ({" UNION ALL ".join(partes)}) GROUP BY +campanha_id'
+            f') s JOIN campanhas c ON c.id = s.campanha_id ORDER BY c.nome',
+            parametros,
+        ).drop(columns='campanha_id')
+
+    def por_dia(self, inicio=None, fim=None):
+        filtro, parametros = _filtro_periodo(inicio, fim)
+        colunas = ', '.join(f'{sql} AS {nome}' for nome, sql in COLUNAS_SQL.items())
+        return self._com_datas(self.consulta(
+            f'SELECT data AS Data, {colunas} FROM totais_diarios{filtro} ORDER BY data', parametros
+        ))
+
+    def ranking(self, inicio=None, fim=None):
+        """RankingCampanhas a partir do GROUP BY feito no banco"""
+        from ranking import RankingCampanhas
+
+        return RankingCampanhas().atualizar(self.por_campanha(inicio, fim))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Armazém SQLite das exportações META Ads")
+    parser.add_argument('--banco', default=CAMINHO_PADRAO, help="arquivo SQLite (padrão: META_SQLITE ou meta_ads.db)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p = sub.add_parser('absorver', help="carrega exportações CSV no banco")
+    p.add_argument('arquivos', nargs='+')
+    p = sub.add_parser('consulta', help="executa um SELECT e imprime o resultado")
+    p.add_argument('sql')
+    args = parser.parse_args()
+
+    armazem = ArmazemSQLite(args.banco)
+    if args.comando == 'consulta':
+        print(armazem.consulta(args.sql).to_string(index=False))
+        return 0
+
+    from analisador_profissional import AnalisadorMetaProfissional
+
+    for caminho in args.arquivos:
+        if armazem.ja_absorvido(caminho):
+            print(f"♻️  {caminho} já está no banco")
+            continue
+        analisador = AnalisadorMetaProfissional(arquivo_csv=caminho)
+        if not analisador.carregar_dados():
+            return 1
+        print(f"🗄️  {armazem.absorver(analisador.dados, origem=caminho)} linhas Data x Campanha em {args.banco}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK DOS ANALISADORES META ADS
+Arquitetura de Performance - ruas.dev.br
+
+Gera exportações sintéticas (gerador_dados.py) e mede cada etapa do
+pipeline: tempo de parede, tempo de CPU e pico de memória (tracemalloc, numa
+segunda execução para não distorcer o tempo). O resultado vai para um JSON
+que pode ser comparado com uma execução anterior para pegar regressões.
+
+Uso:
+    python benchmark.py                              # 10k, 1M e 10M linhas
+    python benchmark.py --tamanhos 10k 1M --saida bench_resultados.json
+    python benchmark.py --tamanhos 1M --comparar bench_anterior.json --tolerancia 0.2
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TAMANHOS_PADRAO = ['10k', '1M', '10M']
+DIRETORIO_DADOS = '.bench_dados'
+
+
+def _rss_maximo_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def medir(etapa, funcao, linhas, medir_memoria=True, preparar=None):
+    """Executa `funcao` e devolve as medidas da etapa
+
+    `preparar` roda antes de cada execução, fora da medida (ex.: esvaziar a
+    memorização da sessão para que a segunda execução refaça o trabalho).
+    """
+    if preparar:
+        preparar()
+    gc.collect()
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        retorno = funcao()
+    segundos = time.perf_counter() - inicio
+    cpu = time.process_time() - inicio_cpu
+
+    # Cargas devolvem False quando o analisador não entende o arquivo
+    ok = retorno is not False
+
+    pico_mb = None
+    if medir_memoria and ok:
+        if preparar:
+            preparar()
+        gc.collect()
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcao()
+        pico_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    return {
+        'etapa': etapa,
+        'ok': ok,
+        'linhas': linhas,
+        'segundos': round(segundos, 6),
+        'cpu_segundos': round(cpu, 6),
+        'linhas_por_segundo': round(linhas / segundos) if segundos > 0 else None,
+        'pico_memoria_mb': round(pico_mb, 2) if pico_mb is not None else None,
+        'rss_maximo_mb': round(_rss_maximo_mb(), 2) if resource else None,
+    }
+
+
+def preparar_arquivo(linhas, campanhas, dias, idioma, sujeira, diretorio):
+    """Gera (ou reaproveita) a exportação sintética de um tamanho"""
+    from gerador_dados import gerar_exportacao
+
+    os.makedirs(diretorio, exist_ok=True)
+    hoje = datetime.now().strftime('%Y%m%d')
+    caminho = os.path.join(diretorio, f"meta_{linhas}_{campanhas}c_{dias}d_{idioma}_{sujeira}_{hoje}.csv")
+    if not os.path.exists(caminho):
+        print(f"   🧪 gerando {linhas:,} linhas...")
+        gerar_exportacao(caminho, linhas, campanhas, dias, idioma, sujeira)
+    return caminho
+
+
+def executar_tamanho(caminho, linhas, medir_memoria, saida_temporaria):
+    """Mede todas as etapas para um arquivo"""
+    from analisador_meta import AnalisadorMetaAds
+    from analisador_profissional import AnalisadorMetaProfissional
+
+    resultados = []
+    prof = AnalisadorMetaProfissional(arquivo_csv=caminho)
+    meta = AnalisadorMetaAds(arquivo_csv=caminho, usar_cache=False)
+
+    etapas = [
+        ('profissional.carregar_dados', lambda: prof.carregar_dados(streaming=False, usar_cache=False)),
+        ('profissional.carregar_dados_streaming', lambda: prof.carregar_dados(streaming=True, usar_cache=False)),
+        ('profissional.carregar_dados_cache', lambda: prof.carregar_dados(streaming=False, usar_cache=True)),
+        ('profissional.analisar_periodo', lambda: [prof.analisar_periodo(d) for d in (1, 7, 30, 365)]),
+        ('profissional.previsao', prof.previsao),
+        ('profissional.anomalias', prof.anomalias),
+        ('profissional.gerar_relatorio_completo', prof.gerar_relatorio_completo),
+        ('profissional.exportar_relatorio_detalhado',
+         lambda: prof.exportar_relatorio_detalhado(os.path.join(saida_temporaria, 'detalhado.csv'))),
+        ('profissional.salvar_metricas_chave',
+         lambda: prof.salvar_metricas_chave(os.path.join(saida_temporaria, 'metricas.txt'))),
+        ('meta_ads.carregar_dados', meta.carregar_dados),
+        ('meta_ads.calcular_metricas', meta.calcular_metricas),
+    ]
+
+    # O cache quente precisa de uma carga prévia que o preencha
+    with contextlib.redirect_stdout(io.StringIO()):
+        prof.carregar_dados(streaming=False, usar_cache=True)
+
+    falhou = set()
+    for etapa, funcao in etapas:
+        # Etapas de um analisador cuja carga falhou não são medidas
+        analisador = etapa.split('.')[0]
+        if analisador in falhou:
+            print(f"   {etapa:45}   pulada (carga falhou)")
+            continue
+
+        # Sem isso as etapas memorizadas mediriam só a consulta à sessão
+        preparar = prof.sessao.invalidar if analisador == 'profissional' else None
+        medida = medir(etapa, funcao, linhas, medir_memoria, preparar)
+        resultados.append(medida)
+        if not medida['ok']:
+            falhou.add(analisador)
+            print(f"   {etapa:45} ❌ falhou")
+            continue
+
+        memoria = f" | pico {medida['pico_memoria_mb']:.1f} MB" if medida['pico_memoria_mb'] is not None else ""
+        print(f"   {etapa:45} {medida['segundos']:9.3f}s{memoria}")
+
+    return resultados
+
+
+def comparar(atual, anterior, tolerancia):
+    """Imprime a razão de tempo por etapa; retorna as regressões"""
+    base = {(r['linhas'], r['etapa']): r for r in anterior['resultados']}
+    regressoes = []
+
+    print(f"\n📊 COMPARAÇÃO (tolerância {tolerancia:.0%}):")
+    if atual['parametros'] != anterior.get('parametros'):
+        print(f"   ⚠️  parâmetros diferentes da execução anterior: {anterior.get('parametros')}")
+    for r in atual['resultados']:
+        antes = base.get((r['linhas'], r['etapa']))
+        if not r['ok'] or not antes or not antes.get('ok', True) or not antes['segundos']:
+            continue
+        razao = r['segundos'] / antes['segundos']
+        marca = "⚠️ " if razao > 1 + tolerancia else "✅"
+        print(f"   {marca} {r['linhas']:>10,} {r['etapa']:45} {razao:6.2f}x")
+        if razao > 1 + tolerancia:
+            regressoes.append((r['linhas'], r['etapa'], razao))
+
+    return regressoes
+
+
+def main():
+    from gerador_dados import quantidade
+
+    parser = argparse.ArgumentParser(description="Benchmark das etapas dos analisadores META Ads")
+    parser.add_argument('--tamanhos', nargs='+', default=TAMANHOS_PADRAO, help="ex.: 10k 1M 10M")
+    parser.add_argument('--campanhas', type=int, default=200)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--idioma', choices=['pt', 'en'], default='en')
+    parser.add_argument('--sujeira', type=float, default=0.001)
+    parser.add_argument('--dados', default=DIRETORIO_DADOS, help="pasta das exportações geradas")
+    parser.add_argument('--saida', default='bench_resultados.json')
+    parser.add_argument('--sem-memoria', action='store_true', help="não mede pico de memória (mais rápido)")
+    parser.add_argument('--comparar', metavar='JSON', help="resultado anterior para comparação")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="piora aceitável (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Cache isolado para não misturar com o uso normal
+    os.environ.setdefault('META_CACHE_DIR', os.path.join(args.dados, 'cache'))
+
+    import numpy as np
+    import pandas as pd
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'parametros': {
+            'campanhas': args.campanhas,
+            'dias': args.dias,
+            'idioma': args.idioma,
+            'sujeira': args.sujeira,
+        },
+        'resultados': [],
+    }
+
+    with tempfile.TemporaryDirectory() as saida_temporaria:
+        for tamanho in args.tamanhos:
+            linhas = quantidade(tamanho)
+            print(f"\n⏱️  {linhas:,} LINHAS")
+            caminho = preparar_arquivo(linhas, args.campanhas, args.dias, args.idioma, args.sujeira, args.dados)
+            relatorio['resultados'].extend(
+                executar_tamanho(caminho, linhas, not args.sem_memoria, saida_temporaria)
+            )
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados salvos: {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        if comparar(relatorio, anterior, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+CACHE DE EXPORTAÇÕES META ADS
+Arquitetura de Performance - ruas.dev.br
+
+Guarda em disco o DataFrame já padronizado, tipado e com colunas calculadas,
+em formato colunar (Parquet quando pyarrow está instalado, pickle caso
+contrário). Execuções seguintes sobre o mesmo arquivo pulam o parser de CSV.
+
+A chave é o hash do conteúdo do arquivo. Caminho, tamanho e mtime ficam no
+índice para evitar recalcular o hash quando o arquivo não mudou.
+
+Cada entrada é só o seu arquivo no diretório: o tamanho e o último acesso
+(mtime, renovado a cada acerto) vêm do próprio arquivo, então processos do
+lote que leem e gravam o cache ao mesmo tempo não disputam um índice
+compartilhado. O índice guarda apenas as assinaturas dos CSVs e é
+atualizado sob trava (fcntl), relendo e mesclando o que outros processos
+gravaram; um acerto no cache não escreve nada.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava; o pior caso é recalcular um hash
+    fcntl = None
+
+try:
+    import pyarrow  # noqa: F401
+    FORMATO_PADRAO = 'parquet'
+except ImportError:
+    FORMATO_PADRAO = 'pickle'
+
+# Incrementar quando a padronização/tipagem mudar, para invalidar caches antigos
+VERSAO_CACHE = 4
+
+DIRETORIO_PADRAO = os.environ.get('META_CACHE_DIR', '.cache_meta')
+LIMITE_PADRAO_BYTES = int(os.environ.get('META_CACHE_LIMITE_MB', '2048')) * 1024 * 1024
+TAMANHO_BLOCO_HASH = 4 * 1024 * 1024
+
+
+class CacheDados:
+    def __init__(self, diretorio=DIRETORIO_PADRAO, limite_bytes=LIMITE_PADRAO_BYTES, formato=FORMATO_PADRAO):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self.formato = formato
+        self.arquivo_indice = os.path.join(diretorio, 'indice.json')
+        self._indice = None
+
+    # ---------- índice ----------
+
+    def _carregar_indice(self):
+        if self._indice is None:
+            try:
+                with open(self.arquivo_indice, 'r', encoding='utf-8') as f:
+                    self._indice = {'arquivos': json.load(f).get('arquivos', {})}
+            except (OSError, ValueError, AttributeError):
+                self._indice = {'arquivos': {}}
+        return self._indice
+
+    def _salvar_indice(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = self.arquivo_indice + f'.{os.getpid()}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f)
+        os.replace(temporario, self.arquivo_indice)
+
+    @contextlib.contextmanager
+    def _travado(self):
+        """Trava exclusiva entre processos para ler-mesclar-gravar o índice"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.arquivo_indice + '.trava', 'a') as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _registrar_assinatura(self, caminho_abs, assinatura):
+        """Grava uma assinatura sem apagar as que outros processos gravaram"""
+        with self._travado():
+            self._indice = None
+            self._carregar_indice()['arquivos'][caminho_abs] = assinatura
+            self._salvar_indice()
+
+    # ---------- chave ----------
+
+    @staticmethod
+    def hash_conteudo(caminho):
+        """Hash BLAKE2b do conteúdo do arquivo"""
+        h = hashlib.blake2b(digest_size=16)
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+                h.update(bloco)
+        return h.hexdigest()
+
+    def hash_arquivo(self, caminho):
+        """Hash do conteúdo, refeito só quando tamanho/mtime mudarem"""
+        indice = self._carregar_indice()
+        caminho_abs = os.path.abspath(caminho)
+        info = os.stat(caminho_abs)
+        assinatura = indice['arquivos'].get(caminho_abs)
+
+        if assinatura and assinatura['tamanho'] == info.st_size and assinatura['mtime'] == info.st_mtime_ns:
+            return assinatura['hash']
+
+        conteudo = self.hash_conteudo(caminho_abs)
+        self._registrar_assinatura(caminho_abs, {
+            'tamanho': info.st_size,
+            'mtime': info.st_mtime_ns,
+            'hash': conteudo,
+        })
+        return conteudo
+
+    def chave(self, caminho, variante='padrao'):
+        """Chave do cache para um arquivo"""
+        return f"{self.hash_arquivo(caminho)}-{variante}-v{VERSAO_CACHE}"
+
+    def _caminho_entrada(self, chave, formato):
+        extensao = 'parquet' if formato == 'parquet' else 'pkl'
+        return os.path.join(self.diretorio, f"{chave}.{extensao}")
+
+    def _entradas(self):
+        """[(arquivo, tamanho, ultimo_acesso)] de todas as entradas no diretório"""
+        entradas = []
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return entradas
+        for nome in nomes:
+            if not nome.endswith(('.parquet', '.pkl')):
+                continue
+            arquivo = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(arquivo)
+            except OSError:
+                continue  # removida por outro processo
+            entradas.append((arquivo, info.st_size, info.st_mtime))
+        return entradas
+
+    # ---------- leitura/escrita ----------
+
+    def carregar(self, caminho, variante='padrao'):
+        """Retorna o DataFrame em cache ou None"""
+        try:
+            chave = self.chave(caminho, variante)
+        except OSError:
+            return None
+
+        for formato in (self.formato, 'pickle' if self.formato == 'parquet' else 'parquet'):
+            arquivo = self._caminho_entrada(chave, formato)
+            if os.path.exists(arquivo):
+                break
+        else:
+            return None
+
+        try:
+            if formato == 'parquet':
+                dados = pd.read_parquet(arquivo)
+            else:
+                dados = pd.read_pickle(arquivo)
+        except Exception:
+            # Entrada corrompida, ou evictada por outro processo durante a leitura
+            with contextlib.suppress(OSError):
+                os.remove(arquivo)
+            return None
+
+        # O mtime é o último acesso usado na evicção
+        with contextlib.suppress(OSError):
+            os.utime(arquivo)
+        return dados
+
+    def salvar(self, caminho, dados, variante='padrao'):
+        """Grava o DataFrame no cache e aplica a política de tamanho"""
+        chave = self.chave(caminho, variante)
+        os.makedirs(self.diretorio, exist_ok=True)
+
+        arquivo = self._caminho_entrada(chave, self.formato)
+        temporario = arquivo + f'.{os.getpid()}.tmp'
+        if self.formato == 'parquet':
+            dados.to_parquet(temporario, index=False)
+        else:
+            dados.to_pickle(temporario)
+        os.replace(temporario, arquivo)
+        self._evictar(manter=arquivo)
+
+    def _evictar(self, manter=None):
+        """Remove as entradas menos usadas até caber no limite"""
+        entradas = self._entradas()
+        total = sum(tamanho for _, tamanho, _ in entradas)
+
+        for arquivo, tamanho, _ in sorted(entradas, key=lambda entrada: entrada[2]):
+            if total <= self.limite_bytes:
+                break
+            if arquivo == manter:
+                continue
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+            total -= tamanho
+
+    def limpar(self):
+        """Apaga todo o cache"""
+        for arquivo, _, _ in self._entradas():
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+        with self._travado():
+            self._indice = {'arquivos': {}}
+            self._salvar_indice()
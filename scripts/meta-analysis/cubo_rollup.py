@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+CUBO DATA x CAMPANHA
+Arquitetura de Performance - ruas.dev.br
+
+Guarda em disco os totais de Gasto/Leads/Cliques/Impressoes/Alcance por
+Data x Campanha, particionados por mês. Cada nova exportação é consolidada e
+substitui no cubo todo o período que cobre (da primeira à última data dela):
+reenviar a mesma exportação, ou uma que reescreve os últimos dias como o
+META faz, não duplica nada, e uma campanha removida ou renomeada no META
+não deixa o gasto antigo para trás nesses dias. Só as partições dos meses
+desse período são lidas e regravadas (um cubo por conta de anúncio).
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from cache_dados import FORMATO_PADRAO, CacheDados
+
+COLUNAS_CHAVE = ['Data', 'Campanha']
+COLUNAS_CUBO = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance']
+
+DIRETORIO_PADRAO = os.environ.get('META_CUBO_DIR', 'cubo_meta')
+
+
+class CuboRollup:
+    def __init__(self, diretorio=DIRETORIO_PADRAO, formato=FORMATO_PADRAO):
+        self.diretorio = diretorio
+        self.formato = formato
+        self.arquivo_manifesto = os.path.join(diretorio, 'manifesto.json')
+        self.manifesto = self._carregar_manifesto()
+        self._hashes = CacheDados()
+
+    # ---------- manifesto ----------
+
+    def _carregar_manifesto(self):
+        try:
+            with open(self.arquivo_manifesto, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'absorvidos': {}, 'particoes': {}}
+
+    def _salvar_manifesto(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = self.arquivo_manifesto + f'.{os.getpid()}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.manifesto, f, indent=1)
+        os.replace(temporario, self.arquivo_manifesto)
+
+    def ja_absorvido(self, caminho):
+        """True se este conteúdo de arquivo já foi absorvido"""
+        return self._hashes.hash_arquivo(caminho) in self.manifesto['absorvidos']
+
+    # ---------- partições ----------
+
+    def _caminho_particao(self, mes, formato=None):
+        formato = formato or self.formato
+        extensao = 'parquet' if formato == 'parquet' else 'pkl'
+        return os.path.join(self.diretorio, f"{mes}.{extensao}")
+
+    def _ler_particao(self, mes):
+        info = self.manifesto['particoes'].get(mes)
+        if not info:
+            return None
+        caminho = self._caminho_particao(mes, info['formato'])
+        if info['formato'] == 'parquet':
+            return pd.read_parquet(caminho)
+        return pd.read_pickle(caminho)
+
+    def _gravar_particao(self, mes, dados):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho_particao(mes)
+        temporario = caminho + f'.{os.getpid()}.tmp'
+        if self.formato == 'parquet':
+            dados.to_parquet(temporario, index=False)
+        else:
+            dados.to_pickle(temporario)
+        os.replace(temporario, caminho)
+
+        anterior = self.manifesto['particoes'].get(mes)
+        if anterior and anterior['formato'] != self.formato:
+            try:
+                os.remove(self._caminho_particao(mes, anterior['formato']))
+            except OSError:
+                pass
+
+        self.manifesto['particoes'][mes] = {
+            'formato': self.formato,
+            'linhas': len(dados),
+            'inicio': str(dados['Data'].min().date()),
+            'fim': str(dados['Data'].max().date()),
+        }
+
+    def _remover_particao(self, mes):
+        info = self.manifesto['particoes'].pop(mes, None)
+        if info:
+            try:
+                os.remove(self._caminho_particao(mes, info['formato']))
+            except OSError:
+                pass
+
+    # ---------- escrita ----------
+
+    @staticmethod
+    def consolidar(dados):
+        """Soma as linhas brutas (ou já agregadas) por Data x Campanha"""
+        metricas = [c for c in COLUNAS_CUBO if c in dados.columns]
+        chave = pd.DataFrame({
+            'Data': pd.to_datetime(dados['Data'], errors='coerce').dt.normalize(),
+            'Campanha': dados['Campanha'].astype(str) if 'Campanha' in dados.columns else '(sem nome)',
+        })
+        consolidado = pd.concat([chave, dados[metricas]], axis=1).dropna(subset=['Data'])
+        consolidado = consolidado.groupby(COLUNAS_CHAVE, observed=True)[metricas].sum()
+
+        # Métricas ausentes na exportação entram zeradas para manter o schema fixo
+        for col in COLUNAS_CUBO:
+            if col not in consolidado.columns:
+                consolidado[col] = 0.0
+        return consolidado[COLUNAS_CUBO].astype('float64').reset_index()
+
+    def absorver(self, dados, origem=None):
+        """Grava uma exportação no cubo substituindo o período que ela cobre (idempotente)"""
+        novos = self.consolidar(dados)
+
+        if not novos.empty:
+            inicio, fim = novos['Data'].min(), novos['Data'].max()
+            partes = dict(tuple(novos.groupby(novos['Data'].dt.strftime('%Y-%m'))))
+            # Meses do período, inclusive os que a exportação traz vazios
+            meses = set(partes) | {
+                mes for mes in self.manifesto['particoes']
+                if inicio.strftime('%Y-%m') <= mes <= fim.strftime('%Y-%m')
+            }
+
+            for mes in sorted(meses):
+                parte = partes.get(mes, novos.iloc[:0])
+                atual = self._ler_particao(mes)
+                if atual is not None:
+                    # Todo o período da exportação é substituído, não só as chaves reenviadas:
+                    # campanhas ausentes nela (removidas/renomeadas no META) saem desses dias
+                    atual = atual[(atual['Data'] < inicio) | (atual['Data'] > fim)]
+                    parte = pd.concat([atual, parte], ignore_index=True)
+                if parte.empty:
+                    self._remover_particao(mes)
+                else:
+                    self._gravar_particao(mes, parte.sort_values(COLUNAS_CHAVE, ignore_index=True))
+
+        if origem:
+            self.manifesto['absorvidos'][self._hashes.hash_arquivo(origem)] = {
+                'arquivo': os.path.abspath(origem),
+                'linhas': len(novos),
+            }
+        self._salvar_manifesto()
+        return len(novos)
+
+    # ---------- leitura ----------
+
+    def dados(self, inicio=None, fim=None):
+        """Linhas do cubo entre `inicio` e `fim`, lendo só as partições necessárias"""
+        mes_inicio = pd.Timestamp(inicio).strftime('%Y-%m') if inicio else None
+        mes_fim = pd.Timestamp(fim).strftime('%Y-%m') if fim else None
+
+        partes = []
+        for mes in sorted(self.manifesto['particoes']):
+            if (mes_inicio and mes < mes_inicio) or (mes_fim and mes > mes_fim):
+                continue
+            partes.append(self._ler_particao(mes))
+
+        if not partes:
+            return pd.DataFrame(columns=COLUNAS_CHAVE + COLUNAS_CUBO)
+
+        cubo = pd.concat(partes, ignore_index=True)
+        if inicio:
+            cubo = cubo[cubo['Data'] >= pd.Timestamp(inicio)]
+        if fim:
+            cubo = cubo[cubo['Data'] <= pd.Timestamp(fim)]
+        return cubo.reset_index(drop=True)
+
+    def por_campanha(self, inicio=None, fim=None):
+        return self.dados(inicio, fim).groupby('Campanha')[COLUNAS_CUBO].sum().reset_index()
+
+    def por_dia(self, inicio=None, fim=None):
+        return self.dados(inicio, fim).groupby('Data')[COLUNAS_CUBO].sum().reset_index()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+DIMENSÕES DE QUEBRA E AGREGAÇÃO MULTI-CHAVE
+Arquitetura de Performance - ruas.dev.br
+
+Exportações com quebras (conjunto de anúncios, anúncio, idade, gênero,
+plataforma, posicionamento, dispositivo, região, país) mantêm essas colunas
+como categóricas ao lado de Data e Campanha.
+
+somar_por() soma métricas por qualquer combinação de chaves sem passar pelo
+groupby de objetos: cada chave vira códigos inteiros (os da categórica ou
+os do factorize), os códigos são combinados numa única chave int64 em base
+mista e as somas saem de np.bincount. Só as combinações que ocorrem nos
+dados são emitidas, em ordem de chave. Quando o espaço de combinações cabe
+em poucas vezes o número de linhas, a contagem é direta (O(n), sem
+ordenação); acima disso, np.unique compacta as chaves.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Nome padronizado das quebras aceitas, na ordem de hierarquia/exibição
+DIMENSOES = ['Conjunto', 'Anuncio', 'Idade', 'Genero', 'Plataforma', 'Posicionamento', 'Dispositivo', 'Regiao', 'Pais']
+
+# Espaço de combinações até este múltiplo das linhas usa contagem direta
+FATOR_ESPACO_DIRETO = 4
+MAXIMO_ESPACO = np.iinfo(np.int64).max
+
+
+def dimensoes_presentes(dados):
+    """Quebras presentes em `dados`, na ordem de DIMENSOES"""
+    return [d for d in DIMENSOES if d in dados.columns]
+
+
+def codificar(serie):
+    """Códigos int64 (0..n-1) e valores únicos de uma coluna; ausentes viram o último código"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy().astype(np.int64)
+        valores = serie.cat.categories
+        ausentes = codigos < 0
+        if ausentes.any():
+            codigos[ausentes] = len(valores)
+            valores = valores.append(pd.Index([np.nan], dtype=valores.dtype))
+        return codigos, valores
+
+    codigos, valores = pd.factorize(serie, sort=True, use_na_sentinel=False)
+    return codigos.astype(np.int64, copy=False), pd.Index(valores)
+
+
+def _reconstruir(valores, codigos, original):
+    """Coluna de chave do resultado, com o mesmo tipo da original"""
+    if isinstance(original.dtype, pd.CategoricalDtype):
+        categorias = original.cat.categories
+        codigos = np.where(codigos >= len(categorias), -1, codigos)
+        return pd.Categorical.from_codes(codigos, dtype=original.dtype)
+    return valores.take(codigos)
+
+
+def somar_por(dados, chaves, metricas):
+    """Soma `metricas` por combinação de `chaves` (só as que ocorrem)
+
+    Equivale a dados.groupby(chaves, dropna=False, observed=True)[metricas]
+    .sum().reset_index(). Categóricas continuam categóricas no resultado;
+    contagens inteiras continuam inteiras.
+    """
+    metricas = list(metricas)
+    if not chaves:
+        return dados[metricas].sum().to_frame().T
+    if len(dados) == 0:
+        return dados[list(chaves) + metricas].iloc[:0].reset_index(drop=True)
+
+    codificadas = [codificar(dados[c]) for c in chaves]
+
+    # Chave combinada em base mista; se estourar int64, compacta o prefixo
+    combinada = np.zeros(len(dados), dtype=np.int64)
+    espaco = 1
+    compactada = False
+    for codigos, valores in codificadas:
+        base = max(len(valores), 1)
+        if espaco > MAXIMO_ESPACO // base:
+            espaco_atual, combinada = np.unique(combinada, return_inverse=True)
+            espaco = len(espaco_atual)
+            compactada = True
+        combinada = combinada * base + codigos
+        espaco *= base
+
+    if not compactada and espaco <= FATOR_ESPACO_DIRETO * len(dados):
+        contagem = np.bincount(combinada, minlength=espaco)
+        ocupadas = np.flatnonzero(contagem)
+        posicao = np.empty(espaco, dtype=np.int64)
+        posicao[ocupadas] = np.arange(len(ocupadas))
+        grupo = posicao[combinada]
+        primeira = None
+    else:
+        ocupadas, primeira, grupo = np.unique(combinada, return_index=True, return_inverse=True)
+    n_grupos = len(ocupadas)
+
+    colunas = {}
+    if primeira is None:
+        # Decompõe a chave combinada de volta nos códigos de cada coluna
+        resto = ocupadas
+        decompostos = []
+        for codigos, valores in reversed(codificadas):
+            base = max(len(valores), 1)
+            decompostos.append(resto % base)
+            resto = resto // base
+        for chave, (_, valores), codigos in zip(chaves, codificadas, reversed(decompostos)):
+            colunas[chave] = _reconstruir(valores, codigos, dados[chave])
+    else:
+        for chave, (codigos, valores) in zip(chaves, codificadas):
+            colunas[chave] = _reconstruir(valores, codigos[primeira], dados[chave])
+
+    for metrica in metricas:
+        serie = dados[metrica]
+        soma = np.bincount(grupo, weights=serie.to_numpy(dtype=np.float64), minlength=n_grupos)
+        if pd.api.types.is_integer_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+            soma = np.rint(soma).astype(np.int64)
+        elif pd.api.types.is_float_dtype(serie):
+            soma = soma.astype(serie.dtype, copy=False)
+        colunas[metrica] = soma
+
+    return pd.DataFrame(colunas)
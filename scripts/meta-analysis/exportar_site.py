@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+EXPORTAÇÃO PARA O SITE ESTÁTICO (JSON FATIADO E PRÉ-COMPRIMIDO)
+Arquitetura de Performance - ruas.dev.br
+
+As páginas do site (index.html, contato.html, 404.html) são estáticas. Em vez
+de publicar o relatório inteiro para o navegador agregar, esta etapa grava
+fatias JSON já agregadas e a página busca só a que vai desenhar:
+
+    manifest.json            janelas, referência e cada arquivo com tamanho e hash
+    resumo/<janela>.json     totais da conta, top campanhas e recomendações (1ª pintura)
+    janelas/<janela>.json    totais de todas as campanhas na janela (colunar)
+    serie/conta.json         série diária da conta
+    campanhas/indice.json    nome -> arquivo de cada campanha
+    campanhas/<id>.json      série diária, totais por janela e ações de uma campanha
+
+Cada JSON tem ao lado .gz e .br (brotli do pacote brotli ou do codec do
+pyarrow) para o servidor entregar direto (gzip_static/brotli_static). A
+primeira pintura precisa de manifest.json + resumo/7d.json: poucos KB.
+
+As janelas saem da mesma matriz janela x campanha do motor de regras,
+terminando na última data dos dados (a `referencia` do manifesto): uma
+exportação que vai até ontem não publica um "hoje" zerado. As séries saem
+do pivô dias x campanhas das tendências. Arquivos cujo conteúdo não
+mudou não são regravados (mtime e ETag continuam os mesmos no CDN); a escrita
+é atômica (temporário + os.replace).
+
+Uso:
+    python meta_leads_analyzer.py site dados.csv --saida site_dados
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from regras import MotorRegras
+from tendencias import matrizes_diarias
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+VERSAO_SITE = 1
+PASTA_SITE_PADRAO = 'site_dados'
+# Mesmos períodos do relatório completo
+JANELAS_SITE = {'hoje': 1, '7d': 7, '30d': 30, 'total': None}
+DIAS_SERIE = 90
+TOP_RESUMO = 10
+COMPRESSOES_SITE = ('gz', 'br')
+# Brotli 11 custa ~25x o nível 5 para ~7% menos bytes: vale nas fatias da
+# primeira pintura, não em milhares de arquivos de campanha
+QUALIDADE_BROTLI = 11
+QUALIDADE_BROTLI_CAMPANHAS = 5
+
+METRICAS_JANELA = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'CAC', 'CTR', 'Taxa_Conversao']
+METRICAS_SERIE = ['Gasto', 'Leads', 'Cliques', 'Impressoes']
+
+
+def _comprimir_brotli(conteudo, qualidade):
+    if brotli is not None:
+        return brotli.compress(conteudo, quality=qualidade)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    if not pa.Codec.is_available('brotli'):
+        return None
+    return pa.Codec('brotli', compression_level=qualidade).compress(conteudo, asbytes=True)
+
+
+def comprimir(conteudo, formato, qualidade=QUALIDADE_BROTLI):
+    """Bytes de `conteudo` em gzip ('gz') ou brotli ('br'); None se o codec não existir"""
+    if formato == 'gz':
+        # mtime=0: mesma entrada, mesmos bytes (o hash do manifesto não muda à toa)
+        return gzip.compress(conteudo, compresslevel=9, mtime=0)
+    if formato == 'br':
+        return _comprimir_brotli(conteudo, qualidade)
+    raise ValueError(f"compressão desconhecida: {formato}")
+
+
+def identificador_campanha(nome):
+    """Nome de arquivo estável para a campanha: slug ASCII + 6 hex do hash do nome"""
+    texto = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-')[:48] or 'campanha'
+    return f"{slug}-{hashlib.sha1(str(nome).encode('utf-8')).hexdigest()[:6]}"
+
+
+def _valores(matriz, casas=2):
+    """Lista JSON de um array: arredondado, NaN/inf como null e inteiros sem .0"""
+    matriz = np.round(np.asarray(matriz, dtype=np.float64), casas)
+    lista = matriz.tolist()
+    if np.isfinite(matriz).all():
+        inteiros = matriz == np.floor(matriz)
+        if inteiros.all():
+            return np.asarray(matriz, dtype=np.int64).tolist()
+        return lista
+    finitos = np.isfinite(matriz).tolist()
+    if matriz.ndim == 1:
+        return [v if ok else None for v, ok in zip(lista, finitos)]
+    return [[v if ok else None for v, ok in zip(linha, oks)] for linha, oks in zip(lista, finitos)]
+
+
+class EscritorSite:
+    """Grava JSON + variantes comprimidas, pulando arquivos sem mudança"""
+
+    def __init__(self, pasta, compressoes=COMPRESSOES_SITE):
+        self.pasta = pasta
+        self.compressoes = compressoes
+        self.arquivos = {}
+        self.escritos = 0
+        self.mantidos = 0
+
+    def _gravar(self, caminho, conteudo):
+        """Grava se o conteúdo mudou; retorna False se o arquivo já era igual"""
+        if os.path.exists(caminho) and os.path.getsize(caminho) == len(conteudo):
+            with open(caminho, 'rb') as f:
+                if f.read() == conteudo:
+                    self.mantidos += 1
+                    return False
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = caminho + f'.{os.getpid()}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+        self.escritos += 1
+        return True
+
+    def json(self, relativo, objeto, qualidade=QUALIDADE_BROTLI):
+        """Grava `objeto` em <pasta>/<relativo> (+ .gz/.br) e registra no manifesto"""
+        conteudo = json.dumps(objeto, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        caminho = os.path.join(self.pasta, relativo)
+        mudou = self._gravar(caminho, conteudo)
+
+        registro = {'bytes': len(conteudo), 'hash': hashlib.sha256(conteudo).hexdigest()[:16]}
+        for formato in self.compressoes:
+            variante = f'{caminho}.{formato}'
+            if not mudou and os.path.exists(variante):
+                # JSON igual ao da última exportação: a variante comprimida também é
+                registro[formato] = os.path.getsize(variante)
+                self.mantidos += 1
+                continue
+            comprimido = comprimir(conteudo, formato, qualidade)
+            if comprimido is None:
+                continue
+            self._gravar(variante, comprimido)
+            registro[formato] = len(comprimido)
+        self.arquivos[relativo] = registro
+        return registro
+
+
+def _linhas_resumo(tabela):
+    """Registros de recomendações (só colunas que a página mostra)"""
+    return [
+        {'regra': row['Regra'], 'severidade': str(row['Severidade']), 'titulo': row['Titulo'],
+         'acoes': list(row['Acoes']), 'janela': row['Janela'],
+         **({'campanha': str(row['Campanha'])} if row['Nivel'] == 'campanha' else {})}
+        for _, row in tabela.iterrows()
+    ]
+
+
+def exportar_site(dados, pasta=PASTA_SITE_PADRAO, recomendacoes=None, previsao=None,
+                  janelas=JANELAS_SITE, dias_serie=DIAS_SERIE, top=TOP_RESUMO, compressoes=COMPRESSOES_SITE):
+    """Grava as fatias JSON de `dados` (linhas Data x Campanha) em `pasta`
+
+    `recomendacoes` é a tabela de MotorRegras.avaliar() e `previsao` o dict de
+    prever_campanhas(); ambos opcionais. Retorna o manifesto.
+    """
+    if 'Data' not in dados.columns or 'Campanha' not in dados.columns:
+        raise ValueError("a exportação para o site precisa das colunas Data e Campanha")
+
+    escritor = EscritorSite(pasta, compressoes)
+    motor = MotorRegras({'janelas': janelas, 'referencia': 'ultima_data', 'regras': []})
+    datas_validas = dados['Data'].dropna()
+    referencia = pd.Timestamp(datas_validas.max() if len(datas_validas) else date.today()).normalize()
+    valores, campanhas = motor.metricas(dados, referencia)
+    nomes = [str(c) for c in campanhas]
+    ids = [identificador_campanha(c) for c in campanhas]
+    nomes_janelas = list(janelas)
+
+    datas, campanhas_serie, matrizes = matrizes_diarias(dados, dias_historico=dias_serie)
+    datas_texto = [str(d) for d in datas]
+    # Colunas da série na ordem das campanhas das janelas
+    posicao_serie = pd.Index(campanhas_serie).get_indexer(campanhas)
+
+    acoes = recomendacoes[recomendacoes['Nivel'] == 'campanha'] if recomendacoes is not None else None
+    acoes_por_id = {}
+    if acoes is not None and not acoes.empty:
+        for campanha, grupo in acoes.groupby('Campanha', observed=True, sort=False):
+            acoes_por_id[identificador_campanha(campanha)] = _linhas_resumo(grupo)
+
+    # Listas JSON de cada métrica (janela x campanhas + conta), convertidas uma vez só
+    listas = {metrica: _valores(valores[metrica]) for metrica in METRICAS_JANELA}
+
+    # Totais de todas as campanhas por janela (colunar: uma lista por métrica)
+    for j, janela in enumerate(nomes_janelas):
+        escritor.json(f'janelas/{janela}.json', {
+            'janela': janela,
+            'campanhas': ids,
+            **{metrica: listas[metrica][j][:-1] for metrica in METRICAS_JANELA},
+        })
+
+    # Resumo da primeira pintura: conta, top campanhas e recomendações
+    for j, janela in enumerate(nomes_janelas):
+        leads = np.nan_to_num(valores['Leads'][j, :-1])
+        ordem = np.argsort(-leads, kind='stable')[:top]
+        ordem = ordem[leads[ordem] > 0]
+        resumo = {
+            'janela': janela,
+            'conta': {metrica: listas[metrica][j][-1] for metrica in METRICAS_JANELA},
+            'top': [
+                {'id': ids[c], 'nome': nomes[c], **{m: listas[m][j][c] for m in ('Gasto', 'Leads', 'CAC')}}
+                for c in ordem
+            ],
+        }
+        if recomendacoes is not None:
+            da_janela = recomendacoes[recomendacoes['Janela'] == janela]
+            resumo['recomendacoes'] = _linhas_resumo(da_janela[da_janela['Nivel'] == 'conta'])
+            resumo['acoes_campanhas'] = int((da_janela['Nivel'] == 'campanha').sum())
+        escritor.json(f'resumo/{janela}.json', resumo)
+
+    escritor.json('serie/conta.json', {
+        'datas': datas_texto,
+        **{metrica: _valores(matrizes[metrica].sum(axis=1)) for metrica in METRICAS_SERIE if metrica in matrizes},
+    })
+
+    if previsao:
+        escritor.json('previsao.json', {
+            'horizonte': previsao['horizonte'],
+            'nivel': previsao['nivel'],
+            'total': {chave: _valores([valor])[0] for chave, valor in previsao['total'].items()},
+        })
+
+    series = {metrica: _valores(matrizes[metrica].T) for metrica in METRICAS_SERIE if metrica in matrizes}
+    vazia = [0] * len(datas)
+    for c, (identificador, nome) in enumerate(zip(ids, nomes)):
+        coluna = posicao_serie[c]
+        escritor.json(f'campanhas/{identificador}.json', {
+            'id': identificador,
+            'nome': nome,
+            'janelas': {
+                janela: {metrica: listas[metrica][j][c] for metrica in METRICAS_JANELA}
+                for j, janela in enumerate(nomes_janelas)
+            },
+            'serie': {
+                'datas': datas_texto,
+                **{metrica: serie[coluna] if coluna >= 0 else vazia for metrica, serie in series.items()},
+            },
+            'acoes': acoes_por_id.get(identificador, []),
+        }, qualidade=QUALIDADE_BROTLI_CAMPANHAS)
+    # Índice depois das campanhas: o hash de cada uma serve para invalidar cache
+    escritor.json('campanhas/indice.json', {'campanhas': [
+        {'id': i, 'nome': n, 'hash': escritor.arquivos[f'campanhas/{i}.json']['hash']} for i, n in zip(ids, nomes)
+    ]})
+
+    manifesto = {
+        'versao': VERSAO_SITE,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'referencia': str(referencia.date()),
+        'janelas': janelas,
+        'campanhas': len(ids),
+        'compressoes': [f for f in compressoes if any(f in r for r in escritor.arquivos.values())],
+        # Por campanha o índice basta; o manifesto lista só as fatias compartilhadas
+        'arquivos': {caminho: registro for caminho, registro in escritor.arquivos.items()
+                     if not caminho.startswith('campanhas/') or caminho == 'campanhas/indice.json'},
+    }
+    registro = escritor.json('manifest.json', manifesto)
+    manifesto['estatisticas'] = {
+        'manifesto': registro,
+        'arquivos': len(escritor.arquivos),
+        'escritos': escritor.escritos,
+        'mantidos': escritor.mantidos,
+        'bytes': sum(r['bytes'] for r in escritor.arquivos.values()),
+        'bytes_gz': sum(r.get('gz', 0) for r in escritor.arquivos.values()),
+    }
+    return manifesto
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+GERADOR DE EXPORTAÇÕES META ADS SINTÉTICAS
+Arquitetura de Performance - ruas.dev.br
+
+Gera CSVs determinísticos (mesma semente e data de início = mesmo arquivo)
+parecidos com as exportações do Gerenciador de Anúncios: várias campanhas
+por dia, cabeçalhos em português ou inglês e, opcionalmente, valores sujos
+(vazios, "-", "N/A") e quebras (conjunto de anúncios, idade, gênero,
+posicionamento) como nas exportações detalhadas. Também gera a exportação
+de leads (uma linha por lead, com repetições) correspondente a uma
+exportação de gasto, para testar o cruzamento com o CRM. O arquivo é escrito em blocos, então 10M de linhas não
+precisam caber na memória. Sem data de início, o período termina hoje.
+
+Uso:
+    python gerador_dados.py saida.csv --linhas 1000000 --campanhas 500 --dias 365 --idioma en --sujeira 0.01
+    python gerador_dados.py quebras.csv --linhas 5M --quebras
+    python gerador_dados.py leads.csv --leads-de exportacao.csv --duplicadas 0.3
+"""
+
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Cabeçalhos como aparecem nas exportações de cada idioma
+CABECALHOS = {
+    'pt': {
+        'Data': 'Data',
+        'Campanha': 'Nome da campanha',
+        'Impressoes': 'Impressões',
+        'Cliques': 'Cliques',
+        'Gasto': 'Valor gasto (BRL)',
+        'Leads': 'Resultados',
+        'Alcance': 'Alcance',
+    },
+    'en': {
+        'Data': 'Date',
+        'Campanha': 'Campaign name',
+        'Impressoes': 'Impressions',
+        'Cliques': 'Clicks (all)',
+        'Gasto': 'Amount spent (BRL)',
+        'Leads': 'Results',
+        'Alcance': 'Reach',
+    },
+}
+
+# Quebras opcionais: nome padronizado -> (cabeçalho pt, cabeçalho en, valores)
+QUEBRAS = {
+    'Idade': ('Idade', 'Age', ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']),
+    'Genero': ('Gênero', 'Gender', ['female', 'male', 'unknown']),
+    'Posicionamento': ('Posicionamento', 'Placement',
+                       ['Feed', 'Stories', 'Reels', 'Marketplace', 'Explore', 'Audience Network', 'Messenger']),
+}
+CONJUNTOS_POR_CAMPANHA = 8
+
+FORMATO_DATA = {'pt': '%d/%m/%Y', 'en': '%Y-%m-%d'}
+VALORES_SUJOS = np.array(['', '-', 'N/A', 'null'])
+TEMAS_CAMPANHA = ['Educação', 'Imóveis', 'Saúde', 'Varejo', 'Serviços', 'Cursos', 'Eventos', 'Consultoria']
+TAMANHO_BLOCO = 500_000
+# Horas do dia (de minuto em minuto) no formato do created_time das exportações de leads
+HORARIOS = np.array([f'{m // 60:02d}:{m % 60:02d}:00-0300' for m in range(24 * 60)], dtype=object)
+
+
+def nomes_campanhas(quantidade):
+    """Nomes determinísticos, com acentos e vírgulas como nas contas reais"""
+    return [
+        f"{TEMAS_CAMPANHA[i % len(TEMAS_CAMPANHA)]} - Leads, Conjunto {i // len(TEMAS_CAMPANHA) + 1:04d}"
+        for i in range(quantidade)
+    ]
+
+
+def _bloco(rng, linhas, campanhas, perfil, dias, inicio, idioma, sujeira, quebras=False):
+    """Gera um bloco de linhas já com os nomes de coluna do idioma"""
+    codigos = rng.integers(0, len(campanhas), linhas)
+    deslocamento = rng.integers(0, dias, linhas)
+
+    # Cada campanha tem seu próprio CTR/conversão/CPM, com ruído diário
+    ctr, conversao, cpm = perfil[:, 0][codigos], perfil[:, 1][codigos], perfil[:, 2][codigos]
+    impressoes = rng.lognormal(7.5, 1.0, linhas).astype(np.int64) + 1
+    cliques = rng.binomial(impressoes, ctr)
+    leads = rng.binomial(cliques, conversao)
+    gasto = np.round(impressoes / 1000 * cpm * rng.uniform(0.8, 1.2, linhas), 2)
+    alcance = (impressoes * rng.uniform(0.6, 0.95, linhas)).astype(np.int64)
+
+    datas = pd.to_datetime(inicio) + pd.to_timedelta(deslocamento, unit='D')
+    colunas = CABECALHOS[idioma]
+    bloco = pd.DataFrame({
+        colunas['Data']: datas.strftime(FORMATO_DATA[idioma]),
+        colunas['Campanha']: np.asarray(campanhas, dtype=object)[codigos],
+        colunas['Impressoes']: impressoes,
+        colunas['Cliques']: cliques,
+        colunas['Gasto']: gasto,
+        colunas['Leads']: leads,
+        colunas['Alcance']: alcance,
+    })
+
+    if quebras:
+        conjuntos = rng.integers(0, CONJUNTOS_POR_CAMPANHA, linhas)
+        cabecalho_conjunto = 'Nome do conjunto de anúncios' if idioma == 'pt' else 'Ad set name'
+        bloco.insert(2, cabecalho_conjunto, 'Público ' + pd.Series(conjuntos + 1).astype(str) + ' - C' + pd.Series(codigos).astype(str))
+        for posicao, (pt, en, valores) in enumerate(QUEBRAS.values(), start=3):
+            bloco.insert(posicao, pt if idioma == 'pt' else en, np.asarray(valores, dtype=object)[rng.integers(0, len(valores), linhas)])
+
+    if sujeira > 0:
+        for chave in ('Impressoes', 'Cliques', 'Gasto', 'Leads'):
+            coluna = colunas[chave]
+            sujos = rng.random(linhas) < sujeira
+            if sujos.any():
+                bloco[coluna] = bloco[coluna].astype(object)
+                bloco.loc[sujos, coluna] = rng.choice(VALORES_SUJOS, sujos.sum())
+
+    return bloco
+
+
+def gerar_exportacao(caminho, linhas=10_000, campanhas=20, dias=90, idioma='pt', sujeira=0.0,
+                     semente=42, inicio=None, tamanho_bloco=TAMANHO_BLOCO, quebras=False):
+    """Escreve uma exportação sintética em `caminho` e retorna o caminho
+
+    Com quebras=True cada linha ganha conjunto de anúncios, idade, gênero e
+    posicionamento.
+    """
+    if idioma not in CABECALHOS:
+        raise ValueError(f"idioma deve ser um de {sorted(CABECALHOS)}")
+
+    rng = np.random.default_rng(semente)
+    inicio = inicio or (date.today() - timedelta(days=dias - 1))
+    nomes = nomes_campanhas(campanhas)
+    perfil = np.column_stack([
+        rng.uniform(0.005, 0.04, campanhas),   # CTR
+        rng.uniform(0.02, 0.15, campanhas),    # conversão clique -> lead
+        rng.uniform(8, 40, campanhas),         # CPM em R$
+    ])
+
+    escritas = 0
+    while escritas < linhas:
+        tamanho = min(tamanho_bloco, linhas - escritas)
+        bloco = _bloco(rng, tamanho, nomes, perfil, dias, inicio, idioma, sujeira, quebras)
+        bloco.to_csv(caminho, mode='w' if escritas == 0 else 'a', header=escritas == 0, index=False)
+        escritas += tamanho
+
+    return caminho
+
+
+def gerar_leads_crm(caminho, exportacao, duplicadas=0.3, semente=42, tamanho_bloco=TAMANHO_BLOCO):
+    """Uma linha por lead de `exportacao` (coluna Leads), parte delas repetições de leads anteriores
+
+    As repetições reaparecem com e-mail em outra caixa/espaços ou telefone
+    em outro formato (às vezes só um dos dois), como nos CRMs. Retorna o
+    número de leads únicos escritos (os que a deduplicação deve achar).
+    """
+    from analisador_profissional import mapear_colunas
+
+    rng = np.random.default_rng(semente)
+    cabecalho = tuple(pd.read_csv(exportacao, nrows=0).columns)
+    renomear = {o: d for o, d in mapear_colunas(cabecalho).items() if d in ('Data', 'Campanha', 'Leads')}
+
+    unicos = 0
+    escritas = 0
+    for bloco in pd.read_csv(exportacao, usecols=list(renomear), dtype={o: str for o, d in renomear.items() if d == 'Data'},
+                             chunksize=tamanho_bloco):
+        bloco = bloco.rename(columns=renomear)
+        leads = pd.to_numeric(bloco['Leads'], errors='coerce').fillna(0).astype(np.int64).to_numpy()
+        linhas = np.repeat(np.arange(len(bloco)), leads)
+        n = len(linhas)
+
+        # Repetições apontam para leads que aparecem antes no arquivo
+        repetidos = rng.random(n) < duplicadas
+        originais_antes = unicos + np.cumsum(~repetidos) - ~repetidos
+        repetidos &= originais_antes > 0
+        ids = np.where(repetidos, (rng.random(n) * originais_antes).astype(np.int64), 0)
+        ids[~repetidos] = np.arange(unicos, unicos + n - repetidos.sum())
+        unicos += n - int(repetidos.sum())
+
+        # created_time em ISO com fuso: dia do bloco + hora sorteada (tabelas de texto, sem strftime por linha)
+        texto_data = bloco['Data'].astype(str)
+        formato = FORMATO_DATA['pt'] if texto_data.str.contains('/', regex=False).any() else FORMATO_DATA['en']
+        dias, posicao_dia = np.unique(pd.to_datetime(texto_data, format=formato).to_numpy(), return_inverse=True)
+        texto_dia = pd.DatetimeIndex(dias).strftime('%Y-%m-%dT').to_numpy(dtype=object)
+        criado = texto_dia[posicao_dia[linhas]] + HORARIOS[rng.integers(0, len(HORARIOS), n)]
+        texto_id = pd.Series(ids).astype(str)
+        email = 'lead' + texto_id + '@exemplo.com.br'
+        telefone = '11' + pd.Series(900_000_000 + ids).astype(str)
+
+        variacao = rng.integers(0, 4, n)
+        email = email.where(~(repetidos & (variacao == 1)), ' ' + email.str.upper())
+        telefone = telefone.where(~(repetidos & (variacao == 2)),
+                                  '+55 (' + telefone.str.slice(0, 2) + ') ' + telefone.str.slice(2))
+        # Só um dos identificadores na repetição
+        email = email.where(~(repetidos & (variacao == 3)), '')
+
+        saida = pd.DataFrame({
+            'id': rng.integers(10 ** 14, 10 ** 15, n),
+            'created_time': criado,
+            'campaign_name': bloco['Campanha'].to_numpy()[linhas],
+            'email': email.to_numpy(),
+            'phone_number': telefone.to_numpy(),
+        })
+        saida.to_csv(caminho, mode='w' if escritas == 0 else 'a', header=escritas == 0, index=False)
+        escritas += 1
+
+    return unicos
+
+
+def quantidade(texto):
+    """Aceita 10000, 10k, 1M, 10M (também usado pelo benchmark e pela CLI)"""
+    texto = str(texto).strip().lower()
+    multiplicador = {'k': 1_000, 'm': 1_000_000}.get(texto[-1], 1)
+    numero = texto[:-1] if multiplicador > 1 else texto
+    return int(float(numero) * multiplicador)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera exportações META Ads sintéticas")
+    parser.add_argument('saida', help="arquivo CSV de saída")
+    parser.add_argument('--linhas', type=quantidade, default=10_000, help="ex.: 10000, 1M, 10M")
+    parser.add_argument('--campanhas', type=int, default=20)
+    parser.add_argument('--dias', type=int, default=90)
+    parser.add_argument('--idioma', choices=sorted(CABECALHOS), default='pt')
+    parser.add_argument('--sujeira', type=float, default=0.0, help="fração de células numéricas sujas")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--quebras', action='store_true', help="inclui conjunto, idade, gênero e posicionamento")
+    parser.add_argument('--leads-de', metavar='EXPORTACAO', default=None,
+                        help="gera a exportação de leads (uma linha por lead) desta exportação de gasto")
+    parser.add_argument('--duplicadas', type=float, default=0.3, help="com --leads-de, fração de linhas repetidas")
+    args = parser.parse_args()
+
+    if args.leads_de:
+        unicos = gerar_leads_crm(args.saida, args.leads_de, args.duplicadas, args.semente)
+        print(f"✅ Leads gerados em {args.saida} ({unicos:,} únicos)")
+        return
+
+    gerar_exportacao(args.saida, args.linhas, args.campanhas, args.dias, args.idioma, args.sujeira, args.semente,
+                     quebras=args.quebras)
+    print(f"✅ {args.linhas:,} linhas geradas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+INGESTÃO DA META MARKETING API (asyncio)
+Arquitetura de Performance - ruas.dev.br
+
+Baixa insights diários por campanha de várias contas de anúncio ao mesmo
+tempo, sem exportar CSV pelo Gerenciador:
+
+  • cliente HTTP/1.1 próprio sobre asyncio, com pool de conexões keep-alive
+    (sem dependências além da biblioteca padrão)
+  • o período de cada conta é fatiado (ex.: semanas) e as fatias são
+    paginadas em paralelo, cada uma seguindo seu cursor
+  • relatórios assíncronos (POST /insights -> report_run_id -> polling)
+  • ritmo controlado pelos cabeçalhos de uso (X-Business-Use-Case-Usage,
+    X-Ad-Account-Usage, X-App-Usage) e backoff exponencial nos erros de
+    limite e transitórios
+
+Cada página vira, assim que chega, um bloco já no formato padronizado dos
+analisadores (Data, Campanha, Gasto, Leads, Cliques, Impressoes, Alcance,
+CPM, CPC + Conta), com os tipos de _converter_tipos.
+
+Uso:
+    META_ACCESS_TOKEN=... python ingestao_api.py act_123 act_456 --desde 2024-01-01 --ate 2024-12-31 --saida meta_api.csv
+    python ingestao_api.py act_1 --base-url http://127.0.0.1:8899 --token teste   # contra stub_graph_api.py
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import ssl
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from opcoes_api import BASE_URL_PADRAO, CONEXOES_PADRAO, DIAS_POR_FATIA, VERSAO_PADRAO, opcoes_cli
+
+LIMITE_PAGINA = 500
+
+CAMPOS_INSIGHTS = ['date_start', 'campaign_id', 'campaign_name', 'impressions', 'clicks',
+                   'spend', 'reach', 'cpm', 'cpc', 'actions']
+# Ações contadas como lead: 'lead' já é o total (formulário + pixel); só sem ele
+# as parciais são somadas. Somar tudo contaria cada lead duas vezes.
+TIPO_LEAD_TOTAL = 'lead'
+TIPOS_LEAD_PARCIAIS = ('onsite_conversion.lead_grouped', 'offsite_conversion.fb_pixel_lead')
+
+# Campo da API -> coluna padronizada
+COLUNAS_API = {
+    'date_start': 'Data',
+    'campaign_name': 'Campanha',
+    'spend': 'Gasto',
+    'clicks': 'Cliques',
+    'impressions': 'Impressoes',
+    'reach': 'Alcance',
+    'cpm': 'CPM',
+    'cpc': 'CPC',
+}
+
+# Ritmo: acima de LIMITE_USO % de qualquer cota as chamadas da conta desaceleram
+LIMITE_USO = 75
+PAUSA_MAXIMA = 60.0
+TENTATIVAS = 6
+ESPERA_BASE = 1.0
+# Códigos de erro de limite da Graph API (app, usuário, conta, BUC)
+CODIGOS_LIMITE = {4, 17, 32, 613} | set(range(80000, 80015))
+CODIGOS_TRANSITORIOS = {1, 2}
+
+POLLING_INICIAL = 1.0
+POLLING_MAXIMO = 10.0
+
+
+def leads_das_acoes(acoes):
+    """Leads de uma linha de insights a partir da lista `actions`"""
+    if not isinstance(acoes, list):
+        return 0
+    valores = {a.get('action_type'): float(a.get('value', 0)) for a in acoes}
+    if TIPO_LEAD_TOTAL in valores:
+        return valores[TIPO_LEAD_TOTAL]
+    return sum(valores.get(tipo, 0) for tipo in TIPOS_LEAD_PARCIAIS)
+
+
+class ErroGraphAPI(Exception):
+    def __init__(self, status, erro):
+        self.status = status
+        self.codigo = erro.get('code')
+        self.transitorio = bool(erro.get('is_transient'))
+        super().__init__(f"HTTP {status} código {self.codigo}: {erro.get('message', '')}")
+
+
+# ================= CLIENTE HTTP =================
+
+class ClienteHTTP:
+    """Cliente HTTP/1.1 mínimo com pool de conexões keep-alive por host"""
+
+    def __init__(self, conexoes=CONEXOES_PADRAO, tempo_limite=120.0):
+        self.tempo_limite = tempo_limite
+        self._semaforo = asyncio.Semaphore(conexoes)
+        self._livres = {}
+        self._ssl = ssl.create_default_context()
+        self.conexoes_abertas = 0
+
+    async def _abrir(self, esquema, host, porta):
+        self.conexoes_abertas += 1
+        return await asyncio.open_connection(host, porta, ssl=self._ssl if esquema == 'https' else None)
+
+    async def requisitar(self, metodo, url, corpo=None):
+        """Retorna (status, cabeçalhos em minúsculas, corpo em bytes)"""
+        partes = urlsplit(url)
+        porta = partes.port or (443 if partes.scheme == 'https' else 80)
+        chave = (partes.scheme, partes.hostname, porta)
+        alvo = partes.path + (f'?{partes.query}' if partes.query else '')
+
+        pedido = [f"{metodo} {alvo} HTTP/1.1", f"Host: {partes.netloc}",
+                  "Accept-Encoding: gzip", "Connection: keep-alive"]
+        if corpo is not None:
+            pedido += ["Content-Type: application/x-www-form-urlencoded", f"Content-Length: {len(corpo)}"]
+        pedido = ('\r\n'.join(pedido) + '\r\n\r\n').encode('latin-1') + (corpo or b'')
+
+        async with self._semaforo:
+            livres = self._livres.setdefault(chave, [])
+            # Conexão reaproveitada pode ter sido fechada pelo servidor: tenta uma nova
+            for reaproveitada in (True, False):
+                if reaproveitada and not livres:
+                    continue
+                leitor, escritor = livres.pop() if reaproveitada else await self._abrir(*chave)
+                try:
+                    escritor.write(pedido)
+                    await escritor.drain()
+                    status, cabecalhos, resposta = await asyncio.wait_for(self._ler_resposta(leitor), self.tempo_limite)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    escritor.close()
+                    if reaproveitada:
+                        continue
+                    raise
+                except BaseException:
+                    escritor.close()
+                    raise
+
+                if cabecalhos.get('connection', '').lower() == 'close':
+                    escritor.close()
+                else:
+                    livres.append((leitor, escritor))
+                return status, cabecalhos, resposta
+
+    @staticmethod
+    async def _ler_resposta(leitor):
+        bruto = await leitor.readuntil(b'\r\n\r\n')
+        linhas = bruto[:-4].decode('latin-1').split('\r\n')
+        status = int(linhas[0].split(' ', 2)[1])
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            nome, _, valor = linha.partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        if cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+            partes = []
+            while True:
+                tamanho = int((await leitor.readuntil(b'\r\n')).split(b';')[0], 16)
+                if tamanho == 0:
+                    await leitor.readuntil(b'\r\n')
+                    break
+                partes.append(await leitor.readexactly(tamanho))
+                await leitor.readexactly(2)
+            corpo = b''.join(partes)
+        elif 'content-length' in cabecalhos:
+            corpo = await leitor.readexactly(int(cabecalhos['content-length']))
+        else:
+            corpo = await leitor.read()
+            cabecalhos['connection'] = 'close'
+
+        if cabecalhos.get('content-encoding') == 'gzip':
+            corpo = gzip.decompress(corpo)
+        return status, cabecalhos, corpo
+
+    async def fechar(self):
+        for conexoes in self._livres.values():
+            for _, escritor in conexoes:
+                escritor.close()
+        self._livres.clear()
+
+
+# ================= USO / LIMITES =================
+
+def uso_dos_cabecalhos(cabecalhos):
+    """(maior % de uso entre as cotas, segundos até liberar) a partir dos cabeçalhos"""
+    uso, espera = 0.0, 0.0
+
+    for nome in ('x-app-usage', 'x-ad-account-usage', 'x-business-use-case-usage'):
+        try:
+            valor = json.loads(cabecalhos.get(nome, '') or 'null')
+        except ValueError:
+            continue
+        if not valor:
+            continue
+
+        if nome == 'x-business-use-case-usage':
+            # {"<business_id>": [{"type": "ads_insights", "call_count": 28, ...}]}
+            entradas = [e for lista in valor.values() for e in lista]
+        else:
+            entradas = [valor]
+
+        for entrada in entradas:
+            for campo in ('call_count', 'total_cputime', 'total_time', 'acc_id_util_pct'):
+                uso = max(uso, float(entrada.get(campo, 0) or 0))
+            espera = max(espera, float(entrada.get('estimated_time_to_regain_access', 0) or 0) * 60)
+            espera = max(espera, float(entrada.get('reset_time_duration', 0) or 0) if uso >= 100 else 0)
+    return uso, espera
+
+
+# ================= INGESTÃO =================
+
+class IngestorGraphAPI:
+    def __init__(self, token, base_url=BASE_URL_PADRAO, versao=VERSAO_PADRAO, conexoes=CONEXOES_PADRAO,
+                 assincrono=True, dias_por_fatia=DIAS_POR_FATIA, limite_pagina=LIMITE_PAGINA,
+                 limite_uso=LIMITE_USO, pausa_maxima=PAUSA_MAXIMA, espera_base=ESPERA_BASE,
+                 polling_inicial=POLLING_INICIAL):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.versao = versao
+        self.conexoes = conexoes
+        self.assincrono = assincrono
+        self.dias_por_fatia = dias_por_fatia
+        self.limite_pagina = limite_pagina
+        self.limite_uso = limite_uso
+        self.pausa_maxima = pausa_maxima
+        self.espera_base = espera_base
+        self.polling_inicial = polling_inicial
+        self.cliente = None
+        # Conta -> instante (time.monotonic) antes do qual não se chama a API
+        self._liberada_em = {}
+        self.estatisticas = {'requisicoes': 0, 'repeticoes': 0, 'pausas': 0, 'paginas': 0, 'linhas': 0}
+
+    # ---------- chamadas ----------
+
+    def _url(self, caminho, parametros=None):
+        if caminho.startswith('http'):
+            return caminho
+        parametros = dict(parametros or {}, access_token=self.token)
+        return f"{self.base_url}/{self.versao}/{caminho.lstrip('/')}?{urlencode(parametros)}"
+
+    def _registrar_uso(self, conta, cabecalhos):
+        """Desacelera a conta conforme o uso informado pela API"""
+        uso, espera = uso_dos_cabecalhos(cabecalhos)
+        if uso >= self.limite_uso:
+            proporcao = min(1.0, (uso - self.limite_uso) / max(100 - self.limite_uso, 1))
+            espera = max(espera, self.pausa_maxima * proporcao)
+        if espera > 0:
+            self.estatisticas['pausas'] += 1
+            self._liberada_em[conta] = max(self._liberada_em.get(conta, 0), time.monotonic() + espera)
+
+    async def _chamar(self, conta, metodo, caminho, parametros=None):
+        """Uma chamada à Graph API com ritmo por conta e repetição com backoff"""
+        url = self._url(caminho, parametros if metodo == 'GET' else None)
+        corpo = urlencode(dict(parametros or {}, access_token=self.token)).encode() if metodo == 'POST' else None
+
+        for tentativa in range(TENTATIVAS):
+            espera = self._liberada_em.get(conta, 0) - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+            self.estatisticas['requisicoes'] += 1
+            try:
+                status, cabecalhos, resposta = await self.cliente.requisitar(metodo, url, corpo)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                erro = ErroGraphAPI(0, {'message': str(e), 'is_transient': True})
+            else:
+                self._registrar_uso(conta, cabecalhos)
+                dados = json.loads(resposta or b'{}')
+                if status < 400 and 'error' not in dados:
+                    return dados
+                erro = ErroGraphAPI(status, dados.get('error', {}))
+
+            limite = erro.codigo in CODIGOS_LIMITE or erro.status == 429
+            repetivel = limite or erro.transitorio or erro.codigo in CODIGOS_TRANSITORIOS or erro.status >= 500 or erro.status == 0
+            if not repetivel or tentativa == TENTATIVAS - 1:
+                raise erro
+
+            # Backoff exponencial com jitter; erros de limite pausam a conta inteira
+            self.estatisticas['repeticoes'] += 1
+            atraso = self.espera_base * (2 ** tentativa) * (0.5 + random.random())
+            if limite:
+                self._liberada_em[conta] = max(self._liberada_em.get(conta, 0), time.monotonic() + atraso)
+            else:
+                await asyncio.sleep(atraso)
+
+    async def _paginar(self, conta, caminho, parametros):
+        """Segue o cursor `paging.next` devolvendo a lista `data` de cada página"""
+        pagina = await self._chamar(conta, 'GET', caminho, parametros)
+        while True:
+            self.estatisticas['paginas'] += 1
+            if pagina.get('data'):
+                yield pagina['data']
+            proxima = pagina.get('paging', {}).get('next')
+            if not proxima:
+                return
+            pagina = await self._chamar(conta, 'GET', proxima)
+
+    def _parametros(self, inicio, fim):
+        return {
+            'level': 'campaign',
+            'time_increment': 1,
+            'fields': ','.join(CAMPOS_INSIGHTS),
+            'time_range': json.dumps({'since': inicio.isoformat(), 'until': fim.isoformat()}),
+            'limit': self.limite_pagina,
+        }
+
+    async def _insights_fatia(self, conta, inicio, fim):
+        """Páginas de uma fatia do período (relatório assíncrono ou leitura direta)"""
+        if not self.assincrono:
+            async for linhas in self._paginar(conta, f'{conta}/insights', self._parametros(inicio, fim)):
+                yield linhas
+            return
+
+        trabalho = await self._chamar(conta, 'POST', f'{conta}/insights', self._parametros(inicio, fim))
+        relatorio = trabalho['report_run_id']
+
+        intervalo = self.polling_inicial
+        while True:
+            situacao = await self._chamar(conta, 'GET', relatorio)
+            estado = situacao.get('async_status')
+            if estado == 'Job Completed':
+                break
+            if estado in ('Job Failed', 'Job Skipped'):
+                raise ErroGraphAPI(200, {'message': f"relatório {relatorio}: {estado}"})
+            await asyncio.sleep(intervalo)
+            intervalo = min(intervalo * 1.5, POLLING_MAXIMO)
+
+        async for linhas in self._paginar(conta, f'{relatorio}/insights', {'limit': self.limite_pagina}):
+            yield linhas
+
+    def fatias(self, desde, ate):
+        """Divide [desde, ate] em fatias de `dias_por_fatia` dias"""
+        inicio = desde
+        while inicio <= ate:
+            fim = min(inicio + timedelta(days=self.dias_por_fatia - 1), ate)
+            yield inicio, fim
+            inicio = fim + timedelta(days=1)
+
+    # ---------- normalização ----------
+
+    @staticmethod
+    def normalizar(linhas, conta=None):
+        """Linhas da API -> DataFrame com colunas e tipos dos analisadores"""
+        import pandas as pd
+        from analisador_profissional import AnalisadorMetaProfissional
+
+        bruto = pd.DataFrame.from_records(linhas)
+        dados = pd.DataFrame({
+            coluna: bruto[campo] if campo in bruto.columns else None
+            for campo, coluna in COLUNAS_API.items()
+        }, index=bruto.index)
+        dados['Leads'] = [
+            leads_das_acoes(acoes)
+            for acoes in (bruto['actions'] if 'actions' in bruto.columns else [None] * len(bruto))
+        ]
+        if conta is not None:
+            dados['Conta'] = conta
+
+        conversor = AnalisadorMetaProfissional()
+        conversor.formato_data = '%Y-%m-%d'
+        dados = conversor._converter_tipos(dados)
+        dados['Campanha'] = dados['Campanha'].astype('category')
+        return dados
+
+    # ---------- fluxo ----------
+
+    async def blocos(self, contas, desde, ate):
+        """Gerador assíncrono de DataFrames normalizados, na ordem em que as páginas chegam"""
+        fila = asyncio.Queue(maxsize=self.conexoes * 4)
+        fim_da_fila = object()
+
+        async def produzir(conta, inicio, fim):
+            async for linhas in self._insights_fatia(conta, inicio, fim):
+                await fila.put((conta, linhas))
+
+        async def produzir_tudo():
+            tarefas = [asyncio.ensure_future(produzir(conta, inicio, fim))
+                       for conta in contas for inicio, fim in self.fatias(desde, ate)]
+            try:
+                if tarefas:
+                    await asyncio.wait(tarefas, return_when=asyncio.FIRST_EXCEPTION)
+                erros = [t.exception() for t in tarefas if t.done() and not t.cancelled() and t.exception()]
+                await fila.put(erros[0] if erros else fim_da_fila)
+            finally:
+                # Primeiro erro (ou cancelamento pelo consumidor) interrompe as demais fatias
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                await asyncio.gather(*tarefas, return_exceptions=True)
+
+        dono_do_cliente = self.cliente is None
+        if dono_do_cliente:
+            self.cliente = ClienteHTTP(self.conexoes)
+        produtor = asyncio.ensure_future(produzir_tudo())
+        try:
+            while True:
+                item = await fila.get()
+                if item is fim_da_fila:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                conta, linhas = item
+                self.estatisticas['linhas'] += len(linhas)
+                yield self.normalizar(linhas, conta)
+        finally:
+            produtor.cancel()
+            if dono_do_cliente:
+                await self.cliente.fechar()
+                self.cliente = None
+
+    async def dataframe(self, contas, desde, ate):
+        """Todos os blocos num único DataFrame, ordenado por Data x Campanha"""
+        import pandas as pd
+
+        partes = [bloco async for bloco in self.blocos(contas, desde, ate)]
+        if not partes:
+            return self.normalizar([])
+        dados = pd.concat(partes, ignore_index=True)
+        dados['Campanha'] = dados['Campanha'].astype('category')
+        return dados.sort_values(['Data', 'Campanha'], ignore_index=True)
+
+
+def carregar_da_api(analisador, contas, desde, ate, **opcoes):
+    """Preenche um AnalisadorMetaProfissional direto da API (sem CSV)"""
+    token = opcoes.pop('token', None) or os.environ.get('META_ACCESS_TOKEN')
+    ingestor = IngestorGraphAPI(token, **opcoes)
+    dados = asyncio.run(ingestor.dataframe(contas, desde, ate))
+    analisador.dados = analisador._adicionar_colunas_calculadas(dados)
+    analisador.linhas_lidas = len(dados)
+    analisador.arquivo_csv = f"Graph API ({', '.join(contas)})"
+    return not dados.empty
+
+
+def ingerir_para_arquivo(contas, desde, ate, saida='meta_api.csv', token=None, **opcoes):
+    """Baixa as contas e grava o relatório detalhado em `saida` (formato pela extensão)"""
+    from analisador_profissional import AnalisadorMetaProfissional
+
+    token = token or os.environ.get('META_ACCESS_TOKEN')
+    if not token:
+        print("❌ Informe --token ou defina META_ACCESS_TOKEN")
+        return False
+
+    ingestor = IngestorGraphAPI(token, **opcoes)
+    inicio = time.perf_counter()
+    dados = asyncio.run(ingestor.dataframe(contas, desde, ate))
+    e = ingestor.estatisticas
+    print(f"✅ {len(dados):,} linhas de {len(contas)} contas em {time.perf_counter() - inicio:.1f}s "
+          f"({e['requisicoes']} requisições, {e['paginas']} páginas, {e['repeticoes']} repetições, {e['pausas']} pausas)")
+    if dados.empty:
+        print("⚠️  Nenhuma linha retornada no período")
+        return False
+
+    analisador = AnalisadorMetaProfissional()
+    analisador.dados = analisador._adicionar_colunas_calculadas(dados)
+    return analisador.exportar_relatorio_detalhado(saida)
+
+
+def executar_cli(args):
+    ok = ingerir_para_arquivo(args.contas, args.desde, args.ate, args.saida, args.token,
+                              base_url=args.base_url, versao=args.versao, conexoes=args.conexoes,
+                              assincrono=not args.sincrono, dias_por_fatia=args.dias_por_fatia)
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão concorrente de insights da Meta Marketing API")
+    opcoes_cli(parser)
+    return executar_cli(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+INSTRUMENTAÇÃO DO PIPELINE
+Arquitetura de Performance - ruas.dev.br
+
+Registra, para cada etapa dos analisadores, tempo de parede, tempo de CPU,
+linhas processadas, pico de memória rastreada durante a etapa (tracemalloc,
+inclui o que já estava alocado) e RSS no início e no fim. Desligada por
+padrão: cada etapa custa só um teste de booleano.
+
+Ativação por variável de ambiente:
+    META_PERFIL=1                    liga a instrumentação
+    META_PERFIL_SAIDA=perfil.json    trace JSON gravado ao final (padrão: perfil_meta.json)
+    META_PERFIL_CPROFILE=pasta       grava um .prof do cProfile por etapa de primeiro nível
+    META_PERFIL_MEMORIA=0            não usa tracemalloc (menos overhead)
+
+ou no código / CLI:
+    from instrumentacao import instrumentacao
+    instrumentacao.ativar(saida='perfil.json', pasta_cprofile='perfis')
+"""
+
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_atual_mb():
+    """RSS atual (Linux via /proc; nos demais, o máximo do processo)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+class _Etapa:
+    """Context manager de uma etapa ativa"""
+
+    def __init__(self, instrumentacao, nome, linhas):
+        self.instrumentacao = instrumentacao
+        self.nome = nome
+        self.linhas = linhas
+        self.pico = 0
+        self._perfil = None
+
+    def __enter__(self):
+        inst = self.instrumentacao
+        pilha = inst._pilha
+
+        # O pico acumulado até aqui pertence à etapa pai
+        if inst.memoria:
+            if pilha:
+                pilha[-1].pico = max(pilha[-1].pico, tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+; no 3.8 o pico fica acumulado
+                tracemalloc.reset_peak()
+
+        # Só um cProfile por vez: perfila a etapa mais externa
+        if inst.pasta_cprofile and not any(e._perfil for e in pilha):
+            import cProfile
+            self._perfil = cProfile.Profile()
+
+        self.nivel = len(pilha)
+        self.pai = pilha[-1].nome if pilha else None
+        pilha.append(self)
+
+        self.rss_inicio = _rss_atual_mb()
+        self.inicio = time.perf_counter()
+        self.inicio_cpu = time.process_time()
+        if self._perfil:
+            self._perfil.enable()
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if self._perfil:
+            self._perfil.disable()
+        parede = time.perf_counter() - self.inicio
+        cpu = time.process_time() - self.inicio_cpu
+
+        inst = self.instrumentacao
+        inst._pilha.pop()
+
+        if inst.memoria:
+            self.pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+            if inst._pilha:
+                inst._pilha[-1].pico = max(inst._pilha[-1].pico, self.pico)
+
+        registro = {
+            'etapa': self.nome,
+            'nivel': self.nivel,
+            'pai': self.pai,
+            'inicio_s': round(self.inicio - inst.origem, 6),
+            'parede_s': round(parede, 6),
+            'cpu_s': round(cpu, 6),
+            'linhas': self.linhas,
+            'pico_memoria_mb': round(self.pico / 1024 / 1024, 3) if inst.memoria else None,
+            'rss_inicio_mb': round(self.rss_inicio, 2) if self.rss_inicio else None,
+            'rss_fim_mb': round(_rss_atual_mb() or 0, 2) or None,
+            'erro': repr(valor) if valor else None,
+        }
+
+        if self._perfil:
+            os.makedirs(inst.pasta_cprofile, exist_ok=True)
+            nome_arquivo = f"{len(inst.registros):03d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', self.nome)}.prof"
+            registro['cprofile'] = os.path.join(inst.pasta_cprofile, nome_arquivo)
+            self._perfil.dump_stats(registro['cprofile'])
+
+        inst.registros.append(registro)
+        return False
+
+
+class _EtapaNula:
+    """Usada quando a instrumentação está desligada"""
+    linhas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class Instrumentacao:
+    def __init__(self):
+        self.ativo = False
+        self.memoria = False
+        self.pasta_cprofile = None
+        self.saida = None
+        self.registros = []
+        self.origem = time.perf_counter()
+        self._pilha = []
+        self._atexit = False
+
+    def ativar(self, saida='perfil_meta.json', pasta_cprofile=None, memoria=True):
+        """Liga a instrumentação; o trace é gravado em `saida` ao final do processo"""
+        self.ativo = True
+        self.memoria = memoria
+        self.pasta_cprofile = pasta_cprofile
+        self.saida = saida
+        self.registros = []
+        self.origem = time.perf_counter()
+
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if saida and not self._atexit:
+            atexit.register(self._salvar_ao_sair)
+            self._atexit = True
+        return self
+
+    def desativar(self):
+        self.ativo = False
+        if self.memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memoria = False
+
+    def etapa(self, nome, linhas=None):
+        """`with instrumentacao.etapa('nome'):` — defina `.linhas` dentro do bloco se souber"""
+        if not self.ativo:
+            return _ETAPA_NULA
+        return _Etapa(self, nome, linhas)
+
+    def trace(self):
+        return {
+            'processo': os.getpid(),
+            'argv': sys.argv,
+            'memoria': self.memoria,
+            'etapas': sorted(self.registros, key=lambda r: r['inicio_s']),
+        }
+
+    def salvar(self, caminho=None):
+        caminho = caminho or self.saida
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f, indent=2, ensure_ascii=False)
+        return caminho
+
+    def _salvar_ao_sair(self):
+        if self.ativo and self.registros and self.saida:
+            self.salvar()
+
+    def resumo(self):
+        """Tabela de texto com as etapas na ordem de início"""
+        linhas = []
+        for r in self.trace()['etapas']:
+            memoria = f" | pico {r['pico_memoria_mb']:.1f} MB" if r['pico_memoria_mb'] is not None else ""
+            contagem = f" | {r['linhas']:,} linhas" if r['linhas'] is not None else ""
+            linhas.append(f"{'  ' * r['nivel']}{r['etapa']:44} {r['parede_s']:8.3f}s (cpu {r['cpu_s']:.3f}s){contagem}{memoria}")
+        return '\n'.join(linhas)
+
+
+instrumentacao = Instrumentacao()
+
+
+def _linhas_de(objeto):
+    """Linhas em objeto.dados, quando houver"""
+    dados = getattr(objeto, 'dados', None)
+    try:
+        return len(dados) if dados is not None else None
+    except TypeError:
+        return None
+
+
+def instrumentado(nome, linhas=None):
+    """Decorador de método: registra a chamada como etapa `nome`
+
+    A contagem de linhas vem de `linhas(self, resultado)`; sem ela, de
+    len(self.dados) ao final da chamada.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(self, *args, **kwargs):
+            if not instrumentacao.ativo:
+                return funcao(self, *args, **kwargs)
+            with instrumentacao.etapa(nome) as etapa:
+                resultado = funcao(self, *args, **kwargs)
+                if etapa.linhas is None:
+                    etapa.linhas = linhas(self, resultado) if linhas else _linhas_de(self)
+                return resultado
+        return envolvida
+    return decorador
+
+
+if os.environ.get('META_PERFIL', '') not in ('', '0'):
+    instrumentacao.ativar(
+        saida=os.environ.get('META_PERFIL_SAIDA', 'perfil_meta.json'),
+        pasta_cprofile=os.environ.get('META_PERFIL_CPROFILE') or None,
+        memoria=os.environ.get('META_PERFIL_MEMORIA', '1') != '0',
+    )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+MOTOR DE JANELAS DE PERÍODO
+Arquitetura de Performance - ruas.dev.br
+
+Monta uma única vez as somas diárias acumuladas das métricas sobre um
+calendário contínuo. Qualquer janela (hoje, ontem, últimos N dias, mês
+atual, intervalo arbitrário) vira uma subtração entre duas posições dos
+vetores acumulados: O(1) por janela e nenhuma cópia do DataFrame.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+METRICAS_PADRAO = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance']
+
+
+def _para_dia(valor):
+    """Converte date/datetime/Timestamp/str em numpy datetime64[D]"""
+    return np.datetime64(pd.Timestamp(valor).date(), 'D')
+
+
+class MotorJanelas:
+    def __init__(self, dados, coluna_data='Data', metricas=METRICAS_PADRAO):
+        self.metricas = list(metricas)
+        self.acumulado = {}
+
+        dias = pd.to_datetime(dados[coluna_data], errors='coerce').to_numpy().astype('datetime64[D]')
+        validos = ~np.isnat(dias)
+
+        if not validos.any():
+            self.inicio = self.fim = None
+            return
+
+        dias = dias[validos]
+        self.inicio = dias.min()
+        self.fim = dias.max()
+        tamanho = int((self.fim - self.inicio).astype(int)) + 1
+        posicoes = (dias - self.inicio).astype(np.int64)
+
+        # Prefixo com zero: soma de [i, j) = acumulado[j] - acumulado[i]
+        contagem = np.bincount(posicoes, minlength=tamanho)
+        self.acumulado['linhas'] = np.concatenate(([0], np.cumsum(contagem)))
+        # Dias de calendário com dados: não depende de quantas linhas cada dia tem
+        self.acumulado['dias'] = np.concatenate(([0], np.cumsum(contagem > 0)))
+        for metrica in self.metricas:
+            if metrica not in dados.columns:
+                continue
+            valores = dados[metrica].to_numpy(dtype=np.float64)[validos]
+            diario = np.bincount(posicoes, weights=valores, minlength=tamanho)
+            self.acumulado[metrica] = np.concatenate(([0.0], np.cumsum(diario)))
+
+    @property
+    def vazio(self):
+        return self.inicio is None
+
+    def _posicao(self, dia):
+        """Posição do dia no calendário, limitada ao intervalo dos dados"""
+        deslocamento = int((dia - self.inicio).astype(int))
+        return min(max(deslocamento, 0), len(self.acumulado['linhas']) - 1)
+
+    def intervalo(self, inicio=None, fim=None):
+        """Totais entre `inicio` e `fim` (inclusive); None = sem limite"""
+        totais = {m: 0.0 for m in self.metricas}
+        totais['linhas'] = totais['dias'] = 0
+        if self.vazio:
+            return totais
+
+        i = 0 if inicio is None else self._posicao(_para_dia(inicio))
+        j = len(self.acumulado['linhas']) - 1 if fim is None else self._posicao(_para_dia(fim) + 1)
+        if j <= i:
+            return totais
+
+        for chave, vetor in self.acumulado.items():
+            totais[chave] = vetor[j] - vetor[i]
+        totais['linhas'] = int(totais['linhas'])
+        totais['dias'] = int(totais['dias'])
+        return totais
+
+    def desde(self, limite):
+        """Totais de todas as linhas com Data >= limite (datetime com hora)"""
+        primeiro_dia = pd.Timestamp(limite).ceil('D')
+        return self.intervalo(primeiro_dia, None)
+
+    def ultimos_dias(self, n, referencia=None):
+        """Últimos `n` dias corridos terminando em `referencia` (padrão: hoje)"""
+        referencia = referencia or date.today()
+        return self.intervalo(referencia - timedelta(days=n - 1), referencia)
+
+    def dia(self, referencia):
+        return self.intervalo(referencia, referencia)
+
+    def hoje(self):
+        return self.dia(date.today())
+
+    def ontem(self):
+        return self.dia(date.today() - timedelta(days=1))
+
+    def mes_atual(self, referencia=None):
+        referencia = referencia or date.today()
+        return self.intervalo(referencia.replace(day=1), referencia)
+
+    def consultar(self, janelas):
+        """Responde várias janelas de uma vez: {'nome': (inicio, fim), ...}"""
+        return {nome: self.intervalo(inicio, fim) for nome, (inicio, fim) in janelas.items()}
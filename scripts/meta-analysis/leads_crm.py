@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+LEADS DO CRM: DEDUPLICAÇÃO E CAC REAL
+Arquitetura de Performance - ruas.dev.br
+
+Lê exportações com uma linha por lead (formulários do META, CRM) em blocos,
+descarta repetições pelo e-mail/telefone normalizado e cruza os leads
+únicos com o gasto por Data x Campanha. O CAC real sai do gasto do META
+dividido pelos leads que de fato chegaram ao CRM.
+
+Deduplicação: cada identificador vira um hash de 64 bits. No modo exato os
+hashes ficam num conjunto de endereçamento aberto em numpy (16 bytes por
+identificador, sem objetos Python); no modo bloom, num filtro de Bloom de
+tamanho fixo, calculado pela capacidade e taxa de falso positivo (cerca de
+1,8 byte por identificador a 0,1%). Um falso positivo descarta um lead
+único como repetido.
+
+Com pyarrow instalado o CSV é lido pelo leitor em fluxo dele (várias
+vezes mais rápido que o read_csv em blocos); sem ele, pelo pandas.
+
+Cruzamento: hash join em fluxo. O gasto (pequeno) vira um índice por chave
+Data x Campanha; cada bloco de leads só consulta o índice e soma contagens
+alinhadas às linhas do gasto, sem juntar os leads em memória.
+
+Uso:
+    python meta_leads_analyzer.py leads leads.csv [EXPORTACAO] [--bloom --capacidade 50M --erro 0.001] [--saida cac_real.csv]
+"""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from dimensoes import somar_por
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+TAMANHO_BLOCO_LEADS = 500_000
+# Leitor em fluxo do pyarrow: blocos de bytes (~500 mil leads), com várias threads
+BYTES_BLOCO_LEADS = 64 * 1024 * 1024
+CAPACIDADE_PADRAO = 10_000_000
+TAXA_ERRO_PADRAO = 0.001
+
+# Chaves distintas separam os espaços de hash de e-mails, telefones e campanhas
+CHAVE_EMAIL = 'leads-crm-email!'
+CHAVE_TELEFONE = 'leads-crm-fone!!'
+CHAVE_CAMPANHA = 'leads-crm-camp!!'
+MULTIPLICADOR_DIA = np.uint64(0x9E3779B97F4A7C15)
+
+FORMATOS_DATA_LEADS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
+
+
+def mapear_colunas_leads(cabecalho):
+    """Mapeia o cabeçalho de uma exportação de leads para Data/Campanha/Email/Telefone"""
+    mapeamento = {}
+    for col in cabecalho:
+        col_lower = str(col).lower()
+        if 'mail' in col_lower:
+            destino = 'Email'
+        elif any(p in col_lower for p in ('phone', 'telefone', 'celular', 'whatsapp', 'fone')):
+            destino = 'Telefone'
+        elif 'camp' in col_lower and 'id' not in re.split(r'[\W_]+', col_lower):
+            destino = 'Campanha'
+        elif any(p in col_lower for p in ('created', 'criado', 'date', 'data')):
+            destino = 'Data'
+        else:
+            continue
+        # Primeira coluna de cada destino
+        if destino not in mapeamento.values():
+            mapeamento[col] = destino
+    return mapeamento
+
+
+def normalizar_email(serie):
+    """Minúsculas, sem espaços; sem '@' vira ausente"""
+    email = serie.astype('string').str.strip().str.lower()
+    return email.where(email.str.contains('@', regex=False, na=False))
+
+
+def normalizar_telefone(serie):
+    """Só dígitos, sem zeros à esquerda nem o 55 do Brasil; menos de 8 dígitos vira ausente"""
+    fone = serie.astype('string').str.replace(r'\D', '', regex=True).str.lstrip('0')
+    com_pais = fone.str.startswith('55', na=False) & fone.str.len().isin([12, 13])
+    fone = fone.where(~com_pais, fone.str.slice(2))
+    return fone.where(fone.str.len() >= 8)
+
+
+def hash_identificadores(serie, chave):
+    """Hash uint64 de cada valor; ausentes viram 0"""
+    valores = serie.to_numpy(dtype=object, na_value=None)
+    presentes = serie.notna().to_numpy()
+    hashes = np.zeros(len(valores), dtype=np.uint64)
+    if presentes.any():
+        hashes[presentes] = pd.util.hash_array(valores[presentes], hash_key=chave, categorize=False)
+        # 0 é o marcador de vazio das estruturas
+        hashes[presentes & (hashes == 0)] = 1
+    return hashes
+
+
+class ConjuntoHash:
+    """Conjunto exato de hashes uint64: endereçamento aberto com sondagem linear vetorizada"""
+
+    def __init__(self, capacidade=1 << 16):
+        self.tabela = np.zeros(self._tamanho_para(capacidade), dtype=np.uint64)
+        self.quantidade = 0
+
+    @staticmethod
+    def _tamanho_para(quantidade):
+        """Potência de 2 com ocupação máxima de 50%"""
+        return 1 << max(int(2 * quantidade).bit_length(), 4)
+
+    def __len__(self):
+        return self.quantidade
+
+    @property
+    def nbytes(self):
+        return self.tabela.nbytes
+
+    def contem(self, hashes):
+        """Máscara de quais hashes já estão no conjunto"""
+        mascara = np.uint64(len(self.tabela) - 1)
+        posicoes = hashes & mascara
+        encontrados = np.zeros(len(hashes), dtype=bool)
+        pendentes = np.arange(len(hashes))
+        while len(pendentes):
+            valores = self.tabela[posicoes[pendentes]]
+            achou = valores == hashes[pendentes]
+            encontrados[pendentes[achou]] = True
+            pendentes = pendentes[~achou & (valores != 0)]
+            posicoes[pendentes] = (posicoes[pendentes] + np.uint64(1)) & mascara
+        return encontrados
+
+    def adicionar(self, hashes):
+        """Insere hashes distintos entre si e ausentes do conjunto"""
+        if self.quantidade + len(hashes) > len(self.tabela) // 2:
+            self._crescer(self.quantidade + len(hashes))
+        self._inserir(hashes)
+        self.quantidade += len(hashes)
+
+    def _inserir(self, hashes):
+        mascara = np.uint64(len(self.tabela) - 1)
+        posicoes = hashes & mascara
+        pendentes = np.arange(len(hashes))
+        while len(pendentes):
+            alvo = posicoes[pendentes]
+            livres = self.tabela[alvo] == 0
+            # Disputa pela mesma posição livre: o primeiro fica, os outros seguem sondando
+            disputadas = alvo[livres]
+            vencedores = pendentes[livres][~pd.Series(disputadas).duplicated().to_numpy()]
+            self.tabela[posicoes[vencedores]] = hashes[vencedores]
+            inseridos = np.zeros(len(hashes), dtype=bool)
+            inseridos[vencedores] = True
+            pendentes = pendentes[~inseridos[pendentes]]
+            posicoes[pendentes] = (posicoes[pendentes] + np.uint64(1)) & mascara
+
+    def _crescer(self, quantidade):
+        antigos = self.tabela[self.tabela != 0]
+        self.tabela = np.zeros(self._tamanho_para(quantidade), dtype=np.uint64)
+        self._inserir(antigos)
+
+
+class FiltroBloom:
+    """Filtro de Bloom de tamanho fixo sobre hashes uint64 (hashing duplo)"""
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO, taxa_erro=TAXA_ERRO_PADRAO):
+        bits = math.ceil(-capacidade * math.log(taxa_erro) / math.log(2) ** 2)
+        self.bits = max(64, (bits + 7) // 8 * 8)
+        self.funcoes = max(1, round(self.bits / capacidade * math.log(2)))
+        self.vetor = np.zeros(self.bits // 8, dtype=np.uint8)
+        self.capacidade = capacidade
+        self.quantidade = 0
+
+    def __len__(self):
+        return self.quantidade
+
+    @property
+    def nbytes(self):
+        return self.vetor.nbytes
+
+    @property
+    def taxa_estimada(self):
+        """Probabilidade de falso positivo com os itens já inseridos"""
+        return (1 - math.exp(-self.funcoes * self.quantidade / self.bits)) ** self.funcoes
+
+    def _posicoes(self, hashes):
+        h1 = (hashes & np.uint64(0xFFFFFFFF))[:, None]
+        h2 = ((hashes >> np.uint64(32)) | np.uint64(1))[:, None]
+        i = np.arange(self.funcoes, dtype=np.uint64)[None, :]
+        return (h1 + i * h2) % np.uint64(self.bits)
+
+    def contem(self, hashes):
+        posicoes = self._posicoes(hashes)
+        bits = (self.vetor[posicoes >> np.uint64(3)] >> (posicoes & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def adicionar(self, hashes):
+        posicoes = self._posicoes(hashes).ravel()
+        np.bitwise_or.at(self.vetor, posicoes >> np.uint64(3),
+                         np.left_shift(1, (posicoes & np.uint64(7)).astype(np.uint8)).astype(np.uint8))
+        self.quantidade += len(hashes)
+
+
+class DeduplicadorLeads:
+    """Marca a primeira ocorrência de cada lead por e-mail OU telefone, bloco a bloco"""
+
+    def __init__(self, modo='exato', capacidade=CAPACIDADE_PADRAO, taxa_erro=TAXA_ERRO_PADRAO):
+        if modo not in ('exato', 'bloom'):
+            raise ValueError("modo deve ser 'exato' ou 'bloom'")
+        self.modo = modo
+        self.vistos = FiltroBloom(capacidade, taxa_erro) if modo == 'bloom' else ConjuntoHash()
+        self.estatisticas = {'linhas': 0, 'sem_contato': 0, 'duplicadas': 0, 'unicas': 0}
+
+    def novos(self, email, telefone):
+        """Máscara dos leads do bloco ainda não vistos (hashes uint64, 0 = ausente)
+
+        Os identificadores de todas as linhas entram no conjunto, inclusive
+        os das repetidas: quem troca de e-mail mas mantém o telefone continua
+        ligado ao mesmo lead. Linhas sem e-mail nem telefone contam como
+        únicas (não há como compará-las).
+        """
+        tem_email, tem_telefone = email != 0, telefone != 0
+
+        # Repetições dentro do próprio bloco
+        repetido = tem_email & pd.Series(email).duplicated().to_numpy()
+        repetido |= tem_telefone & pd.Series(telefone).duplicated().to_numpy()
+
+        # Repetições de blocos anteriores: só os identificadores distintos consultam a estrutura
+        distintos = pd.unique(np.concatenate([email[tem_email], telefone[tem_telefone]]))
+        ja_vistos = self.vistos.contem(distintos)
+        if ja_vistos.any():
+            vistos = distintos[ja_vistos]
+            repetido |= tem_email & np.isin(email, vistos, assume_unique=False)
+            repetido |= tem_telefone & np.isin(telefone, vistos, assume_unique=False)
+        self.vistos.adicionar(distintos[~ja_vistos])
+
+        sem_contato = ~tem_email & ~tem_telefone
+        self.estatisticas['linhas'] += len(email)
+        self.estatisticas['sem_contato'] += int(sem_contato.sum())
+        self.estatisticas['duplicadas'] += int(repetido.sum())
+        self.estatisticas['unicas'] += int((~repetido).sum())
+        return ~repetido
+
+
+def _chaves_juncao(datas, campanhas):
+    """Chave uint64 de Data x Campanha (nome sem espaços nas pontas, sem caixa)"""
+    chave = hash_identificadores(campanhas.astype('string').str.strip().str.casefold(), CHAVE_CAMPANHA)
+    if datas is not None:
+        dias = datas.to_numpy(dtype='datetime64[D]').astype(np.int64).astype(np.uint64)
+        chave = chave ^ (dias * MULTIPLICADOR_DIA)
+    return chave
+
+
+class CruzamentoLeads:
+    """Hash join em fluxo: conta leads únicos nas linhas de gasto Data x Campanha"""
+
+    def __init__(self, gasto, por_data=True):
+        self.chaves = (['Data'] if por_data and 'Data' in gasto.columns else []) + ['Campanha']
+        metricas = [c for c in ('Gasto', 'Leads', 'Cliques', 'Impressoes') if c in gasto.columns]
+        gasto = gasto.assign(Campanha=gasto['Campanha'].astype('string').str.strip())
+        if 'Data' in self.chaves:
+            gasto['Data'] = pd.to_datetime(gasto['Data']).dt.normalize()
+        self.gasto = somar_por(gasto, self.chaves, metricas)
+
+        datas = self.gasto['Data'] if 'Data' in self.chaves else None
+        # Nomes que só diferem na caixa caem na mesma chave: fica a primeira linha
+        self.indice = pd.Index(_chaves_juncao(datas, self.gasto['Campanha']))
+        if not self.indice.is_unique:
+            primeiras = ~self.indice.duplicated()
+            self.gasto = self.gasto[primeiras].reset_index(drop=True)
+            self.indice = self.indice[primeiras]
+
+        self.leads = np.zeros(len(self.gasto), dtype=np.int64)
+        self.sem_gasto = pd.Series(dtype='int64')
+        self.estatisticas = {'casados': 0, 'sem_gasto': 0}
+
+    def absorver(self, datas, campanhas):
+        """Soma um bloco de leads únicos às linhas de gasto correspondentes"""
+        posicoes = self.indice.get_indexer(_chaves_juncao(datas if 'Data' in self.chaves else None, campanhas))
+        casados = posicoes >= 0
+        self.leads += np.bincount(posicoes[casados], minlength=len(self.leads))
+        self.estatisticas['casados'] += int(casados.sum())
+        self.estatisticas['sem_gasto'] += int((~casados).sum())
+        if not casados.all():
+            orfaos = campanhas[~casados].fillna('(sem campanha)').value_counts()
+            self.sem_gasto = self.sem_gasto.add(orfaos, fill_value=0).astype('int64')
+
+    def resultado(self):
+        """Linhas de gasto com Leads_CRM e CAC_real"""
+        tabela = self.gasto.copy()
+        tabela['Leads_CRM'] = self.leads
+        return _com_cac_real(tabela)
+
+    def por_campanha(self):
+        """Mesmas colunas somadas por campanha, maior gasto primeiro"""
+        tabela = self.resultado()
+        metricas = [c for c in tabela.columns if c not in ('Data', 'Campanha', 'CAC', 'CAC_real')]
+        tabela = _com_cac_real(somar_por(tabela, ['Campanha'], metricas))
+        if 'Gasto' in tabela.columns:
+            tabela = tabela.sort_values('Gasto', ascending=False, kind='stable', ignore_index=True)
+        return tabela
+
+
+def _com_cac_real(tabela):
+    """CAC do META (Gasto/Leads) e CAC real (Gasto/Leads_CRM)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'Leads' in tabela.columns:
+            tabela['CAC'] = np.where(tabela['Leads'] > 0, tabela['Gasto'] / tabela['Leads'], 0)
+        tabela['CAC_real'] = np.where(tabela['Leads_CRM'] > 0, tabela['Gasto'] / tabela['Leads_CRM'], 0)
+    return tabela
+
+
+def _formato_data(amostra):
+    """Formato dos 10 primeiros caracteres das datas (ISO com hora/fuso também)"""
+    amostra = amostra.dropna().str.slice(0, 10)
+    for formato in FORMATOS_DATA_LEADS:
+        try:
+            pd.to_datetime(amostra, format=formato)
+            return formato
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def _blocos_csv(caminho, colunas, tamanho_bloco):
+    """Blocos do CSV só com `colunas`, tudo como texto"""
+    if pa_csv is None:
+        yield from pd.read_csv(caminho, usecols=colunas, dtype='string', chunksize=tamanho_bloco)
+        return
+    leitor = pa_csv.open_csv(
+        caminho,
+        read_options=pa_csv.ReadOptions(block_size=BYTES_BLOCO_LEADS),
+        convert_options=pa_csv.ConvertOptions(include_columns=colunas,
+                                              column_types={c: pa.string() for c in colunas}),
+    )
+    for lote in leitor:
+        yield lote.to_pandas()
+
+
+def ler_leads(caminho, tamanho_bloco=TAMANHO_BLOCO_LEADS):
+    """Blocos (Data, Campanha, Email, Telefone) normalizados de uma exportação de leads
+
+    A data é a do registro como aparece no arquivo (created_time em
+    ISO com fuso é cortado no dia local do próprio texto).
+    """
+    cabecalho = tuple(pd.read_csv(caminho, nrows=0).columns)
+    renomear = mapear_colunas_leads(cabecalho)
+    if 'Campanha' not in renomear.values():
+        raise ValueError(f"{caminho}: nenhuma coluna de campanha no cabeçalho")
+    if not {'Email', 'Telefone'} & set(renomear.values()):
+        raise ValueError(f"{caminho}: nenhuma coluna de e-mail ou telefone no cabeçalho")
+
+    formato = None
+    coluna_data = next((o for o, d in renomear.items() if d == 'Data'), None)
+    if coluna_data is not None:
+        formato = _formato_data(pd.read_csv(caminho, usecols=[coluna_data], nrows=200, dtype='string')[coluna_data])
+
+    for bloco in _blocos_csv(caminho, list(renomear), tamanho_bloco):
+        bloco = bloco.rename(columns=renomear)
+        yield {
+            'Data': pd.to_datetime(bloco['Data'].str.slice(0, 10), format=formato, errors='coerce')
+                    if 'Data' in bloco.columns else None,
+            'Campanha': bloco['Campanha'].str.strip(),
+            'Email': normalizar_email(bloco['Email']) if 'Email' in bloco.columns else None,
+            'Telefone': normalizar_telefone(bloco['Telefone']) if 'Telefone' in bloco.columns else None,
+        }
+
+
+def cruzar_leads(caminho, gasto, modo='exato', capacidade=CAPACIDADE_PADRAO, taxa_erro=TAXA_ERRO_PADRAO,
+                 tamanho_bloco=TAMANHO_BLOCO_LEADS, por_data=True):
+    """Deduplica a exportação de leads em `caminho` e cruza com `gasto` (Data x Campanha)
+
+    Retorna o CruzamentoLeads (resultado(), por_campanha(), sem_gasto) com
+    as estatísticas da deduplicação somadas às do cruzamento.
+    """
+    deduplicador = DeduplicadorLeads(modo, capacidade, taxa_erro)
+    cruzamento = CruzamentoLeads(gasto, por_data)
+
+    for bloco in ler_leads(caminho, tamanho_bloco):
+        n = len(bloco['Campanha'])
+        vazio = np.zeros(n, dtype=np.uint64)
+        email = hash_identificadores(bloco['Email'], CHAVE_EMAIL) if bloco['Email'] is not None else vazio
+        telefone = hash_identificadores(bloco['Telefone'], CHAVE_TELEFONE) if bloco['Telefone'] is not None else vazio
+
+        novos = deduplicador.novos(email, telefone)
+        datas = bloco['Data'][novos] if bloco['Data'] is not None else None
+        if datas is None and 'Data' in cruzamento.chaves:
+            raise ValueError(f"{caminho}: sem coluna de data; use por_data=False")
+        cruzamento.absorver(datas, bloco['Campanha'][novos])
+
+    cruzamento.estatisticas.update(deduplicador.estatisticas)
+    cruzamento.estatisticas['modo'] = modo
+    cruzamento.estatisticas['memoria_mb'] = deduplicador.vistos.nbytes / 1024 ** 2
+    if modo == 'bloom':
+        cruzamento.estatisticas['falso_positivo'] = deduplicador.vistos.taxa_estimada
+    return cruzamento
+
+
+def exibir_cruzamento(cruzamento, top=10):
+    """Resumo do funil e CAC do META x CAC real das maiores campanhas"""
+    e = cruzamento.estatisticas
+    print(f"\n🧲 LEADS DO CRM ({e['modo']}, {e['memoria_mb']:.1f} MB na deduplicação):")
+    print("-"*40)
+    print(f"   • Linhas lidas: {e['linhas']:,}")
+    print(f"   • Repetidas (e-mail/telefone): {e['duplicadas']:,}")
+    print(f"   • Únicas: {e['unicas']:,} ({e['sem_contato']:,} sem e-mail nem telefone)")
+    if 'falso_positivo' in e:
+        print(f"   • Falso positivo estimado do filtro: {e['falso_positivo']:.4%}")
+    print(f"   • Casadas com gasto: {e['casados']:,} | sem gasto correspondente: {e['sem_gasto']:,}")
+
+    tabela = cruzamento.por_campanha()
+    if tabela.empty:
+        return
+    print(f"\n💰 CAC META x CAC REAL (top {min(top, len(tabela))} por gasto):")
+    print("-"*40)
+    for _, row in tabela.head(top).iterrows():
+        meta = f" | CAC META: R$ {row['CAC']:,.2f}" if 'CAC' in row else ""
+        print(f"   {str(row['Campanha'])[:30]:30} | {row['Leads_CRM']:.0f} leads CRM{meta} | CAC real: R$ {row['CAC_real']:,.2f}")
+
+    if len(cruzamento.sem_gasto):
+        print("   • Campanhas com leads e sem gasto:")
+        for campanha, leads in cruzamento.sem_gasto.nlargest(3).items():
+            print(f"      {str(campanha)[:30]:30} | {leads:,} leads")
+
+
+def executar_cli(args, analisador):
+    """Roda o cruzamento para o subcomando `leads` com o analisador já carregado"""
+    try:
+        cruzamento = analisador.cruzar_leads(
+            args.leads, modo='bloom' if args.bloom else 'exato', capacidade=args.capacidade,
+            taxa_erro=args.erro, por_data=not args.sem_data,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ Erro ao cruzar leads: {e}")
+        return 1
+    if cruzamento is None:
+        return 1
+
+    exibir_cruzamento(cruzamento, args.top)
+    if args.saida:
+        from analisador_profissional import formato_exportacao
+
+        analisador._gravar_tabela(cruzamento.resultado(), args.saida, formato_exportacao(args.saida),
+                                  not args.sem_data)
+        print(f"\n💾 Cruzamento salvo: {args.saida}")
+    return 0
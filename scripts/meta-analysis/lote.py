@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+ANÁLISE EM LOTE META ADS
+Arquitetura de Performance - ruas.dev.br
+
+Encontra todas as exportações CSV de uma árvore de pastas, processa cada uma
+(carregar → padronizar → calcular) em um pool de processos e gera:
+  • um relatório por arquivo (texto, CSV detalhado e métricas chave)
+  • opcionalmente, um relatório por campanha de cada arquivo (--por-campanha)
+  • um relatório consolidado com todas as contas somadas
+
+Uso:
+    python lote.py [PASTA] [--saida relatorios_lote] [--processos N] [--por-campanha]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+# Arquivos gerados pelos próprios analisadores não são exportações
+PREFIXOS_IGNORADOS = ('relatorio_',)
+# Saídas padrão (--saida) dos subcomandos da CLI
+ARQUIVOS_IGNORADOS = {'acoes.csv', 'alocacao.csv', 'cac_real.csv', 'quebra.csv'}
+PASTAS_IGNORADAS = {
+    '.cache_meta', 'cubo_meta', '__pycache__', '.git',
+    'relatorios_lote', 'relatorios_campanhas', 'site_dados', '.bench_dados',
+}
+
+
+def descobrir_exportacoes(raiz='.', ignorar=()):
+    """Lista recursivamente os CSVs de exportação sob `raiz`"""
+    ignorar = {os.path.abspath(p) for p in ignorar}
+    encontrados = []
+
+    for pasta, subpastas, arquivos in os.walk(raiz):
+        subpastas[:] = sorted(
+            d for d in subpastas
+            if d not in PASTAS_IGNORADAS and os.path.abspath(os.path.join(pasta, d)) not in ignorar
+        )
+        for nome in sorted(arquivos):
+            if (nome.lower().endswith('.csv') and not nome.startswith(PREFIXOS_IGNORADOS)
+                    and nome not in ARQUIVOS_IGNORADOS):
+                encontrados.append(os.path.join(pasta, nome))
+
+    return encontrados
+
+
+def _nome_saida(caminho, raiz):
+    """Nome único e legível para os relatórios de um arquivo"""
+    relativo = os.path.relpath(caminho, raiz)
+    return os.path.splitext(relativo)[0].replace(os.sep, '__')
+
+
+def processar_arquivo(caminho, raiz, diretorio_saida, streaming=None, por_campanha=False):
+    """Executado em cada processo: relatórios de um arquivo + seu agregado"""
+    from analisador_profissional import AnalisadorMetaProfissional
+    from cubo_rollup import CuboRollup
+    from renderizacao import escrita_atomica
+
+    inicio = time.perf_counter()
+    nome = _nome_saida(caminho, raiz)
+    saida_texto = io.StringIO()
+
+    # Toda a saída do analisador vira o relatório em texto deste arquivo
+    with contextlib.redirect_stdout(saida_texto):
+        analisador = AnalisadorMetaProfissional(arquivo_csv=caminho)
+        if not analisador.carregar_dados(streaming=streaming):
+            linhas = saida_texto.getvalue().strip().splitlines()
+            return {'arquivo': caminho, 'ok': False, 'erro': linhas[-1] if linhas else 'falha ao carregar'}
+
+        analisador.gerar_relatorio_completo()
+        analisador.exportar_relatorio_detalhado(os.path.join(diretorio_saida, f"{nome}_detalhado.csv"))
+        analisador.salvar_metricas_chave(os.path.join(diretorio_saida, f"{nome}_metricas.txt"))
+        # Já estamos num processo do pool: renderiza as campanhas aqui mesmo
+        if por_campanha:
+            analisador.gerar_relatorios_campanhas(os.path.join(diretorio_saida, f"{nome}_campanhas"), processos=1)
+
+    with escrita_atomica(os.path.join(diretorio_saida, f"{nome}_relatorio.txt")) as f:
+        f.write(saida_texto.getvalue())
+
+    agregado = None
+    if 'Data' in analisador.dados.columns:
+        agregado = CuboRollup.consolidar(analisador.dados)
+
+    return {
+        'arquivo': caminho,
+        'ok': True,
+        'linhas': analisador.linhas_lidas,
+        'segundos': time.perf_counter() - inicio,
+        'agregado': agregado,
+    }
+
+
+def consolidar_resultados(resultados, diretorio_saida):
+    """Soma os agregados de todos os arquivos e gera o relatório consolidado"""
+    import pandas as pd
+
+    from analisador_profissional import COLUNAS_CHAVE, AnalisadorMetaProfissional
+    from renderizacao import escrita_atomica
+
+    agregados = [r['agregado'] for r in resultados if r.get('agregado') is not None]
+    if not agregados:
+        return False
+
+    consolidado = pd.concat(agregados, ignore_index=True)
+    consolidado = consolidado.groupby(COLUNAS_CHAVE).sum().reset_index()
+
+    analisador = AnalisadorMetaProfissional(arquivo_csv=f"{len(agregados)} arquivos (consolidado)")
+    analisador.dados = analisador._adicionar_colunas_calculadas(consolidado)
+    analisador.modo_agregado = True
+
+    saida_texto = io.StringIO()
+    with contextlib.redirect_stdout(saida_texto):
+        analisador.gerar_relatorio_completo()
+    with escrita_atomica(os.path.join(diretorio_saida, 'consolidado_relatorio.txt')) as f:
+        f.write(saida_texto.getvalue())
+
+    analisador.exportar_relatorio_detalhado(os.path.join(diretorio_saida, 'consolidado_detalhado.csv'))
+    analisador.salvar_metricas_chave(os.path.join(diretorio_saida, 'consolidado_metricas.txt'))
+    return True
+
+
+def executar_lote(raiz='.', diretorio_saida='relatorios_lote', processos=None, streaming=None, por_campanha=False):
+    """Processa todas as exportações de `raiz` em paralelo"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    os.makedirs(diretorio_saida, exist_ok=True)
+    arquivos = descobrir_exportacoes(raiz, ignorar=[diretorio_saida])
+
+    if not arquivos:
+        print(f"❌ Nenhum arquivo CSV encontrado em {raiz}")
+        return []
+
+    processos = processos or os.cpu_count() or 1
+    print(f"📂 {len(arquivos)} exportações encontradas | ⚙️  {processos} processos")
+
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        tarefas = {
+            pool.submit(processar_arquivo, caminho, raiz, diretorio_saida, streaming, por_campanha): caminho
+            for caminho in arquivos
+        }
+        for tarefa in as_completed(tarefas):
+            try:
+                resultado = tarefa.result()
+            except Exception as e:
+                resultado = {'arquivo': tarefas[tarefa], 'ok': False, 'erro': str(e)}
+
+            if resultado['ok']:
+                print(f"   ✅ {resultado['arquivo']} ({resultado['linhas']} linhas, {resultado['segundos']:.1f}s)")
+            else:
+                print(f"   ❌ {resultado['arquivo']}: {resultado['erro']}")
+            resultados.append(resultado)
+
+    if consolidar_resultados(resultados, diretorio_saida):
+        print(f"\n📊 Relatório consolidado salvo em {diretorio_saida}/")
+
+    ok = sum(1 for r in resultados if r['ok'])
+    print(f"🎉 {ok}/{len(arquivos)} arquivos em {time.perf_counter() - inicio:.1f}s")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisa todas as exportações META Ads de uma pasta")
+    parser.add_argument('pasta', nargs='?', default='.', help="pasta raiz com as exportações (padrão: atual)")
+    parser.add_argument('--saida', default='relatorios_lote', help="pasta dos relatórios gerados")
+    parser.add_argument('--processos', type=int, default=None, help="número de processos (padrão: núcleos da CPU)")
+    parser.add_argument('--streaming', action='store_true', default=None, help="força leitura em blocos")
+    parser.add_argument('--por-campanha', action='store_true', help="também grava um relatório por campanha de cada arquivo")
+    args = parser.parse_args()
+
+    executar_lote(args.pasta, args.saida, args.processos, args.streaming, args.por_campanha)
+
+
+if __name__ == "__main__":
+    main()
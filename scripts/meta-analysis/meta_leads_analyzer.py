@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+META LEADS ANALYZER - CLI UNIFICADA
+Arquitetura de Performance - ruas.dev.br
+
+Ponto único de entrada para os analisadores META Ads. Importar este módulo
+não imprime nada, não lê arquivos e não carrega pandas/numpy: cada
+subcomando importa só o que precisa, então `--help` e `list` respondem em
+poucos milissegundos (importante para cron e dashboards que chamam a CLI
+muitas vezes ao dia).
+
+Uso:
+    python meta_leads_analyzer.py report  [ARQUIVO] [--streaming] [--sem-cache] [--cubo DIR | --sqlite BANCO]
+    python meta_leads_analyzer.py export  [ARQUIVO] [--saida relatorio_detalhado.parquet] [--particionar mes|campanha]
+    python meta_leads_analyzer.py metrics [ARQUIVO] [--saida metricas_chave.txt]
+    python meta_leads_analyzer.py detalhar [ARQUIVO] --por Idade Genero [--dias 30] [--top 20] [--saida quebra.csv]
+    python meta_leads_analyzer.py acoes   [ARQUIVO] [--regras regras.json] [--top 20] [--saida acoes.csv]
+    python meta_leads_analyzer.py orcamento [ARQUIVO] [--orcamento 5000] [--dias 30] [--sorteios 2000] [--saida alocacao.csv]
+    python meta_leads_analyzer.py site    [ARQUIVO] [--saida site_dados] [--dias-serie 90]
+    python meta_leads_analyzer.py relatorios [ARQUIVO] [--saida relatorios_campanhas] [--processos N]
+    python meta_leads_analyzer.py leads   LEADS [ARQUIVO] [--bloom --capacidade 50M] [--saida cac_real.csv]
+    python meta_leads_analyzer.py batch   [PASTA]   [--saida relatorios_lote] [--processos N] [--por-campanha]
+    python meta_leads_analyzer.py list    [PASTA]
+    python meta_leads_analyzer.py watch   [PASTA]   [--intervalo 0.5]
+
+Perfil por etapa (tempo, CPU, linhas, memória; ver instrumentacao.py):
+    python meta_leads_analyzer.py --perfil perfil.json [--perfil-cprofile DIR] report dados.csv
+
+Também pode ser usado como biblioteca; as classes são carregadas sob demanda:
+    import meta_leads_analyzer as mla
+    analisador = mla.AnalisadorMetaProfissional('dados.csv')
+"""
+
+import argparse
+import importlib
+import sys
+
+__version__ = '2.1.0'
+
+# Nome público -> módulo que o define (importado só no primeiro acesso)
+_EXPORTACOES_PREGUICOSAS = {
+    'AnalisadorMetaProfissional': 'analisador_profissional',
+    'AnalisadorMetaAds': 'analisador_meta',
+    'CacheDados': 'cache_dados',
+    'CuboRollup': 'cubo_rollup',
+    'ArmazemSQLite': 'armazem_sqlite',
+    'MotorJanelas': 'janelas',
+    'RankingCampanhas': 'ranking',
+    'calcular_tendencias': 'tendencias',
+    'executar_lote': 'lote',
+    'descobrir_exportacoes': 'lote',
+    'ObservadorExportacoes': 'observador',
+    'IngestorGraphAPI': 'ingestao_api',
+    'DetectorAnomalias': 'anomalias',
+    'prever_campanhas': 'previsao',
+    'SessaoAnalise': 'sessao',
+    'somar_por': 'dimensoes',
+    'DeduplicadorLeads': 'leads_crm',
+    'cruzar_leads': 'leads_crm',
+    'MotorRegras': 'regras',
+    'carregar_regras': 'regras',
+    'simular_orcamento': 'simulador_orcamento',
+    'simular_campanhas': 'simulador_orcamento',
+    'exportar_site': 'exportar_site',
+    'renderizar_campanhas': 'renderizacao',
+    'escrita_atomica': 'renderizacao',
+}
+
+__all__ = ['main', *_EXPORTACOES_PREGUICOSAS]
+
+
+def __getattr__(nome):
+    modulo = _EXPORTACOES_PREGUICOSAS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(modulo), nome)
+    globals()[nome] = valor
+    return valor
+
+
+# ================= SUBCOMANDOS =================
+
+def _carregar(args):
+    """Cria o analisador e carrega os dados conforme as opções comuns"""
+    from analisador_profissional import AnalisadorMetaProfissional
+
+    analisador = AnalisadorMetaProfissional(arquivo_csv=args.arquivo, regras=getattr(args, 'regras', None))
+    if analisador.regras:
+        # Regras inválidas param aqui, antes de ler a exportação
+        try:
+            analisador.motor_regras()
+        except (OSError, ValueError) as e:
+            print(f"❌ Regras: {e}")
+            return None
+
+    if getattr(args, 'sqlite', None):
+        from armazem_sqlite import ArmazemSQLite
+        carregado = analisador.carregar_com_armazem(ArmazemSQLite(args.sqlite))
+    elif getattr(args, 'cubo', None):
+        from cubo_rollup import CuboRollup
+        carregado = analisador.carregar_com_cubo(CuboRollup(args.cubo))
+    else:
+        carregado = analisador.carregar_dados(streaming=args.streaming, usar_cache=not args.sem_cache)
+
+    return analisador if carregado else None
+
+
+def comando_report(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    analisador.gerar_relatorio_completo()
+    return 0
+
+
+def comando_export(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    return 0 if analisador.exportar_relatorio_detalhado(args.saida, args.formato, args.particionar) else 1
+
+
+def comando_metrics(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    return 0 if analisador.salvar_metricas_chave(args.saida) else 1
+
+
+def comando_detalhar(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    try:
+        tabela = analisador.quebra(*args.por, dias=args.dias)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    import pandas as pd
+
+    periodo = f"últimos {args.dias} dias" if args.dias else "todo o período"
+    print(f"\n🧩 QUEBRA POR {' x '.join(args.por).upper()} ({periodo}, {len(tabela):,} combinações):")
+    colunas = [c for c in [*args.por, 'Gasto', 'Leads', 'CAC', 'CTR'] if c in tabela.columns]
+    with pd.option_context('display.max_columns', None, 'display.width', 160):
+        print(tabela[colunas].head(args.top).to_string(index=False, float_format=lambda v: f'{v:,.2f}'))
+
+    if args.saida:
+        from analisador_profissional import formato_exportacao
+
+        analisador._gravar_tabela(tabela, args.saida, formato_exportacao(args.saida), True)
+        print(f"\n💾 Quebra salva: {args.saida}")
+    return 0
+
+
+def comando_acoes(args):
+    from regras import acoes_por_campanha
+
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    recomendacoes = analisador.recomendacoes()
+    acoes = acoes_por_campanha(recomendacoes)
+
+    import pandas as pd
+
+    print(f"\n🎯 AÇÕES POR CAMPANHA ({len(acoes):,} ações, {acoes['Campanha'].nunique():,} campanhas, "
+          f"{len(analisador.motor_regras().regras)} regras):")
+    colunas = ['Severidade', 'Campanha', 'Janela', 'Titulo', 'Gasto', 'Leads', 'CAC', 'CTR']
+    with pd.option_context('display.max_columns', None, 'display.width', 160, 'display.max_colwidth', 40):
+        print(acoes[colunas].head(args.top).to_string(index=False, float_format=lambda v: f'{v:,.2f}'))
+
+    if args.saida:
+        from analisador_profissional import formato_exportacao
+
+        tabela = recomendacoes.assign(Acoes=recomendacoes['Acoes'].map(' | '.join))
+        analisador._gravar_tabela(tabela, args.saida, formato_exportacao(args.saida), True)
+        print(f"\n💾 Ações salvas: {args.saida}")
+    return 0
+
+
+def comando_orcamento(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    try:
+        simulacao = analisador.simulacao_orcamento(args.orcamento, args.dias, args.candidatos, args.sorteios,
+                                                   args.reducao, args.aumento)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if not simulacao:
+        print("❌ A simulação precisa da coluna Data e de ao menos duas campanhas com gasto")
+        return 1
+
+    import pandas as pd
+
+    total = simulacao['total']
+    print(f"\n💰 REALOCAÇÃO DE R$ {total['orcamento']:,.2f}/dia ({simulacao['candidatos']:,} divisões x "
+          f"{simulacao['sorteios']:,} sorteios, elasticidade {simulacao['elasticidade']:.2f} ± {simulacao['erro_elasticidade']:.2f}):")
+    print(f"   Leads/dia: {total['leads_atual']:.1f} → {total['leads']:.1f} ({total['leads_min']:.1f} a {total['leads_max']:.1f}, "
+          f"{total['ganho']:+.1f}%) | CAC: R$ {total['cac_atual']:,.2f} → R$ {total['cac']:,.2f}")
+    tabela = simulacao['campanhas'].sort_values('Variacao', ascending=False, kind='stable')
+    colunas = ['Gasto_atual', 'Gasto_sugerido', 'Variacao', 'Leads_atual', 'Leads_previstos', 'CAC_atual', 'CAC_previsto']
+    with pd.option_context('display.max_columns', None, 'display.width', 160):
+        print(tabela[colunas].head(args.top).to_string(float_format=lambda v: f'{v:,.2f}'))
+
+    if args.saida:
+        from analisador_profissional import formato_exportacao
+
+        analisador._gravar_tabela(tabela.reset_index(), args.saida, formato_exportacao(args.saida), True)
+        print(f"\n💾 Alocação salva: {args.saida}")
+    return 0
+
+
+def comando_site(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    try:
+        manifesto = analisador.exportar_site(args.saida, args.dias_serie)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    estatisticas = manifesto['estatisticas']
+    primeira = [estatisticas['manifesto'], manifesto['arquivos'].get('resumo/7d.json', {'bytes': 0})]
+    print(f"\n🌐 Dados do site em {args.saida}/: {estatisticas['arquivos']:,} JSON ({estatisticas['bytes'] / 1024:,.0f} KB, "
+          f"{estatisticas['bytes_gz'] / 1024:,.0f} KB em gzip) | {estatisticas['escritos']:,} arquivos gravados, "
+          f"{estatisticas['mantidos']:,} sem mudança")
+    comprimida = sum(r.get('br', r.get('gz', r['bytes'])) for r in primeira)
+    print(f"   • Primeira pintura (manifest + resumo 7d): {comprimida / 1024:.1f} KB comprimidos")
+    return 0
+
+
+def comando_relatorios(args):
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+
+    resultado = analisador.gerar_relatorios_campanhas(args.saida, args.processos)
+    if not resultado:
+        print("❌ Sem campanhas para gerar relatórios")
+        return 1
+    print(f"\n📝 {resultado['arquivos']:,} relatórios de campanha em {args.saida}/ "
+          f"({resultado['bytes'] / 1024:,.0f} KB, {resultado['segundos']:.2f}s, {resultado['processos']} processos)")
+    return 0
+
+
+def comando_leads(args):
+    from leads_crm import executar_cli
+
+    analisador = _carregar(args)
+    if not analisador:
+        return 1
+    return executar_cli(args, analisador)
+
+
+def comando_batch(args):
+    from lote import executar_lote
+
+    resultados = executar_lote(args.pasta, args.saida, args.processos, args.streaming, args.por_campanha)
+    return 0 if resultados and all(r['ok'] for r in resultados) else 1
+
+
+def comando_list(args):
+    from lote import descobrir_exportacoes
+
+    arquivos = descobrir_exportacoes(args.pasta)
+    for caminho in arquivos:
+        print(caminho)
+    return 0 if arquivos else 1
+
+
+def comando_watch(args):
+    from observador import ObservadorExportacoes
+
+    ObservadorExportacoes(args.pasta, args.saida_detalhado, args.saida_metricas, args.intervalo).executar()
+    return 0
+
+
+def comando_api(args):
+    from ingestao_api import executar_cli
+
+    return executar_cli(args)
+
+
+# ================= PARSER =================
+
+def _quantidade(texto):
+    """Aceita 10000, 10k, 1M, 50M (gerador_dados.quantidade, importado só ao usar a opção)"""
+    from gerador_dados import quantidade
+    return quantidade(texto)
+
+
+def _opcoes_carga(parser):
+    parser.add_argument('arquivo', nargs='?', default=None,
+                        help="exportação CSV (padrão: procura na pasta atual)")
+    parser.add_argument('--streaming', action='store_true', default=None,
+                        help="lê o CSV em blocos (padrão: automático pelo tamanho)")
+    parser.add_argument('--sem-cache', action='store_true', help="ignora o cache de exportações")
+    parser.add_argument('--cubo', metavar='DIR', default=None,
+                        help="absorve no cubo histórico e analisa a partir dele")
+    parser.add_argument('--sqlite', metavar='BANCO', default=None,
+                        help="absorve no banco SQLite e responde janelas/rankings por SQL")
+    parser.add_argument('--regras', metavar='JSON', default=None,
+                        help="regras de recomendação (padrão: $META_REGRAS ou regras_padrao.json)")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog='meta_leads_analyzer',
+        description="Análise de campanhas META Ads - Arquitetura de Performance",
+    )
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    parser.add_argument('--perfil', metavar='JSON', nargs='?', const='perfil_meta.json', default=None,
+                        help="registra tempo/CPU/memória por etapa e grava o trace (padrão: perfil_meta.json)")
+    parser.add_argument('--perfil-cprofile', metavar='DIR', default=None,
+                        help="com --perfil, grava um .prof do cProfile por etapa")
+    parser.add_argument('--perfil-sem-memoria', action='store_true',
+                        help="com --perfil, não usa tracemalloc (menos overhead)")
+    sub = parser.add_subparsers(dest='comando', metavar='COMANDO')
+    sub.required = True
+
+    p = sub.add_parser('report', aliases=['relatorio'], help="relatório completo no terminal")
+    _opcoes_carga(p)
+    p.set_defaults(funcao=comando_report)
+
+    p = sub.add_parser('export', aliases=['exportar'], help="exporta o relatório detalhado")
+    _opcoes_carga(p)
+    p.add_argument('--saida', default='relatorio_detalhado.csv',
+                   help="arquivo de saída; a extensão define o formato (.csv .csv.gz .csv.zst .parquet .feather)")
+    p.add_argument('--formato', choices=['csv', 'csv.gz', 'csv.zst', 'parquet', 'feather'], default=None,
+                   help="força o formato independente da extensão")
+    p.add_argument('--particionar', choices=['mes', 'campanha'], default=None,
+                   help="um arquivo por mês ou por campanha (pasta no estilo Hive)")
+    p.set_defaults(funcao=comando_export)
+
+    p = sub.add_parser('metrics', aliases=['metricas'], help="salva as métricas chave em texto")
+    _opcoes_carga(p)
+    p.add_argument('--saida', default='metricas_chave.txt', help="arquivo de saída")
+    p.set_defaults(funcao=comando_metrics)
+
+    p = sub.add_parser('detalhar', aliases=['quebra'], help="métricas por quebra (conjunto, anúncio, idade, gênero...)")
+    _opcoes_carga(p)
+    p.add_argument('--por', nargs='+', required=True, metavar='DIMENSAO',
+                   help="Campanha, Data ou quebras da exportação (Conjunto, Anuncio, Idade, Genero, "
+                        "Plataforma, Posicionamento, Dispositivo, Regiao, Pais)")
+    p.add_argument('--dias', type=int, default=None, help="só os últimos N dias dos dados")
+    p.add_argument('--top', type=int, default=20, help="linhas exibidas (maior gasto primeiro)")
+    p.add_argument('--saida', default=None, help="grava a quebra inteira (.csv .csv.gz .parquet .feather)")
+    p.set_defaults(funcao=comando_detalhar)
+
+    p = sub.add_parser('acoes', aliases=['regras'], help="ações por campanha do motor de regras")
+    _opcoes_carga(p)
+    p.add_argument('--top', type=int, default=20, help="linhas exibidas (mais graves e de maior gasto primeiro)")
+    p.add_argument('--saida', default=None, help="grava todas as ações, inclusive as da conta (.csv .parquet ...)")
+    p.set_defaults(funcao=comando_acoes)
+
+    p = sub.add_parser('orcamento', help="simula a realocação do orçamento diário entre campanhas (Monte Carlo)")
+    _opcoes_carga(p)
+    p.add_argument('--orcamento', type=float, default=None, help="orçamento diário total (padrão: gasto diário atual)")
+    p.add_argument('--dias', type=int, default=30, help="dias de histórico do modelo")
+    p.add_argument('--candidatos', type=int, default=2000, help="divisões do orçamento avaliadas")
+    p.add_argument('--sorteios', type=int, default=2000, help="sorteios do modelo por divisão")
+    p.add_argument('--reducao', type=float, default=0.5, help="gasto mínimo de cada campanha, em vezes o atual")
+    p.add_argument('--aumento', type=float, default=2.0, help="gasto máximo de cada campanha, em vezes o atual")
+    p.add_argument('--top', type=int, default=20, help="campanhas exibidas (maiores aumentos primeiro)")
+    p.add_argument('--saida', default=None, help="grava a alocação por campanha (.csv .parquet ...)")
+    p.set_defaults(funcao=comando_orcamento)
+
+    p = sub.add_parser('site', help="grava fatias JSON pré-agregadas e comprimidas para o site estático")
+    _opcoes_carga(p)
+    p.add_argument('--saida', default='site_dados', help="pasta publicada junto das páginas")
+    p.add_argument('--dias-serie', type=int, default=90, help="dias das séries diárias")
+    p.set_defaults(funcao=comando_site)
+
+    p = sub.add_parser('relatorios', help="um relatório de texto por campanha, renderizado em paralelo")
+    _opcoes_carga(p)
+    p.add_argument('--saida', default='relatorios_campanhas', help="pasta dos relatórios por campanha")
+    p.add_argument('--processos', type=int, default=None, help="processos (padrão: núcleos da CPU)")
+    p.set_defaults(funcao=comando_relatorios)
+
+    p = sub.add_parser('leads', help="deduplica leads do CRM e calcula o CAC real contra o gasto")
+    p.add_argument('leads', help="exportação com uma linha por lead (e-mail/telefone, campanha, data)")
+    _opcoes_carga(p)
+    p.add_argument('--bloom', action='store_true',
+                   help="deduplica com filtro de Bloom de memória fixa (pode descartar alguns leads únicos)")
+    p.add_argument('--capacidade', type=_quantidade, default=10_000_000,
+                   help="e-mails + telefones esperados no modo bloom (ex.: 50M)")
+    p.add_argument('--erro', type=float, default=0.001, help="taxa de falso positivo no modo bloom")
+    p.add_argument('--sem-data', action='store_true', help="cruza só por campanha (período inteiro)")
+    p.add_argument('--top', type=int, default=10, help="campanhas exibidas")
+    p.add_argument('--saida', default=None, help="grava o cruzamento Data x Campanha (.csv .csv.gz .parquet .feather)")
+    p.set_defaults(funcao=comando_leads)
+
+    p = sub.add_parser('batch', aliases=['lote'], help="analisa todas as exportações de uma pasta")
+    p.add_argument('pasta', nargs='?', default='.', help="pasta raiz (padrão: atual)")
+    p.add_argument('--saida', default='relatorios_lote', help="pasta dos relatórios")
+    p.add_argument('--processos', type=int, default=None, help="processos (padrão: núcleos da CPU)")
+    p.add_argument('--streaming', action='store_true', default=None, help="força leitura em blocos")
+    p.add_argument('--por-campanha', action='store_true', help="também grava um relatório por campanha de cada conta")
+    p.set_defaults(funcao=comando_batch)
+
+    p = sub.add_parser('list', aliases=['listar'], help="lista as exportações encontradas")
+    p.add_argument('pasta', nargs='?', default='.', help="pasta raiz (padrão: atual)")
+    p.set_defaults(funcao=comando_list)
+
+    p = sub.add_parser('watch', aliases=['observar'], help="atualiza as métricas conforme as exportações mudam")
+    p.add_argument('pasta', nargs='?', default='.', help="pasta com as exportações (padrão: atual)")
+    p.add_argument('--intervalo', type=float, default=0.5, help="segundos entre verificações")
+    p.add_argument('--saida-detalhado', default='relatorio_detalhado.csv', help="CSV detalhado")
+    p.add_argument('--saida-metricas', default='metricas_chave.txt', help="métricas chave")
+    p.set_defaults(funcao=comando_watch)
+
+    p = sub.add_parser('api', help="baixa insights direto da Meta Marketing API")
+    from opcoes_api import opcoes_cli
+    opcoes_cli(p)
+    p.set_defaults(funcao=comando_api)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if not args.perfil:
+        return args.funcao(args)
+
+    from instrumentacao import instrumentacao
+
+    instrumentacao.ativar(saida=None, pasta_cprofile=args.perfil_cprofile, memoria=not args.perfil_sem_memoria)
+    try:
+        return args.funcao(args)
+    finally:
+        print(f"\n⏱️  PERFIL POR ETAPA:\n{instrumentacao.resumo()}")
+        print(f"💾 Trace salvo: {instrumentacao.salvar(args.perfil)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
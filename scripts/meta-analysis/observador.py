@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+MODO OBSERVADOR (WATCH) META ADS
+Arquitetura de Performance - ruas.dev.br
+
+Processo contínuo que substitui o cron: acompanha a pasta de exportações e,
+a cada ciclo, lê só os bytes novos de cada CSV (offset guardado por arquivo).
+As linhas novas viram agregados Data x Campanha somados aos que já estão em
+memória, e relatorio_detalhado.csv / metricas_chave.txt são regravados de
+forma atômica apenas quando algo mudou. As mesmas linhas passam pelo
+detector de anomalias de cada arquivo, que avisa quando um dia fechado de
+alguma campanha sai do padrão de CAC, CTR ou conversão.
+
+Arquivos reescritos (menores que o offset, ou com início/trecho final
+diferentes do que já foi lido) são relidos do zero; só esse arquivo.
+
+Uso:
+    python observador.py [PASTA] [--intervalo 0.5]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from analisador_profissional import AnalisadorMetaProfissional
+from anomalias import DetectorAnomalias
+from lote import descobrir_exportacoes
+
+INTERVALO_PADRAO = 0.5
+# Trechos do início e do fim da parte lida usados para detectar reescrita
+ASSINATURA_BYTES = 64 * 1024
+# Bytes novos são processados em blocos deste tamanho (limita a memória)
+BLOCO_LEITURA = 64 * 1024 * 1024
+
+
+class ObservadorExportacoes:
+    def __init__(self, pasta='.', saida_detalhado='relatorio_detalhado.csv',
+                 saida_metricas='metricas_chave.txt', intervalo=INTERVALO_PADRAO):
+        self.pasta = pasta
+        self.saida_detalhado = saida_detalhado
+        self.saida_metricas = saida_metricas
+        self.intervalo = intervalo
+        self.arquivos = {}
+        self.analisador = AnalisadorMetaProfissional()
+        self.analisador.modo_agregado = True
+        # Anomalias detectadas desde a última vez que executar() as exibiu
+        self.novas_anomalias = []
+
+    # ---------- estado por arquivo ----------
+
+    @staticmethod
+    def _assinatura(caminho, offset):
+        """Hash do início e do fim do trecho [0, offset) já lido"""
+        h = hashlib.blake2b(digest_size=16)
+        with open(caminho, 'rb') as f:
+            h.update(f.read(min(offset, ASSINATURA_BYTES)))
+            if offset > ASSINATURA_BYTES:
+                f.seek(max(ASSINATURA_BYTES, offset - ASSINATURA_BYTES))
+                h.update(f.read(offset - f.tell()))
+        return h.hexdigest()
+
+    def _novo_estado(self, caminho):
+        """Prepara a leitura de um arquivo (None enquanto não houver dados)"""
+        with open(caminho, 'rb') as f:
+            cabecalho = f.readline()
+            primeira = f.readline()
+        if not cabecalho.endswith(b'\n') or not primeira.endswith(b'\n'):
+            return None
+
+        # Mesmo esquema tipado do analisador (colunas, formato de data, vazios)
+        analisador = AnalisadorMetaProfissional(arquivo_csv=caminho)
+        with contextlib.redirect_stdout(io.StringIO()):
+            leitura, renomear = analisador._esquema_leitura()
+
+        return {
+            'analisador': analisador,
+            'leitura': leitura,
+            'renomear': renomear,
+            'cabecalho': cabecalho,
+            'offset': len(cabecalho),
+            'tamanho': None,
+            'mtime': None,
+            'assinatura': None,
+            'linhas': 0,
+            'agregado': None,
+            'detector': DetectorAnomalias(),
+        }
+
+    def _processar_bytes(self, estado, bloco):
+        """Agrega um trecho de linhas completas do CSV"""
+        analisador = estado['analisador']
+        chunk = pd.read_csv(io.BytesIO(estado['cabecalho'] + bloco), **estado['leitura'])
+        if chunk.empty:
+            return None
+        chunk = analisador._converter_tipos(chunk.rename(columns=estado['renomear']))
+        estado['linhas'] += len(chunk)
+        # Em ordem decrescente de data (exportações do Gerenciador) os dias só fecham no fim da leitura
+        self.novas_anomalias.extend(a for a in estado['detector'].acumular(chunk) if a['Piora'])
+        return analisador._agregar_chunk(chunk)
+
+    def _ingerir(self, caminho, estado, tamanho, estavel):
+        """Lê de estado['offset'] até o fim; retorna as linhas novas
+
+        Só linhas terminadas em quebra de linha são lidas, exceto quando o
+        arquivo não mudou desde o ciclo anterior (`estavel`): aí a última
+        linha sem quebra também é considerada completa.
+        """
+        antes = estado['linhas']
+        parciais = []
+
+        with open(caminho, 'rb') as f:
+            f.seek(estado['offset'])
+            while estado['offset'] < tamanho:
+                bloco = f.read(min(BLOCO_LEITURA, tamanho - estado['offset']))
+                if not bloco:
+                    break
+                fim = bloco.rfind(b'\n')
+                if fim >= 0:
+                    bloco = bloco[:fim + 1]
+                elif not estavel or estado['offset'] + len(bloco) < tamanho:
+                    break
+
+                parciais.append(self._processar_bytes(estado, bloco))
+                estado['offset'] += len(bloco)
+                f.seek(estado['offset'])
+
+        if parciais:
+            estado['agregado'] = estado['analisador']._consolidar_agregados([estado['agregado']] + parciais)
+            estado['assinatura'] = self._assinatura(caminho, estado['offset'])
+
+        detector = estado['detector']
+        atrasadas = detector.linhas_atrasadas
+        self.novas_anomalias.extend(a for a in detector.descarregar() if a['Piora'])
+        if detector.linhas_atrasadas > atrasadas:
+            print(f"⚠️  {caminho}: {detector.linhas_atrasadas - atrasadas:,} dias de campanha anteriores "
+                  f"aos já avaliados foram ignorados pelo detector de anomalias")
+        return estado['linhas'] - antes
+
+    def verificar_arquivo(self, caminho):
+        """Um ciclo para um arquivo; retorna as linhas novas (ou -1 se reescrito)"""
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            return 0
+
+        estado = self.arquivos.get(caminho)
+        reescrito = False
+
+        if estado is not None:
+            inalterado = (info.st_size, info.st_mtime_ns) == (estado['tamanho'], estado['mtime'])
+            if inalterado and estado['offset'] >= info.st_size:
+                return 0
+            if info.st_size < estado['offset'] or self._assinatura(caminho, estado['offset']) != estado['assinatura']:
+                del self.arquivos[caminho]
+                estado, reescrito = None, True
+        else:
+            inalterado = False
+
+        if estado is None:
+            estado = self._novo_estado(caminho)
+            if estado is None:
+                return -1 if reescrito else 0
+            self.arquivos[caminho] = estado
+
+        novas = self._ingerir(caminho, estado, info.st_size, estavel=inalterado)
+        estado['tamanho'], estado['mtime'] = info.st_size, info.st_mtime_ns
+        return -1 if reescrito else novas
+
+    # ---------- ciclo ----------
+
+    def verificar(self):
+        """Um ciclo completo; retorna {arquivo: linhas novas} do que mudou"""
+        saidas = {os.path.abspath(self.saida_detalhado), os.path.abspath(self.saida_metricas)}
+        encontrados = [c for c in descobrir_exportacoes(self.pasta) if os.path.abspath(c) not in saidas]
+
+        mudancas = {}
+        for caminho in set(self.arquivos) - set(encontrados):
+            del self.arquivos[caminho]
+            mudancas[caminho] = -1
+
+        for caminho in encontrados:
+            try:
+                novas = self.verificar_arquivo(caminho)
+            except Exception as e:
+                print(f"⚠️  {caminho}: {e}")
+                self.arquivos.pop(caminho, None)
+                continue
+            if novas:
+                mudancas[caminho] = novas
+
+        if mudancas:
+            self.atualizar_saidas()
+        return mudancas
+
+    def atualizar_saidas(self):
+        """Soma os agregados de todos os arquivos e regrava as saídas"""
+        agregados = [e['agregado'] for e in self.arquivos.values() if e['agregado'] is not None]
+        if not agregados:
+            # Última exportação removida: as saídas não podem continuar mostrando dados que sumiram
+            self.analisador.dados = None
+            for caminho in (self.saida_detalhado, self.saida_metricas):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(caminho)
+            return True
+
+        total = self.analisador._consolidar_agregados(agregados)
+        self.analisador.dados = self.analisador._adicionar_colunas_calculadas(total.copy())
+        self.analisador.arquivo_csv = f"{len(agregados)} exportações em {os.path.abspath(self.pasta)} (observador)"
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = self.analisador.exportar_relatorio_detalhado(self.saida_detalhado)
+            ok = self.analisador.salvar_metricas_chave(self.saida_metricas) and ok
+        return ok
+
+    def _exibir_anomalias(self, limite=5):
+        """Mostra as anomalias novas mais recentes e esvazia a lista"""
+        if not self.novas_anomalias:
+            return
+        novas = sorted(self.novas_anomalias, key=lambda a: (a['Data'], abs(a['z_robusto'])), reverse=True)
+        self.novas_anomalias = []
+        for a in novas[:limite]:
+            seta = "🔼" if a['Direcao'] == 'alta' else "🔽"
+            print(f"🚨 {a['Data']:%d/%m} {str(a['Campanha'])[:30]}: {a['Metrica']} {seta} "
+                  f"{a['Valor']:,.2f} (mediana {a['Mediana']:,.2f})")
+        if len(novas) > limite:
+            print(f"🚨 ... e mais {len(novas) - limite} anomalias")
+
+    def executar(self, ciclos=None):
+        """Observa a pasta até Ctrl+C (ou por `ciclos` ciclos)"""
+        print(f"👀 Observando {os.path.abspath(self.pasta)} a cada {self.intervalo}s (Ctrl+C para sair)")
+        feitos = 0
+        try:
+            while ciclos is None or feitos < ciclos:
+                inicio = time.perf_counter()
+                mudancas = self.verificar()
+                duracao = time.perf_counter() - inicio
+
+                if mudancas:
+                    hora = datetime.now().strftime('%H:%M:%S')
+                    for caminho, novas in sorted(mudancas.items()):
+                        descricao = "reescrito/removido" if novas < 0 else f"+{novas:,} linhas"
+                        print(f"🔄 {hora} {caminho}: {descricao}")
+                    print(f"💾 Saídas atualizadas em {duracao * 1000:.0f} ms")
+                self._exibir_anomalias()
+
+                feitos += 1
+                time.sleep(max(0.0, self.intervalo - duracao))
+        except KeyboardInterrupt:
+            print("\n👋 Observador encerrado")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza as métricas META Ads conforme as exportações mudam")
+    parser.add_argument('pasta', nargs='?', default='.', help="pasta com as exportações (padrão: atual)")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_PADRAO, help="segundos entre verificações")
+    parser.add_argument('--saida-detalhado', default='relatorio_detalhado.csv')
+    parser.add_argument('--saida-metricas', default='metricas_chave.txt')
+    args = parser.parse_args()
+
+    ObservadorExportacoes(args.pasta, args.saida_detalhado, args.saida_metricas, args.intervalo).executar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+OPÇÕES DA INGESTÃO META MARKETING API
+Arquitetura de Performance - ruas.dev.br
+
+Padrões e argumentos de linha de comando da ingestão pela API, separados de
+ingestao_api.py para que a CLI unificada monte o subcomando `api` sem
+importar asyncio/ssl: só `api` executado de fato carrega o cliente HTTP.
+"""
+
+from datetime import date, timedelta
+
+BASE_URL_PADRAO = 'https://graph.facebook.com'
+VERSAO_PADRAO = 'v19.0'
+CONEXOES_PADRAO = 8
+DIAS_POR_FATIA = 7
+
+
+def opcoes_cli(parser):
+    """Argumentos comuns a ingestao_api.py e ao subcomando `api` do meta_leads_analyzer"""
+    parser.add_argument('contas', nargs='+', help="contas de anúncio (act_...)")
+    parser.add_argument('--desde', type=date.fromisoformat, default=date.today() - timedelta(days=30))
+    parser.add_argument('--ate', type=date.fromisoformat, default=date.today() - timedelta(days=1))
+    parser.add_argument('--token', default=None, help="padrão: META_ACCESS_TOKEN")
+    parser.add_argument('--base-url', default=BASE_URL_PADRAO, help="ex.: http://127.0.0.1:8899 (stub_graph_api.py)")
+    parser.add_argument('--versao', default=VERSAO_PADRAO)
+    parser.add_argument('--conexoes', type=int, default=CONEXOES_PADRAO, help="conexões HTTP simultâneas")
+    parser.add_argument('--dias-por-fatia', type=int, default=DIAS_POR_FATIA, help="dias por fatia paginada em paralelo")
+    parser.add_argument('--sincrono', action='store_true', help="lê /insights direto, sem relatório assíncrono")
+    parser.add_argument('--saida', default='meta_api.csv', help="arquivo de saída (.csv .csv.gz .parquet .feather)")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+PREVISÃO POR CAMPANHA (HOLT-WINTERS EM LOTE)
+Arquitetura de Performance - ruas.dev.br
+
+Ajusta suavização exponencial com tendência amortecida e sazonalidade
+semanal aditiva (Holt-Winters, forma de inovações) a todas as campanhas ao
+mesmo tempo. As séries vêm das matrizes dias x campanhas do motor de
+tendências; o laço é só no eixo dos dias, e cada passo atualiza de uma vez
+todas as campanhas e todas as combinações de parâmetros da grade. Cada
+campanha fica com a combinação de menor erro de um passo.
+
+A soma prevista para o horizonte tem intervalo analítico: no modelo aditivo
+o erro da soma é combinação linear dos erros futuros, com variância
+σ² · Σ (1 + C_n)², onde C_n acumula os coeficientes α + β·Σφ^i + γ·[sazonal].
+O total é ajustado na série agregada (uma coluna a mais no mesmo lote).
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from tendencias import matrizes_diarias
+
+HORIZONTE_PADRAO = 30
+HISTORICO_PADRAO = 56
+PERIODO_SAZONAL = 7
+NIVEL_PADRAO = 0.8
+
+# Grade de parâmetros avaliada em paralelo: (alfa, beta, gama)
+ALFAS = (0.05, 0.15, 0.3, 0.5, 0.8)
+BETAS = (0.0, 0.01, 0.05)
+GAMAS = (0.0, 0.1, 0.25)
+AMORTECIMENTO = 0.95
+
+METRICAS_PREVISAO = ['Leads', 'Gasto']
+
+
+def _grade(sazonal):
+    """Matriz (K, 3) com as combinações de alfa, beta e gama"""
+    gamas = GAMAS if sazonal else (0.0,)
+    return np.array([(a, b, g) for a in ALFAS for b in BETAS for g in gamas if b <= a])
+
+
+def ajustar_holt_winters(serie, periodo=PERIODO_SAZONAL, phi=AMORTECIMENTO):
+    """Ajusta todas as colunas de `serie` (dias x séries)
+
+    Retorna dict com os estados finais (nivel, tendencia, sazonal), os
+    parâmetros escolhidos por série e o desvio do erro de um passo.
+    """
+    n_dias, n_series = serie.shape
+    sazonal = n_dias >= 2 * periodo
+    grade = _grade(sazonal)
+    alfa, beta, gama = (grade[:, i, None] for i in range(3))
+
+    # Estado inicial: média da 1ª semana, inclinação entre as duas primeiras
+    # semanas e desvios da 1ª semana como índices sazonais
+    if sazonal:
+        semana1 = serie[:periodo].mean(axis=0)
+        nivel0 = semana1
+        tendencia0 = (serie[periodo:2 * periodo].mean(axis=0) - semana1) / periodo
+        sazonal0 = serie[:periodo] - semana1
+    else:
+        nivel0 = serie[:min(n_dias, periodo)].mean(axis=0)
+        tendencia0 = np.zeros(n_series)
+        sazonal0 = np.zeros((periodo, n_series))
+
+    n_grade = len(grade)
+    nivel = np.broadcast_to(nivel0, (n_grade, n_series)).copy()
+    tendencia = np.broadcast_to(tendencia0, (n_grade, n_series)).copy()
+    indices = np.broadcast_to(sazonal0[:, None, :], (periodo, n_grade, n_series)).copy()
+    sse = np.zeros((n_grade, n_series))
+
+    # Erros só contam depois do período usado na inicialização
+    aquecimento = periodo if n_dias > periodo else 0
+    for t in range(n_dias):
+        s = indices[t % periodo]
+        erro = serie[t] - (nivel + phi * tendencia + s)
+        nivel += phi * tendencia + alfa * erro
+        tendencia *= phi
+        tendencia += beta * erro
+        s += gama * erro
+        if t >= aquecimento:
+            sse += erro * erro
+
+    melhor = sse.argmin(axis=0)
+    colunas = np.arange(n_series)
+    n_erros = max(n_dias - aquecimento, 1)
+    return {
+        'nivel': nivel[melhor, colunas],
+        'tendencia': tendencia[melhor, colunas],
+        'sazonal': indices[:, melhor, colunas],
+        'alfa': grade[melhor, 0],
+        'beta': grade[melhor, 1],
+        'gama': grade[melhor, 2],
+        'phi': phi,
+        'sigma': np.sqrt(sse[melhor, colunas] / n_erros),
+        'n_dias': n_dias,
+        'periodo': periodo,
+    }
+
+
+def prever_soma(ajuste, horizonte=HORIZONTE_PADRAO):
+    """Soma prevista dos próximos `horizonte` dias e o desvio dessa soma"""
+    periodo, phi, n_dias = ajuste['periodo'], ajuste['phi'], ajuste['n_dias']
+
+    passos = np.arange(1, horizonte + 1)
+    amortecido = np.cumsum(phi ** passos)[:, None]
+    posicoes = (n_dias + passos - 1) % periodo
+    diario = ajuste['nivel'] + amortecido * ajuste['tendencia'] + ajuste['sazonal'][posicoes]
+    soma = diario.sum(axis=0)
+
+    # Coeficientes c_d dos erros futuros (d = 1..h-1) e seus acumulados C_n
+    d = passos[:-1, None]
+    coeficientes = ajuste['alfa'] + ajuste['beta'] * amortecido[:-1] + ajuste['gama'] * (d % periodo == 0)
+    acumulados = np.vstack([np.zeros((1, coeficientes.shape[1])), np.cumsum(coeficientes, axis=0)])
+    desvio = ajuste['sigma'] * np.sqrt(((1 + acumulados) ** 2).sum(axis=0))
+    return soma, desvio
+
+
+def prever_campanhas(dados, horizonte=HORIZONTE_PADRAO, historico=HISTORICO_PADRAO, nivel=NIVEL_PADRAO):
+    """Previsão de Leads, Gasto e CAC para os próximos `horizonte` dias
+
+    Retorna dict com 'campanhas' (DataFrame com previsão e limites por
+    campanha), 'total' (mesmas chaves para a conta toda), 'horizonte',
+    'nivel' e 'dias_historico'. None se não houver dias com dados.
+    """
+    datas, campanhas, matrizes = matrizes_diarias(dados, dias_historico=historico)
+    if len(datas) == 0 or not all(m in matrizes for m in METRICAS_PREVISAO):
+        return None
+
+    z = NormalDist().inv_cdf(0.5 + nivel / 2)
+    colunas, total = {}, {}
+    for metrica in METRICAS_PREVISAO:
+        matriz = matrizes[metrica]
+        # Última coluna: série agregada de todas as campanhas
+        serie = np.hstack([matriz, matriz.sum(axis=1, keepdims=True)])
+        soma, desvio = prever_soma(ajustar_holt_winters(serie), horizonte)
+
+        previsto = np.maximum(soma, 0)
+        inferior = np.maximum(soma - z * desvio, 0)
+        superior = np.maximum(soma + z * desvio, 0)
+        colunas[metrica] = previsto[:-1]
+        colunas[f'{metrica}_min'] = inferior[:-1]
+        colunas[f'{metrica}_max'] = superior[:-1]
+        total.update({
+            metrica.lower(): float(previsto[-1]),
+            f'{metrica.lower()}_min': float(inferior[-1]),
+            f'{metrica.lower()}_max': float(superior[-1]),
+        })
+
+    tabela = pd.DataFrame(colunas, index=campanhas)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tabela['CAC'] = np.where(tabela['Leads'] > 0, tabela['Gasto'] / tabela['Leads'], np.nan)
+        # Faixa conservadora: gasto baixo com leads altos e vice-versa
+        tabela['CAC_min'] = np.where(tabela['Leads_max'] > 0, tabela['Gasto_min'] / tabela['Leads_max'], np.nan)
+        tabela['CAC_max'] = np.where(tabela['Leads_min'] > 0, tabela['Gasto_max'] / tabela['Leads_min'], np.inf)
+
+    total['cac'] = total['gasto'] / total['leads'] if total['leads'] > 0 else 0
+    total['cac_min'] = total['gasto_min'] / total['leads_max'] if total['leads_max'] > 0 else 0
+    total['cac_max'] = total['gasto_max'] / total['leads_min'] if total['leads_min'] > 0 else float('inf')
+
+    return {
+        'campanhas': tabela,
+        'total': total,
+        'horizonte': horizonte,
+        'nivel': nivel,
+        'dias_historico': len(datas),
+        'referencia': pd.Timestamp(datas[-1]),
+    }
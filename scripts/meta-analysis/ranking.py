@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+RANKING DE CAMPANHAS (TOP-K)
+Arquitetura de Performance - ruas.dev.br
+
+Mantém somas parciais por campanha enquanto os dados chegam (blocos de um
+CSV, vários arquivos, processos diferentes) e responde top-K por qualquer
+métrica com seleção parcial (np.argpartition): só os K vencedores são
+ordenados, nunca a tabela inteira.
+"""
+
+import numpy as np
+import pandas as pd
+
+METRICAS_RANKING = ['Gasto', 'Leads', 'Cliques', 'Impressoes']
+
+# Métricas derivadas: (numerador, denominador, multiplicador)
+METRICAS_DERIVADAS = {
+    'CAC': ('Gasto', 'Leads', 1),
+    'CTR': ('Cliques', 'Impressoes', 100),
+    'Taxa_Conversao': ('Leads', 'Cliques', 100),
+}
+
+PARCIAIS_POR_CONSOLIDACAO = 16
+
+
+class RankingCampanhas:
+    def __init__(self, chave='Campanha', metricas=METRICAS_RANKING):
+        self.chave = chave
+        self.metricas = list(metricas)
+        self._parciais = []
+        self._tabela = None
+
+    def atualizar(self, dados):
+        """Soma um bloco de linhas às parciais por campanha"""
+        metricas = [m for m in self.metricas if m in dados.columns]
+        parcial = dados.groupby(self.chave, observed=True, sort=False)[metricas].sum()
+        self._parciais.append(parcial)
+
+        if len(self._parciais) >= PARCIAIS_POR_CONSOLIDACAO:
+            self._consolidar()
+        return self
+
+    def mesclar(self, outro):
+        """Incorpora as parciais de outro ranking (outro arquivo ou processo)"""
+        self._parciais.extend(outro._parciais)
+        if outro._tabela is not None:
+            self._parciais.append(outro._tabela)
+        self._consolidar()
+        return self
+
+    def _consolidar(self):
+        partes = self._parciais if self._tabela is None else [self._tabela] + self._parciais
+        self._parciais = []
+        if not partes:
+            return
+        if len(partes) == 1:
+            self._tabela = partes[0]
+            return
+        combinado = pd.concat(partes)
+        self._tabela = combinado.groupby(level=0, observed=True, sort=False).sum().fillna(0)
+
+    def tabela(self):
+        """Somas por campanha (consolida as parciais pendentes)"""
+        self._consolidar()
+        if self._tabela is None:
+            return pd.DataFrame(columns=self.metricas)
+        return self._tabela
+
+    def _valores(self, tabela, metrica):
+        if metrica in tabela.columns:
+            return tabela[metrica].to_numpy(dtype=np.float64)
+
+        numerador, denominador, multiplicador = METRICAS_DERIVADAS[metrica]
+        num = tabela[numerador].to_numpy(dtype=np.float64)
+        den = tabela[denominador].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(den > 0, num / den * multiplicador, np.nan)
+
+    def top(self, k=5, por='Leads', menor=False, gasto_minimo=0):
+        """As K campanhas com maior (ou menor) valor de `por`
+
+        `gasto_minimo` descarta campanhas com pouco gasto, útil para CAC:
+        top(5, por='CAC', menor=True, gasto_minimo=100).
+        """
+        tabela = self.tabela()
+        valores = self._valores(tabela, por)
+
+        elegiveis = ~np.isnan(valores)
+        if gasto_minimo and 'Gasto' in tabela.columns:
+            elegiveis &= tabela['Gasto'].to_numpy(dtype=np.float64) >= gasto_minimo
+        candidatos = np.flatnonzero(elegiveis)
+        if candidatos.size == 0:
+            return tabela.iloc[:0].reset_index()
+
+        # Chave de seleção: sempre "menor é melhor"
+        chave = valores[candidatos] if menor else -valores[candidatos]
+        k = min(k, candidatos.size)
+        escolhidos = np.argpartition(chave, k - 1)[:k]
+        escolhidos = escolhidos[np.argsort(chave[escolhidos], kind='stable')]
+
+        resultado = tabela.iloc[candidatos[escolhidos]].copy()
+        for derivada, (numerador, denominador, _) in METRICAS_DERIVADAS.items():
+            if numerador in resultado.columns and denominador in resultado.columns:
+                resultado[derivada] = self._valores(resultado, derivada)
+        return resultado.reset_index()
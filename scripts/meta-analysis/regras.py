@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+MOTOR DE REGRAS DE RECOMENDAÇÃO
+Arquitetura de Performance - ruas.dev.br
+
+As recomendações deixam de ser um if/elif fixo sobre o CAC e o CTR da conta:
+vêm de um arquivo JSON (regras_padrao.json, META_REGRAS ou --regras) com
+limites, expressões sobre métricas, janelas e gasto mínimo. Cada regra é
+compilada uma vez para uma expressão numpy e avaliada de uma só vez sobre a
+matriz janela x campanha (mais a coluna da conta inteira): milhares de
+campanhas x dezenas de regras saem num passe, sem laço por campanha.
+
+Formato do arquivo:
+    {
+      "referencia": "hoje",                      # ou "ultima_data"
+      "janelas": {"7d": 7, "30d": 30, "total": null},
+      "regras": [
+        {"id": "cac_acima_da_conta", "janela": "7d", "grupo": "eficiencia",
+         "quando": "CAC > 1.5 * CAC_conta and Leads >= 3", "gasto_minimo": 50,
+         "severidade": "alerta", "titulo": "...", "acoes": ["..."], "resumo": "..."}
+      ]
+    }
+
+Expressões: métricas (Gasto, Leads, Cliques, Impressoes, Alcance, CAC, CTR,
+Taxa_Conversao, CPM, CPC, Gasto_dia, Leads_dia, Dias_ativos), números,
++ - * /, comparações (inclusive encadeadas), and/or/not e abs/min/max.
+`Metrica` é a da janela da regra; `Metrica_30d` a da janela 30d; `Metrica_conta`
+a da conta inteira na mesma janela. Métricas indefinidas (CAC sem leads) são
+NaN e nenhuma comparação com elas é verdadeira.
+
+nivel "conta" avalia só a coluna da conta; "campanha" (padrão), cada
+campanha. Regras do mesmo grupo e nível são exclusivas: vale a primeira que
+casar, na ordem do arquivo (como um elif).
+
+Uso:
+    from regras import carregar_regras
+    acoes = carregar_regras().avaliar(dados)   # uma linha por (regra, janela, campanha)
+"""
+
+import ast
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dimensoes import codificar
+
+REGRAS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regras_padrao.json')
+
+METRICAS_SOMA = ['Gasto', 'Leads', 'Cliques', 'Impressoes', 'Alcance']
+METRICAS_DERIVADAS = ['CAC', 'CTR', 'Taxa_Conversao', 'CPM', 'CPC', 'Gasto_dia', 'Leads_dia', 'Dias_ativos']
+METRICAS = METRICAS_SOMA + METRICAS_DERIVADAS
+
+NIVEIS = ('campanha', 'conta')
+SEVERIDADES = ['critica', 'alerta', 'oportunidade', 'info']
+
+FUNCOES = {'abs': np.abs, 'min': np.minimum, 'max': np.maximum}
+
+_NOS_PERMITIDOS = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant, ast.Call,
+)
+
+
+class _ParaMascaras(ast.NodeTransformer):
+    """and/or/not viram & | ~ e comparações encadeadas viram conjunções"""
+
+    def visit_BoolOp(self, no):
+        self.generic_visit(no)
+        operador = ast.BitAnd() if isinstance(no.op, ast.And) else ast.BitOr()
+        resultado = no.values[0]
+        for valor in no.values[1:]:
+            resultado = ast.BinOp(left=resultado, op=operador, right=valor)
+        return resultado
+
+    def visit_UnaryOp(self, no):
+        self.generic_visit(no)
+        if isinstance(no.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=no.operand)
+        return no
+
+    def visit_Compare(self, no):
+        self.generic_visit(no)
+        partes = []
+        esquerda = no.left
+        for operador, direita in zip(no.ops, no.comparators):
+            partes.append(ast.Compare(left=esquerda, ops=[operador], comparators=[direita]))
+            esquerda = direita
+        resultado = partes[0]
+        for parte in partes[1:]:
+            resultado = ast.BinOp(left=resultado, op=ast.BitAnd(), right=parte)
+        return resultado
+
+
+def compilar_expressao(expressao, origem='<regra>'):
+    """Código que avalia `expressao` sobre arrays numpy e os nomes que ela usa"""
+    try:
+        arvore = ast.parse(str(expressao).strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"{origem}: expressão inválida {expressao!r} ({e.msg})") from None
+
+    nomes = set()
+    for no in ast.walk(arvore):
+        if not isinstance(no, _NOS_PERMITIDOS):
+            raise ValueError(f"{origem}: '{type(no).__name__}' não é permitido em {expressao!r}")
+        if isinstance(no, ast.Constant) and (isinstance(no.value, bool) or not isinstance(no.value, (int, float))):
+            raise ValueError(f"{origem}: só números são aceitos como constantes em {expressao!r}")
+        if isinstance(no, ast.Call):
+            if not isinstance(no.func, ast.Name) or no.func.id not in FUNCOES or no.keywords:
+                raise ValueError(f"{origem}: funções aceitas: {', '.join(FUNCOES)}")
+        elif isinstance(no, ast.Name) and no.id not in FUNCOES:
+            nomes.add(no.id)
+
+    arvore = ast.fix_missing_locations(_ParaMascaras().visit(arvore))
+    return compile(arvore, origem, 'eval'), nomes
+
+
+def _resolver_nome(nome, janelas, origem):
+    """(metrica, janela ou None, da_conta) de um nome usado numa expressão"""
+    if nome in METRICAS:
+        return nome, None, False
+    metrica, _, sufixo = nome.rpartition('_')
+    if metrica in METRICAS:
+        if sufixo == 'conta':
+            return metrica, None, True
+        if sufixo in janelas:
+            return metrica, sufixo, False
+    raise ValueError(f"{origem}: nome desconhecido {nome!r} (métricas: {', '.join(METRICAS)}; "
+                     f"sufixos: _conta, {', '.join('_' + j for j in janelas)})")
+
+
+class Regra:
+    """Uma regra do arquivo, já validada e compilada"""
+
+    def __init__(self, definicao, janelas):
+        if not isinstance(definicao, dict) or not definicao.get('id'):
+            raise ValueError(f"regra sem 'id': {definicao!r}")
+        self.id = str(definicao['id'])
+        origem = f"regra {self.id!r}"
+        if 'quando' not in definicao:
+            raise ValueError(f"{origem}: falta 'quando'")
+
+        self.expressao = definicao['quando']
+        self.codigo, nomes = compilar_expressao(self.expressao, origem)
+        self.nomes = {nome: _resolver_nome(nome, janelas, origem) for nome in nomes}
+
+        janela = definicao.get('janela', next(iter(janelas)))
+        self.janelas = [janela] if isinstance(janela, str) else list(janela)
+        desconhecidas = [j for j in self.janelas if j not in janelas]
+        if not self.janelas or desconhecidas:
+            raise ValueError(f"{origem}: janela desconhecida {desconhecidas or janela!r} "
+                             f"(definidas: {', '.join(janelas)})")
+
+        self.nivel = definicao.get('nivel', 'campanha')
+        if self.nivel not in NIVEIS:
+            raise ValueError(f"{origem}: nivel deve ser {' ou '.join(NIVEIS)}")
+        self.severidade = definicao.get('severidade', 'info')
+        if self.severidade not in SEVERIDADES:
+            raise ValueError(f"{origem}: severidade deve ser uma de {', '.join(SEVERIDADES)}")
+
+        try:
+            self.gasto_minimo = float(definicao.get('gasto_minimo', 0) or 0)
+            self.dias_minimos = int(definicao.get('dias_minimos', 0) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"{origem}: gasto_minimo/dias_minimos devem ser números") from None
+
+        self.grupo = definicao.get('grupo') or self.id
+        self.titulo = definicao.get('titulo', self.id)
+        acoes = definicao.get('acoes', [])
+        self.acoes = (acoes,) if isinstance(acoes, str) else tuple(acoes)
+        self.resumo = definicao.get('resumo')
+
+    def __repr__(self):
+        return f"Regra({self.id!r}: {self.expressao!r} em {', '.join(self.janelas)})"
+
+
+class MotorRegras:
+    """Regras compiladas + janelas; avaliar() devolve as ações disparadas"""
+
+    def __init__(self, configuracao, origem=None):
+        self.origem = origem
+        janelas = configuracao.get('janelas') or {'7d': 7}
+        self.janelas = {}
+        for nome, dias in janelas.items():
+            if dias is not None and (not isinstance(dias, int) or dias < 1):
+                raise ValueError(f"janela {nome!r}: dias deve ser inteiro positivo ou null")
+            self.janelas[str(nome)] = dias
+
+        self.referencia = configuracao.get('referencia', 'hoje')
+        if self.referencia not in ('hoje', 'ultima_data'):
+            raise ValueError("referencia deve ser 'hoje' ou 'ultima_data'")
+
+        self.regras = [Regra(definicao, self.janelas) for definicao in configuracao.get('regras', [])]
+        repetidas = pd.Index([r.id for r in self.regras])
+        if repetidas.has_duplicates:
+            raise ValueError(f"ids de regra repetidos: {', '.join(repetidas[repetidas.duplicated()].unique())}")
+
+    def grupos(self, nivel):
+        """Grupos do nível na ordem em que aparecem no arquivo"""
+        return list(dict.fromkeys(r.grupo for r in self.regras if r.nivel == nivel))
+
+    def inicio(self, referencia):
+        """Primeiro dia que alguma janela usa (None: alguma janela pega tudo)"""
+        dias = list(self.janelas.values())
+        if not dias or None in dias:
+            return None
+        return pd.Timestamp(referencia).normalize() - pd.Timedelta(days=max(dias) - 1)
+
+    def _referencia(self, dados):
+        if self.referencia == 'ultima_data' and 'Data' in dados.columns and dados['Data'].notna().any():
+            return pd.Timestamp(dados['Data'].max()).normalize()
+        return pd.Timestamp(date.today())
+
+    def metricas(self, dados, referencia=None):
+        """Matrizes janela x (campanhas + conta) de cada métrica e o índice das campanhas
+
+        A janela de N dias vai de referencia - N + 1 até o fim dos dados (como
+        analisar_periodo); sem coluna Data, são as N últimas linhas.
+        """
+        n = len(dados)
+        if 'Campanha' in dados.columns:
+            codigos, campanhas = codificar(dados['Campanha'])
+        else:
+            codigos, campanhas = np.zeros(n, dtype=np.int64), pd.Index([], dtype=object)
+        total = len(campanhas)
+        colunas = total + 1
+
+        if 'Data' in dados.columns:
+            dia = dados['Data'].to_numpy().astype('datetime64[D]')
+            referencia = np.datetime64(pd.Timestamp(referencia if referencia is not None else self._referencia(dados)).date(), 'D')
+            selecoes = [np.ones(n, dtype=bool) if dias is None else dia >= referencia - np.timedelta64(dias - 1, 'D')
+                        for dias in self.janelas.values()]
+        else:
+            dia = np.arange(n).astype('datetime64[D]')
+            selecoes = [np.ones(n, dtype=bool) if dias is None else np.arange(n) >= n - dias
+                        for dias in self.janelas.values()]
+
+        valores = {}
+        for metrica in METRICAS_SOMA:
+            if metrica not in dados.columns:
+                valores[metrica] = np.full((len(selecoes), colunas), np.nan)
+                continue
+            coluna = dados[metrica].to_numpy(dtype=np.float64, na_value=0.0)
+            matriz = np.empty((len(selecoes), colunas))
+            for j, selecao in enumerate(selecoes):
+                matriz[j, :total] = np.bincount(codigos[selecao], weights=coluna[selecao], minlength=total)[:total]
+                matriz[j, total] = coluna[selecao].sum()
+            valores[metrica] = matriz
+
+        # Dias distintos com gasto, por campanha e na conta
+        ativos = np.zeros((len(selecoes), colunas))
+        com_gasto = dados['Gasto'].to_numpy(dtype=np.float64, na_value=0.0) > 0 if 'Gasto' in dados.columns else np.ones(n, dtype=bool)
+        dia_inteiro = dia.astype(np.int64)
+        for j, selecao in enumerate(selecoes):
+            linhas = selecao & com_gasto & ~np.isnat(dia)
+            if not linhas.any():
+                continue
+            dias_linha = dia_inteiro[linhas] - dia_inteiro[linhas].min()
+            pares = pd.unique(codigos[linhas] * (int(dias_linha.max()) + 1) + dias_linha)
+            ativos[j, :total] = np.bincount(pares // (int(dias_linha.max()) + 1), minlength=total)[:total]
+            ativos[j, total] = len(pd.unique(dias_linha))
+        valores['Dias_ativos'] = ativos
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            def razao(numerador, denominador, escala=1.0):
+                return np.where(denominador > 0, numerador / denominador * escala, np.nan)
+
+            valores['CAC'] = razao(valores['Gasto'], valores['Leads'])
+            valores['CTR'] = razao(valores['Cliques'], valores['Impressoes'], 100.0)
+            valores['Taxa_Conversao'] = razao(valores['Leads'], valores['Cliques'], 100.0)
+            valores['CPM'] = razao(valores['Gasto'], valores['Impressoes'], 1000.0)
+            valores['CPC'] = razao(valores['Gasto'], valores['Cliques'])
+            valores['Gasto_dia'] = razao(valores['Gasto'], ativos)
+            valores['Leads_dia'] = razao(valores['Leads'], ativos)
+
+        return valores, campanhas
+
+    def _mascara(self, regra, valores, posicoes):
+        """Máscara (janelas da regra x colunas) com a expressão e as guardas"""
+        linhas = [posicoes[j] for j in regra.janelas]
+        ambiente = dict(FUNCOES)
+        for nome, (metrica, janela, da_conta) in regra.nomes.items():
+            matriz = valores[metrica]
+            if janela is not None:
+                ambiente[nome] = matriz[posicoes[janela]][None, :]
+            elif da_conta:
+                ambiente[nome] = matriz[linhas, -1:]
+            else:
+                ambiente[nome] = matriz[linhas]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            resultado = eval(regra.codigo, {'__builtins__': {}}, ambiente)
+        formato = (len(linhas), valores['Gasto'].shape[1])
+        mascara = np.broadcast_to(np.asarray(resultado, dtype=bool), formato).copy()
+
+        if regra.gasto_minimo:
+            mascara &= valores['Gasto'][linhas] >= regra.gasto_minimo
+        if regra.dias_minimos:
+            mascara &= valores['Dias_ativos'][linhas] >= regra.dias_minimos
+        if regra.nivel == 'conta':
+            mascara[:, :-1] = False
+        else:
+            mascara[:, -1] = False
+        return mascara
+
+    def avaliar(self, dados, referencia=None):
+        """Uma linha por (regra, janela, campanha) disparada, na ordem do arquivo
+
+        Colunas: Nivel, Campanha (NaN no nível conta), Janela, Regra, Grupo,
+        Severidade, Titulo, Acoes, Resumo e as métricas da janela (Gasto,
+        Leads, CAC, CTR, Taxa_Conversao, Dias_ativos).
+        """
+        valores, campanhas = self.metricas(dados, referencia)
+        posicoes = {nome: j for j, nome in enumerate(self.janelas)}
+        nomes_janelas = np.array(list(self.janelas), dtype=object)
+        # Coluna da conta (e campanha sem nome) fica sem categoria
+        validas = campanhas.notna()
+        categorias = campanhas[validas]
+        rotulos = np.append(np.where(validas, np.cumsum(validas) - 1, -1), -1)
+        exibidas = ['Gasto', 'Leads', 'CAC', 'CTR', 'Taxa_Conversao', 'Dias_ativos']
+
+        # Colunas já tomadas por uma regra anterior de cada grupo exclusivo
+        tomadas = {}
+        partes = []
+        for regra in self.regras:
+            linhas = [posicoes[j] for j in regra.janelas]
+            mascara = self._mascara(regra, valores, posicoes)
+            grupo = tomadas.setdefault((regra.nivel, regra.grupo), np.zeros(valores['Gasto'].shape, dtype=bool))
+            mascara &= ~grupo[linhas]
+            grupo[linhas] |= mascara
+
+            janela_idx, coluna_idx = np.nonzero(mascara)
+            if not len(coluna_idx):
+                continue
+            linha_idx = np.asarray(linhas)[janela_idx]
+            parte = {
+                'Nivel': regra.nivel,
+                'Campanha': pd.Categorical.from_codes(rotulos[coluna_idx], categories=categorias),
+                'Janela': nomes_janelas[linha_idx],
+                'Regra': regra.id,
+                'Grupo': regra.grupo,
+                'Severidade': regra.severidade,
+                'Titulo': regra.titulo,
+                'Acoes': [regra.acoes] * len(coluna_idx),
+                'Resumo': regra.resumo,
+            }
+            for metrica in exibidas:
+                parte[metrica] = valores[metrica][linha_idx, coluna_idx]
+            partes.append(pd.DataFrame(parte))
+
+        if not partes:
+            colunas = ['Nivel', 'Campanha', 'Janela', 'Regra', 'Grupo', 'Severidade', 'Titulo', 'Acoes', 'Resumo', *exibidas]
+            tabela = pd.DataFrame({c: pd.Series(dtype=float if c in exibidas else object) for c in colunas})
+        else:
+            tabela = pd.concat(partes, ignore_index=True)
+        tabela['Campanha'] = pd.Categorical(tabela['Campanha'], categories=categorias)
+        # 'string' mantém as regras sem resumo como <NA> (astype(str) viraria 'None' no pandas 2)
+        tabela['Resumo'] = tabela['Resumo'].astype('string')
+        tabela['Severidade'] = pd.Categorical(tabela['Severidade'], categories=SEVERIDADES, ordered=True)
+        return tabela
+
+
+def carregar_regras(caminho=None):
+    """MotorRegras do arquivo `caminho` (padrão: $META_REGRAS ou regras_padrao.json)"""
+    caminho = caminho or os.environ.get('META_REGRAS') or REGRAS_PADRAO
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            configuracao = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{caminho}: JSON inválido ({e})") from None
+    return MotorRegras(configuracao, origem=caminho)
+
+
+def acoes_por_campanha(tabela):
+    """Só as ações de campanha, mais graves primeiro e, dentro delas, maior gasto"""
+    acoes = tabela[tabela['Nivel'] == 'campanha']
+    return acoes.sort_values(['Severidade', 'Gasto'], ascending=[True, False], kind='stable', ignore_index=True)
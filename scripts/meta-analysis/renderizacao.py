@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+RENDERIZAÇÃO DE RELATÓRIOS POR CAMPANHA (TEMPLATES + POOL DE PROCESSOS)
+Arquitetura de Performance - ruas.dev.br
+
+Um relatório de texto por campanha (e, no lote, por cliente) sem passar por
+centenas de print(): os textos saem de string.Template compilados uma vez
+no import, preenchidos a partir de uma tabela de contexto com uma linha por
+campanha. Essa tabela junta os agregados que o analisador já calculou
+(janelas do motor de regras, tendências, previsão, simulação de orçamento e
+ações das regras) por reindexação, sem laço por campanha.
+
+A tabela é dividida em blocos e cada processo do pool formata e grava os seus
+arquivos. Cada arquivo é escrito uma vez só por escrita_atomica(): buffer
+grande, temporário ao lado e os.replace, então leitores nunca veem um
+relatório pela metade. Com um processo (ou poucos arquivos) tudo roda no
+processo atual, sem custo de pool.
+
+Uso:
+    python meta_leads_analyzer.py relatorios dados.csv --saida relatorios_campanhas [--processos N]
+"""
+
+import contextlib
+import os
+import time
+from datetime import datetime
+from string import Template
+
+import numpy as np
+import pandas as pd
+
+from exportar_site import identificador_campanha
+from regras import MotorRegras
+
+PASTA_RELATORIOS_PADRAO = 'relatorios_campanhas'
+TAMANHO_BUFFER = 1024 * 1024
+# Abaixo disso o pool custa mais do que economiza
+MINIMO_ARQUIVOS_POOL = 200
+BLOCOS_POR_PROCESSO = 4
+
+# (título, chave, dias) - mesmos períodos do relatório completo
+PERIODOS = [('HOJE', 'hoje', 1), ('ÚLTIMOS 7 DIAS', '7d', 7), ('ÚLTIMOS 30 DIAS', '30d', 30), ('TODO PERÍODO', 'total', None)]
+METRICAS_PERIODO = ['Dias_ativos', 'Gasto', 'Leads', 'CAC', 'CTR']
+
+TEMPLATE_CAMPANHA = Template("""\
+======================================================================
+📈 RELATÓRIO DA CAMPANHA: $campanha
+======================================================================
+Conta: $conta
+Gerado em: $gerado_em
+$periodos$tendencia$acoes$orcamento$previsao
+======================================================================
+""")
+
+TEMPLATE_PERIODO = Template("""
+📊 $titulo:
+----------------------------------------
+   • Dias com gasto: $dias
+   • Gasto Total: R$$ $gasto
+   • Leads Total: $leads
+   • CAC Médio: R$$ $cac
+   • CTR Médio: $ctr%
+""")
+
+TEMPLATE_TENDENCIA = Template("""
+📈 TENDÊNCIA (últimos dias vs anteriores):
+   • CAC: $cac
+   • CTR: $ctr
+""")
+
+TEMPLATE_ACOES = Template("""
+🎯 AÇÕES:
+$linhas
+""")
+
+TEMPLATE_ORCAMENTO = Template("""
+💰 ORÇAMENTO SUGERIDO: R$$ $atual → R$$ $sugerido por dia ($variacao)
+""")
+
+TEMPLATE_PREVISAO = Template("""
+🔮 PREVISÃO PRÓXIMOS $horizonte DIAS: $leads leads ($minimo a $maximo) | CAC R$$ $cac
+""")
+
+TEMPLATE_METRICAS = Template("""\
+============================================================
+📊 MÉTRICAS CHAVE META ADS
+============================================================
+
+Data da análise: $gerado_em
+Arquivo analisado: $arquivo
+
+$periodo🎯 RECOMENDAÇÕES:
+$recomendacoes""")
+
+TEMPLATE_METRICAS_PERIODO = Template("""\
+📈 ÚLTIMOS 7 DIAS:
+• Gasto Total: R$$ $gasto
+• Leads Total: $leads
+• CAC Médio: R$$ $cac
+• CTR Médio: $ctr%
+• Média/dia: $leads_dia leads
+
+""")
+
+
+@contextlib.contextmanager
+def escrita_atomica(caminho, modo='w', buffer=TAMANHO_BUFFER):
+    """Arquivo temporário com buffer grande que só substitui `caminho` se o bloco terminar sem erro"""
+    temporario = caminho + f'.{os.getpid()}.tmp'
+    opcoes = {} if 'b' in modo else {'encoding': 'utf-8'}
+    try:
+        with open(temporario, modo, buffering=buffer, **opcoes) as f:
+            yield f
+        os.replace(temporario, caminho)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporario)
+        raise
+
+
+def _numero(valor, formato=',.2f', vazio='-'):
+    return format(valor, formato) if valor is not None and np.isfinite(valor) else vazio
+
+
+def _variacao(valor):
+    if valor is None or not np.isfinite(valor):
+        return '➡️ sem comparação'
+    seta = "🔼" if valor > 0 else "🔽" if valor < 0 else "➡️"
+    return f"{seta} {valor:+.1f}%"
+
+
+def metricas_chave(analise_7dias, recomendacoes, arquivo, gerado_em=None):
+    """Texto de metricas_chave.txt (o mesmo que salvar_metricas_chave gravava linha a linha)"""
+    periodo = ''
+    if analise_7dias:
+        periodo = TEMPLATE_METRICAS_PERIODO.substitute(
+            gasto=f"{analise_7dias['gasto_total']:,.2f}",
+            leads=f"{analise_7dias['leads_total']:.0f}",
+            cac=f"{analise_7dias.get('cac_medio', 0):,.2f}",
+            ctr=f"{analise_7dias.get('ctr_medio', 0):.2f}",
+            leads_dia=f"{analise_7dias.get('leads_diario', 0):.1f}",
+        )
+    return TEMPLATE_METRICAS.substitute(
+        gerado_em=(gerado_em or datetime.now()).strftime('%d/%m/%Y %H:%M'),
+        arquivo=arquivo,
+        periodo=periodo,
+        recomendacoes=''.join(f"- {linha}\n" for linha in recomendacoes),
+    )
+
+
+def _linhas_acoes(recomendacoes):
+    """Série Campanha -> linhas de ação já formatadas (mais graves primeiro)"""
+    if recomendacoes is None:
+        return pd.Series(dtype=object)
+    acoes = recomendacoes[recomendacoes['Nivel'] == 'campanha']
+    if acoes.empty:
+        return pd.Series(dtype=object)
+    acoes = acoes.sort_values('Severidade', kind='stable')
+    texto = [
+        f"   • [{severidade}] {titulo} ({janela})" + (f": {'; '.join(lista)}" if lista else "")
+        for severidade, titulo, janela, lista in zip(acoes['Severidade'].astype(str), acoes['Titulo'], acoes['Janela'], acoes['Acoes'])
+    ]
+    return pd.Series(texto, index=acoes['Campanha'].astype(str).to_numpy()).groupby(level=0, sort=False).agg('\n'.join)
+
+
+def montar_contexto(analisador):
+    """Tabela com uma linha por campanha e tudo o que os templates usam (números crus)"""
+    if analisador.dados is None:
+        return None
+    dados = analisador.armazem.dados() if analisador.armazem is not None else analisador.dados
+    if 'Campanha' not in dados.columns:
+        return None
+
+    janelas = {chave: dias for _, chave, dias in PERIODOS}
+    valores, campanhas = MotorRegras({'janelas': janelas, 'regras': []}).metricas(dados)
+    validas = campanhas.notna()
+    indice = pd.Index(campanhas[validas].astype(str), name='Campanha')
+    tabela = pd.DataFrame(index=indice)
+    for j, (_, chave, _) in enumerate(PERIODOS):
+        for metrica in METRICAS_PERIODO:
+            tabela[f'{metrica}_{chave}'] = valores[metrica][j, :-1][validas]
+
+    if 'Data' in dados.columns:
+        tendencias = analisador.tendencias_campanha()
+        for coluna in ('CAC_variacao', 'CTR_variacao'):
+            if tendencias is not None and coluna in tendencias.columns:
+                tabela[coluna] = tendencias[coluna].reindex(indice).to_numpy()
+
+        previsao = analisador.previsao()
+        if previsao:
+            tabela['horizonte'] = previsao['horizonte']
+            for coluna in ('Leads', 'Leads_min', 'Leads_max', 'CAC'):
+                tabela[f'previsao_{coluna}'] = previsao['campanhas'][coluna].reindex(indice).to_numpy()
+
+        simulacao = analisador.simulacao_orcamento()
+        if simulacao:
+            for coluna in ('Gasto_atual', 'Gasto_sugerido', 'Variacao'):
+                tabela[f'orcamento_{coluna}'] = simulacao['campanhas'][coluna].reindex(indice).to_numpy()
+
+    tabela['acoes'] = _linhas_acoes(analisador.recomendacoes()).reindex(indice).to_numpy()
+    tabela['arquivo'] = [f"{identificador_campanha(c)}.txt" for c in indice]
+    return tabela
+
+
+def _renderizar(campanha, linha, conta, gerado_em):
+    """Texto do relatório de uma campanha a partir de uma linha do contexto"""
+    periodos = ''.join(
+        TEMPLATE_PERIODO.substitute(
+            titulo=titulo,
+            dias=_numero(linha[f'Dias_ativos_{chave}'], '.0f', '0'),
+            gasto=_numero(linha[f'Gasto_{chave}']),
+            leads=_numero(linha[f'Leads_{chave}'], '.0f', '0'),
+            cac=_numero(linha[f'CAC_{chave}']),
+            ctr=_numero(linha[f'CTR_{chave}'], '.2f'),
+        )
+        for titulo, chave, _ in PERIODOS if linha[f'Gasto_{chave}'] > 0 or linha[f'Leads_{chave}'] > 0
+    )
+
+    tendencia = ''
+    if 'CAC_variacao' in linha:
+        tendencia = TEMPLATE_TENDENCIA.substitute(cac=_variacao(linha['CAC_variacao']), ctr=_variacao(linha.get('CTR_variacao')))
+
+    acoes = linha['acoes']
+    acoes = TEMPLATE_ACOES.substitute(linhas=acoes) if isinstance(acoes, str) else ''
+
+    orcamento = ''
+    if np.isfinite(linha.get('orcamento_Gasto_sugerido', np.nan)):
+        orcamento = TEMPLATE_ORCAMENTO.substitute(
+            atual=_numero(linha['orcamento_Gasto_atual']),
+            sugerido=_numero(linha['orcamento_Gasto_sugerido']),
+            variacao=f"{linha['orcamento_Variacao']:+.0f}%",
+        )
+
+    previsao = ''
+    if np.isfinite(linha.get('previsao_Leads', np.nan)):
+        previsao = TEMPLATE_PREVISAO.substitute(
+            horizonte=linha['horizonte'],
+            leads=_numero(linha['previsao_Leads'], '.0f'),
+            minimo=_numero(linha['previsao_Leads_min'], '.0f'),
+            maximo=_numero(linha['previsao_Leads_max'], '.0f'),
+            cac=_numero(linha['previsao_CAC']),
+        )
+
+    return TEMPLATE_CAMPANHA.substitute(
+        campanha=campanha, conta=conta, gerado_em=gerado_em,
+        periodos=periodos, tendencia=tendencia, acoes=acoes, orcamento=orcamento, previsao=previsao,
+    )
+
+
+def renderizar_bloco(contexto, pasta, conta, gerado_em):
+    """Executado em cada processo: formata e grava os relatórios de um bloco do contexto"""
+    escritos = 0
+    total_bytes = 0
+    for campanha, linha in zip(contexto.index, contexto.to_dict('records')):
+        texto = _renderizar(campanha, linha, conta, gerado_em)
+        with escrita_atomica(os.path.join(pasta, linha['arquivo'])) as f:
+            f.write(texto)
+        escritos += 1
+        total_bytes += len(texto.encode('utf-8'))
+    return escritos, total_bytes
+
+
+def renderizar_campanhas(contexto, pasta=PASTA_RELATORIOS_PADRAO, conta='', processos=None):
+    """Um relatório .txt por linha de `contexto` em `pasta` (+ indice.csv campanha -> arquivo)
+
+    Retorna dict com 'arquivos', 'bytes', 'processos' e 'segundos'.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    inicio = time.perf_counter()
+    os.makedirs(pasta, exist_ok=True)
+    gerado_em = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(contexto) < MINIMO_ARQUIVOS_POOL:
+        processos = 1
+        escritos, total_bytes = renderizar_bloco(contexto, pasta, conta, gerado_em)
+    else:
+        blocos = np.array_split(np.arange(len(contexto)), processos * BLOCOS_POR_PROCESSO)
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            tarefas = [pool.submit(renderizar_bloco, contexto.iloc[b], pasta, conta, gerado_em) for b in blocos if len(b)]
+            resultados = [tarefa.result() for tarefa in tarefas]
+        escritos = sum(r[0] for r in resultados)
+        total_bytes = sum(r[1] for r in resultados)
+
+    with escrita_atomica(os.path.join(pasta, 'indice.csv')) as f:
+        contexto[['arquivo']].to_csv(f)
+
+    return {'arquivos': escritos, 'bytes': total_bytes, 'processos': processos, 'segundos': time.perf_counter() - inicio}
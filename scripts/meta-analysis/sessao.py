@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+SESSÃO DE ANÁLISE (MEMOIZAÇÃO POR VERSÃO DOS DADOS)
+Arquitetura de Performance - ruas.dev.br
+
+Cada AnalisadorMetaProfissional tem uma sessão. Os métodos derivados
+(janelas, períodos, ranking, tendências, anomalias, previsão, tabela do
+relatório detalhado) são decorados com @memorizado: relatório, exportação,
+métricas chave e o AnalisadorMetaAds ligado à mesma sessão tiram os
+resultados do mesmo conjunto, e uma execução completa calcula cada um uma
+única vez.
+
+Os resultados valem para uma versão dos dados. A versão muda quando
+analisador.dados passa a ser outro objeto (nova carga, observador) ou em
+anexar()/invalidar(); aí tudo é descartado. Resultados que dependem da data
+de hoje (janelas relativas a hoje) também levam o dia na chave.
+
+Os resultados são compartilhados: quem os recebe não deve alterá-los.
+"""
+
+import functools
+import inspect
+from datetime import date
+
+import pandas as pd
+
+
+class SessaoAnalise:
+    def __init__(self, analisador):
+        self.analisador = analisador
+        self.versao = 0
+        self._fonte = None
+        self._resultados = {}
+        # nome -> {'calculos': n, 'reusos': n}
+        self.estatisticas = {}
+
+    def _conferir_versao(self):
+        if self.analisador.dados is not self._fonte:
+            self._fonte = self.analisador.dados
+            self.versao += 1
+            self._resultados.clear()
+
+    def memorizar(self, nome, chave, calcular):
+        """Resultado de `calcular()` para (nome, chave) na versão atual dos dados"""
+        self._conferir_versao()
+        contagem = self.estatisticas.setdefault(nome, {'calculos': 0, 'reusos': 0})
+        try:
+            resultado = self._resultados[(nome, chave)]
+        except KeyError:
+            resultado = self._resultados[(nome, chave)] = calcular()
+            contagem['calculos'] += 1
+            return resultado
+        contagem['reusos'] += 1
+        return resultado
+
+    def invalidar(self):
+        """Descarta os resultados (dados alterados no lugar, armazém atualizado por fora)"""
+        self.versao += 1
+        self._resultados.clear()
+
+    def anexar(self, novos, origem=None):
+        """Acrescenta linhas já tipadas (Data, Campanha, métricas) e abre nova versão"""
+        analisador = self.analisador
+        if novos is None or novos.empty:
+            return self.versao
+
+        if analisador.armazem is not None:
+            analisador.armazem.absorver(novos, origem=origem)
+            analisador.dados = analisador._adicionar_colunas_calculadas(analisador.armazem.por_dia())
+        else:
+            novos = analisador._adicionar_colunas_calculadas(novos.copy())
+            dados = novos if analisador.dados is None else pd.concat([analisador.dados, novos], ignore_index=True)
+            if 'Campanha' in dados.columns and not isinstance(dados['Campanha'].dtype, pd.CategoricalDtype):
+                dados['Campanha'] = dados['Campanha'].astype('category')
+            analisador.dados = dados
+        analisador.linhas_lidas += len(novos)
+
+        self._conferir_versao()
+        return self.versao
+
+    def resumo(self):
+        """Uma linha por resultado: quantas vezes foi calculado e reaproveitado"""
+        return '\n'.join(
+            f"{nome:32} {c['calculos']} cálculo(s), {c['reusos']} reuso(s)"
+            for nome, c in sorted(self.estatisticas.items())
+        )
+
+
+def memorizado(nome, depende_do_dia=False):
+    """Decorador de método do analisador: memoiza por argumentos na sessão dele
+
+    Com `depende_do_dia` a data de hoje entra na chave (janelas relativas a
+    hoje mudam à meia-noite mesmo sem dados novos).
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envolvida(self, *args, **kwargs):
+            sessao = getattr(self, 'sessao', None)
+            if sessao is None:
+                return funcao(self, *args, **kwargs)
+            # previsao() e previsao(30) caem na mesma chave
+            argumentos = assinatura.bind(self, *args, **kwargs)
+            argumentos.apply_defaults()
+            chave = tuple(argumentos.arguments.items())[1:]
+            if depende_do_dia:
+                chave += (date.today(),)
+            return sessao.memorizar(nome, chave, lambda: funcao(self, *args, **kwargs))
+        return envolvida
+    return decorador
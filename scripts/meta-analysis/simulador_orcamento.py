@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+SIMULADOR DE REALOCAÇÃO DE ORÇAMENTO (MONTE CARLO EM LOTE)
+Arquitetura de Performance - ruas.dev.br
+
+Parte dos totais por campanha (o groupby('Campanha') dos últimos dias) e
+modela os leads diários de cada campanha como a·gasto^b: b < 1 é o retorno
+decrescente (dobrar o gasto não dobra os leads). b é comum à conta e sai da
+verossimilhança de Poisson perfilada sobre os dias x campanhas do histórico
+(grade de valores avaliada de uma vez); a de cada campanha tem posterior
+Gamma(leads + 1/2) dado b.
+
+Os sorteios (a, b) e as alocações candidatas são matrizes: para cada grupo de
+sorteios com o mesmo b, leads = (gastos^b) @ aᵀ dá numa multiplicação de
+matrizes todas as alocações x todos os sorteios. As candidatas vêm de
+Dirichlet em torno da divisão atual, da solução analítica do modelo
+(gasto ∝ a^(1/(1-b))) e de rodadas de refinamento em torno da melhor, sempre
+com os mesmos sorteios (comparação pareada). Cada campanha fica entre
+LIMITE_REDUCAO e LIMITE_AUMENTO do gasto atual: o modelo não é extrapolado
+para longe do que os dados viram.
+
+Uso:
+    from simulador_orcamento import simular_campanhas
+    simulacao = simular_campanhas(dados, orcamento=5000)   # orçamento diário
+    simulacao['campanhas'][['Gasto_atual', 'Gasto_sugerido', 'Leads_previstos']]
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from tendencias import matrizes_diarias
+
+DIAS_HISTORICO = 30
+CANDIDATOS_PADRAO = 2000
+SORTEIOS_PADRAO = 2000
+RODADAS_REFINAMENTO = 3
+NIVEL_PADRAO = 0.8
+
+# Faixa de gasto por campanha em relação ao atual
+LIMITE_REDUCAO = 0.5
+LIMITE_AUMENTO = 2.0
+
+# Elasticidade leads x gasto: grade da verossimilhança e valor sem dados suficientes
+GRADE_ELASTICIDADE = np.round(np.arange(0.10, 0.951, 0.01), 2)
+ELASTICIDADE_PADRAO = 0.6
+ERRO_ELASTICIDADE_PADRAO = 0.15
+# Sorteios agrupados por valor de b (uma multiplicação de matrizes por grupo)
+GRUPOS_ELASTICIDADE = 16
+
+
+def estimar_elasticidade(gastos, leads):
+    """Expoente b de leads ~ a_c · gasto^b e seu erro padrão, a partir de matrizes dias x campanhas
+
+    Para cada b da grade, a_c de máxima verossimilhança é Σleads / Σgasto^b
+    da campanha; a log-verossimilhança perfilada sai de uma vez para a grade
+    inteira. O erro vem da curvatura no máximo. Sem variação de gasto dentro
+    das campanhas, devolve (ELASTICIDADE_PADRAO, ERRO_ELASTICIDADE_PADRAO).
+    """
+    dias_com_gasto = gastos > 0
+    variacao = np.nanstd(np.where(dias_com_gasto, np.log(np.where(dias_com_gasto, gastos, 1)), np.nan), axis=0)
+    if np.nansum(dias_com_gasto.sum(axis=0) >= 3) == 0 or not np.nanmax(np.nan_to_num(variacao)) > 0.05:
+        return ELASTICIDADE_PADRAO, ERRO_ELASTICIDADE_PADRAO
+
+    x = gastos[dias_com_gasto]
+    y = leads[dias_com_gasto]
+    campanha = np.nonzero(dias_com_gasto)[1]
+    n_campanhas = gastos.shape[1]
+
+    b = GRADE_ELASTICIDADE[:, None]
+    potencias = np.exp(b * np.log(x)[None, :])                       # (grade, linhas)
+    soma_leads = np.bincount(campanha, weights=y, minlength=n_campanhas)
+    soma_potencias = np.stack([np.bincount(campanha, weights=p, minlength=n_campanhas) for p in potencias])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.where(soma_potencias > 0, soma_leads / soma_potencias, 0.0)
+        log_a = np.where(a > 0, np.log(a), 0.0)
+    # Σ y·(log a_c + b·log x) - Σ a_c·x^b ; o segundo termo é Σ leads (constante) no máximo de a
+    verossimilhanca = (y * (log_a[:, campanha] + b * np.log(x))).sum(axis=1) - soma_leads.sum()
+
+    melhor = int(np.argmax(verossimilhanca))
+    estimativa = float(GRADE_ELASTICIDADE[melhor])
+    if 0 < melhor < len(GRADE_ELASTICIDADE) - 1:
+        passo = GRADE_ELASTICIDADE[1] - GRADE_ELASTICIDADE[0]
+        curvatura = (verossimilhanca[melhor - 1] - 2 * verossimilhanca[melhor] + verossimilhanca[melhor + 1]) / passo ** 2
+        erro = float(np.sqrt(-1 / curvatura)) if curvatura < 0 else ERRO_ELASTICIDADE_PADRAO
+    else:
+        # Máximo na borda: o modelo empurrou b para o limite, incerteza padrão
+        erro = ERRO_ELASTICIDADE_PADRAO
+    return estimativa, min(erro, ERRO_ELASTICIDADE_PADRAO)
+
+
+def projetar(alocacoes, minimo, maximo, total, iteracoes=30):
+    """Leva cada linha de `alocacoes` para soma `total` dentro de [minimo, maximo] por coluna"""
+    x = np.clip(alocacoes, minimo, maximo)
+    for _ in range(iteracoes):
+        falta = total - x.sum(axis=1, keepdims=True)
+        if np.abs(falta).max() <= 1e-9 * total:
+            break
+        # Distribui a diferença proporcionalmente entre as campanhas que ainda podem se mover
+        moveis = np.where(falta > 0, x < maximo, x > minimo)
+        peso = np.where(moveis, np.where(falta > 0, maximo - x, x - minimo), 0.0)
+        soma = peso.sum(axis=1, keepdims=True)
+        x = np.clip(x + falta * peso / np.where(soma > 0, soma, 1.0), minimo, maximo)
+    return x
+
+
+def _dirichlet(rng, centro, concentracao):
+    """Uma divisão (linha somando 1) por concentração, sorteada em torno de `centro`"""
+    sorteio = rng.gamma(concentracao * centro)
+    return sorteio / sorteio.sum(axis=1, keepdims=True)
+
+
+class SimuladorOrcamento:
+    """Sorteios do modelo de resposta e avaliação em lote de alocações"""
+
+    def __init__(self, gasto_dia, leads_total, dias, elasticidade, erro_elasticidade,
+                 sorteios=SORTEIOS_PADRAO, semente=42):
+        self.gasto_dia = np.asarray(gasto_dia, dtype=np.float64)
+        self.elasticidade = elasticidade
+        self.erro_elasticidade = erro_elasticidade
+        rng = np.random.default_rng(semente)
+
+        # b por grupo: quantis da normal (estratificado), dentro da faixa de retorno decrescente
+        grupos = min(GRUPOS_ELASTICIDADE, sorteios)
+        quantis = (np.arange(grupos) + 0.5) / grupos
+        z = np.array([NormalDist().inv_cdf(q) for q in quantis])
+        self.b = np.clip(elasticidade + erro_elasticidade * z, GRADE_ELASTICIDADE[0], GRADE_ELASTICIDADE[-1])
+
+        # a | b ~ Gamma(leads + 1/2, 1 / (dias · gasto^b)); o ruído Gamma é comum a todos os b
+        self.por_grupo = np.array_split(np.arange(sorteios), grupos)
+        ruido = rng.gamma(np.asarray(leads_total, dtype=np.float64) + 0.5, size=(sorteios, len(self.gasto_dia)))
+        with np.errstate(divide='ignore'):
+            log_gasto = np.log(self.gasto_dia)
+        self.a = [ruido[indices] / (dias * np.exp(b * log_gasto)) for b, indices in zip(self.b, self.por_grupo)]
+        self.sorteios = sorteios
+
+    def leads(self, alocacoes):
+        """Leads diários (alocações x sorteios) de cada alocação (linhas = gasto diário por campanha)"""
+        alocacoes = np.atleast_2d(alocacoes)
+        resultado = np.empty((len(alocacoes), self.sorteios))
+        with np.errstate(divide='ignore'):
+            log_alocacoes = np.log(alocacoes)
+        for b, a, indices in zip(self.b, self.a, self.por_grupo):
+            resultado[:, indices] = np.exp(b * log_alocacoes) @ a.T
+        return resultado
+
+    def esperado(self):
+        """a esperado de cada campanha no b central"""
+        meio = len(self.b) // 2
+        return self.a[meio].mean(axis=0)
+
+
+def simular_orcamento(agregados, dias, orcamento=None, gastos_diarios=None, leads_diarios=None,
+                      candidatos=CANDIDATOS_PADRAO, sorteios=SORTEIOS_PADRAO, nivel=NIVEL_PADRAO,
+                      limite_reducao=LIMITE_REDUCAO, limite_aumento=LIMITE_AUMENTO, semente=42):
+    """Melhor divisão diária de `orcamento` entre as campanhas de `agregados`
+
+    `agregados`: totais por campanha (índice Campanha, colunas Gasto e Leads)
+    somados em `dias` dias. `gastos_diarios`/`leads_diarios` (dias x
+    campanhas, mesma ordem) estimam a elasticidade; sem eles vale
+    ELASTICIDADE_PADRAO. `orcamento` é diário (padrão: o gasto diário atual).
+
+    Retorna dict com 'campanhas' (gasto e leads atuais e sugeridos por
+    campanha), 'total', 'elasticidade', 'erro_elasticidade', 'candidatos',
+    'sorteios', 'nivel' e 'dias_historico'. None sem ao menos duas campanhas
+    com gasto.
+    """
+    agregados = agregados[agregados['Gasto'] > 0]
+    if len(agregados) < 2:
+        return None
+
+    gasto_dia = agregados['Gasto'].to_numpy(dtype=np.float64) / dias
+    leads_total = agregados['Leads'].to_numpy(dtype=np.float64)
+    atual = float(gasto_dia.sum())
+    orcamento = float(orcamento) if orcamento else atual
+    minimo, maximo = limite_reducao * gasto_dia, limite_aumento * gasto_dia
+    if not minimo.sum() <= orcamento <= maximo.sum():
+        raise ValueError(f"orçamento diário R$ {orcamento:,.2f} fora do alcance das campanhas "
+                         f"(R$ {minimo.sum():,.2f} a R$ {maximo.sum():,.2f} com limites "
+                         f"{limite_reducao:g}x a {limite_aumento:g}x do gasto atual)")
+
+    if gastos_diarios is not None and leads_diarios is not None:
+        elasticidade, erro = estimar_elasticidade(gastos_diarios, leads_diarios)
+    else:
+        elasticidade, erro = ELASTICIDADE_PADRAO, ERRO_ELASTICIDADE_PADRAO
+
+    simulador = SimuladorOrcamento(gasto_dia, leads_total, dias, elasticidade, erro, sorteios, semente)
+    rng = np.random.default_rng(semente + 1)
+    n_campanhas = len(gasto_dia)
+
+    # Rodada 0: atual (escalado para o orçamento), solução analítica e Dirichlet em torno do atual
+    fatias = gasto_dia / atual
+    a = simulador.esperado()
+    with np.errstate(divide='ignore'):
+        log_peso = np.log(a) / (1 - elasticidade)
+    analitica = np.exp(log_peso - log_peso.max())
+    iniciais = [fatias * orcamento, analitica / analitica.sum() * orcamento]
+
+    por_rodada = max((candidatos - len(iniciais)) // (RODADAS_REFINAMENTO + 1), 1)
+    concentracao = np.exp(rng.uniform(np.log(5), np.log(500), size=(por_rodada, 1))) * n_campanhas
+    alocacoes = projetar(np.vstack([iniciais, _dirichlet(rng, fatias, concentracao) * orcamento]), minimo, maximo, orcamento)
+    leads = simulador.leads(alocacoes)
+    media = leads.mean(axis=1)
+
+    # Refinamento: perturbações cada vez menores em torno da melhor até agora
+    for rodada in range(1, RODADAS_REFINAMENTO + 1):
+        melhor = alocacoes[np.argmax(media)]
+        concentracao = np.exp(rng.uniform(np.log(50), np.log(5000), size=(por_rodada, 1))) * n_campanhas * rodada
+        novas = projetar(_dirichlet(rng, melhor / orcamento, concentracao) * orcamento, minimo, maximo, orcamento)
+        leads_novas = simulador.leads(novas)
+        alocacoes = np.vstack([alocacoes, novas])
+        leads = np.vstack([leads, leads_novas])
+        media = np.concatenate([media, leads_novas.mean(axis=1)])
+
+    indice = int(np.argmax(media))
+    sugerida = alocacoes[indice]
+    leads_sugerida = leads[indice]
+    leads_atual_sorteios = simulador.leads(gasto_dia)[0]
+
+    cauda = (1 - nivel) / 2
+    # Leads esperados por campanha (média dos sorteios, todos os grupos de b)
+    def por_campanha(gastos):
+        soma = np.zeros(n_campanhas)
+        with np.errstate(divide='ignore'):
+            log_gastos = np.log(gastos)
+        for b, a_grupo in zip(simulador.b, simulador.a):
+            soma += a_grupo.sum(axis=0) * np.exp(b * log_gastos)
+        return soma / sorteios
+
+    tabela = pd.DataFrame({
+        'Gasto_atual': gasto_dia,
+        'Gasto_sugerido': sugerida,
+        'Leads_atual': leads_total / dias,
+        'Leads_modelo': por_campanha(gasto_dia),
+        'Leads_previstos': por_campanha(sugerida),
+    }, index=agregados.index)
+    tabela['Variacao'] = (tabela['Gasto_sugerido'] / tabela['Gasto_atual'] - 1) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tabela['CAC_atual'] = np.where(tabela['Leads_atual'] > 0, tabela['Gasto_atual'] / tabela['Leads_atual'], np.nan)
+        tabela['CAC_previsto'] = np.where(tabela['Leads_previstos'] > 0, tabela['Gasto_sugerido'] / tabela['Leads_previstos'], np.nan)
+
+    leads_esperados = float(leads_sugerida.mean())
+    leads_atuais = float(leads_atual_sorteios.mean())
+    total = {
+        'orcamento': orcamento,
+        'gasto_atual': atual,
+        'leads_atual': leads_atuais,
+        'leads': leads_esperados,
+        'leads_min': float(np.quantile(leads_sugerida, cauda)),
+        'leads_max': float(np.quantile(leads_sugerida, 1 - cauda)),
+        'ganho': (leads_esperados / leads_atuais - 1) * 100 if leads_atuais > 0 else 0.0,
+        # Fração dos sorteios em que a sugerida rende mais que a divisão atual (só faz sentido com o mesmo orçamento)
+        'prob_melhor': float((leads_sugerida > leads_atual_sorteios).mean()),
+        'cac_atual': atual / leads_atuais if leads_atuais > 0 else 0,
+        'cac': orcamento / leads_esperados if leads_esperados > 0 else 0,
+    }
+
+    return {
+        'campanhas': tabela,
+        'total': total,
+        'elasticidade': elasticidade,
+        'erro_elasticidade': erro,
+        'candidatos': len(alocacoes),
+        'sorteios': sorteios,
+        'nivel': nivel,
+        'dias_historico': dias,
+    }
+
+
+def simular_campanhas(dados, orcamento=None, dias=DIAS_HISTORICO, **opcoes):
+    """simular_orcamento() sobre os últimos `dias` dias de `dados` (linhas Data x Campanha)
+
+    Os totais por campanha e as matrizes diárias da elasticidade saem do
+    mesmo pivô dias x campanhas. None sem coluna Data ou sem duas campanhas.
+    """
+    if 'Data' not in dados.columns or not {'Gasto', 'Leads'} <= set(dados.columns):
+        return None
+    datas, campanhas, matrizes = matrizes_diarias(dados, dias_historico=dias)
+    if len(datas) == 0:
+        return None
+
+    gastos, leads = matrizes['Gasto'], matrizes['Leads']
+    agregados = pd.DataFrame({'Gasto': gastos.sum(axis=0), 'Leads': leads.sum(axis=0)}, index=campanhas)
+    com_gasto = agregados['Gasto'].to_numpy() > 0
+    return simular_orcamento(agregados, len(datas), orcamento, gastos[:, com_gasto], leads[:, com_gasto], **opcoes)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+STUB LOCAL DA GRAPH API (insights)
+Arquitetura de Performance - ruas.dev.br
+
+Servidor asyncio que imita o suficiente da Meta Marketing API para exercitar
+o ingestao_api.py sem rede nem token real:
+
+  • GET  /{versao}/act_X/insights            leitura direta paginada por cursor
+  • POST /{versao}/act_X/insights            cria relatório assíncrono
+  • GET  /{versao}/{report_run_id}           status (conclui após alguns pollings)
+  • GET  /{versao}/{report_run_id}/insights  resultado paginado
+
+Dados determinísticos por (conta, dia, campanha), com as ações de lead
+sobrepostas como na API real ('lead' = formulário + pixel; algumas campanhas
+sem 'lead', só com as parciais), cabeçalhos de uso que
+crescem com as chamadas, erros de limite (80000 com
+estimated_time_to_regain_access) e transitórios aleatórios, token inválido
+(190), keep-alive e gzip.
+
+Uso:
+    python stub_graph_api.py [--porta 8899] [--token teste] [--falhas 0.05]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CAMPANHAS_POR_CONTA = 12
+POLLINGS_ATE_CONCLUIR = 2
+
+
+def valores_dia(conta, dia, campanha):
+    """Métricas determinísticas de uma campanha num dia"""
+    semente = int.from_bytes(hashlib.blake2b(f'{conta}|{dia}|{campanha}'.encode(), digest_size=8).digest(), 'big')
+    rng = random.Random(semente)
+    impressoes = rng.randint(500, 20000)
+    cliques = rng.randint(5, max(6, impressoes // 40))
+    gasto = round(rng.uniform(10, 400), 2)
+    leads = rng.randint(0, max(1, cliques // 8))
+    return {
+        'impressions': impressoes,
+        'clicks': cliques,
+        'spend': gasto,
+        'reach': int(impressoes * rng.uniform(0.6, 0.95)),
+        'leads': leads,
+        'leads_formulario': rng.randint(0, leads),
+    }
+
+
+def linhas_insights(conta, desde, ate, campanhas=CAMPANHAS_POR_CONTA):
+    """Linhas no formato da API (level=campaign, time_increment=1)"""
+    linhas = []
+    dia = desde
+    while dia <= ate:
+        for c in range(campanhas):
+            v = valores_dia(conta, dia.isoformat(), c)
+            linha = {
+                'date_start': dia.isoformat(),
+                'date_stop': dia.isoformat(),
+                'campaign_id': f'{conta[4:]}{c:04d}',
+                'campaign_name': f'{conta} Campanha {c:02d}',
+                'impressions': str(v['impressions']),
+                'clicks': str(v['clicks']),
+                'spend': f"{v['spend']:.2f}",
+                'reach': str(v['reach']),
+                'cpm': f"{v['spend'] / v['impressions'] * 1000:.6f}",
+                'cpc': f"{v['spend'] / v['clicks']:.6f}",
+            }
+            if v['leads']:
+                formulario = v['leads_formulario']
+                linha['actions'] = [
+                    {'action_type': 'link_click', 'value': str(v['clicks'])},
+                    {'action_type': 'onsite_conversion.lead_grouped', 'value': str(formulario)},
+                    {'action_type': 'offsite_conversion.fb_pixel_lead', 'value': str(v['leads'] - formulario)},
+                ]
+                # 'lead' é o total das duas; a cada 4 campanhas ele fica de fora
+                if c % 4 != 3:
+                    linha['actions'].append({'action_type': 'lead', 'value': str(v['leads'])})
+            linhas.append(linha)
+        dia += timedelta(days=1)
+    return linhas
+
+
+def totais_esperados(contas, desde, ate):
+    """Somas de Gasto/Leads/Cliques/Impressoes que a ingestão deve reproduzir"""
+    totais = {'Gasto': 0.0, 'Leads': 0, 'Cliques': 0, 'Impressoes': 0, 'linhas': 0}
+    for conta in contas:
+        for linha in linhas_insights(conta, desde, ate):
+            totais['Gasto'] += float(linha['spend'])
+            totais['Cliques'] += int(linha['clicks'])
+            totais['Impressoes'] += int(linha['impressions'])
+            totais['Leads'] += valores_dia(conta, linha['date_start'], int(linha['campaign_id'][-4:]))['leads']
+            totais['linhas'] += 1
+    return totais
+
+
+class StubGraphAPI:
+    def __init__(self, token='teste', falhas=0.0, limite_chamadas=0, semente=0):
+        self.token = token
+        self.falhas = falhas
+        # Após este número de chamadas por conta, responde uma vez com erro 80000
+        self.limite_chamadas = limite_chamadas
+        self.rng = random.Random(semente)
+        self.chamadas = {}
+        self.relatorios = {}
+        self.estatisticas = {'requisicoes': 0, 'conexoes': 0, 'erros_injetados': 0, 'limites': 0}
+        self.servidor = None
+        self.base_url = None
+
+    # ---------- HTTP ----------
+
+    async def iniciar(self, host='127.0.0.1', porta=0):
+        self.servidor = await asyncio.start_server(self._conexao, host, porta)
+        porta = self.servidor.sockets[0].getsockname()[1]
+        self.base_url = f'http://{host}:{porta}'
+        return porta
+
+    async def fechar(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+
+    async def _conexao(self, leitor, escritor):
+        self.estatisticas['conexoes'] += 1
+        try:
+            while True:
+                try:
+                    bruto = await leitor.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+                    return
+                linhas = bruto.decode('latin-1').split('\r\n')
+                metodo, alvo, _ = linhas[0].split(' ', 2)
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    if linha:
+                        nome, _, valor = linha.partition(':')
+                        cabecalhos[nome.strip().lower()] = valor.strip()
+                corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+
+                status, resposta, extras = self._responder(metodo, alvo, corpo)
+                dados = json.dumps(resposta).encode()
+                extras['Content-Type'] = 'application/json'
+                if 'gzip' in cabecalhos.get('accept-encoding', '') and len(dados) > 512:
+                    dados = gzip.compress(dados, 1)
+                    extras['Content-Encoding'] = 'gzip'
+                extras['Content-Length'] = str(len(dados))
+                cabecalho = f'HTTP/1.1 {status} X\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in extras.items())
+                escritor.write(cabecalho.encode('latin-1') + b'\r\n' + dados)
+                await escritor.drain()
+        finally:
+            escritor.close()
+
+    # ---------- Graph API ----------
+
+    @staticmethod
+    def _erro(codigo, mensagem, transitorio=False):
+        return {'error': {'message': mensagem, 'type': 'OAuthException', 'code': codigo, 'is_transient': transitorio}}
+
+    def _uso(self, conta):
+        chamadas = self.chamadas.get(conta, 0)
+        uso = min(100, chamadas // 4)
+        return {
+            'X-Business-Use-Case-Usage': json.dumps({'1': [{
+                'type': 'ads_insights', 'call_count': uso, 'total_cputime': uso // 2,
+                'total_time': uso // 2, 'estimated_time_to_regain_access': 0,
+            }]}),
+            'X-Ad-Account-Usage': json.dumps({'acc_id_util_pct': uso // 3, 'reset_time_duration': 0}),
+        }
+
+    def _responder(self, metodo, alvo, corpo):
+        self.estatisticas['requisicoes'] += 1
+        partes = urlsplit(alvo)
+        parametros = dict(parse_qsl(partes.query))
+        if metodo == 'POST':
+            parametros.update(parse_qsl(corpo.decode()))
+        caminho = partes.path.strip('/').split('/')[1:]
+
+        if parametros.get('access_token') != self.token:
+            return 400, self._erro(190, 'Invalid OAuth access token.'), {}
+
+        conta = caminho[0] if caminho[0].startswith('act_') else self.relatorios.get(caminho[0], {}).get('conta', '?')
+        self.chamadas[conta] = self.chamadas.get(conta, 0) + 1
+        extras = self._uso(conta)
+
+        if self.limite_chamadas and self.chamadas[conta] % self.limite_chamadas == 0:
+            self.estatisticas['limites'] += 1
+            uso = json.loads(extras['X-Business-Use-Case-Usage'])
+            uso['1'][0].update(call_count=100, estimated_time_to_regain_access=0.001)
+            extras['X-Business-Use-Case-Usage'] = json.dumps(uso)
+            return 400, self._erro(80000, 'There have been too many calls from this ad-account.', True), extras
+
+        if self.falhas and self.rng.random() < self.falhas:
+            self.estatisticas['erros_injetados'] += 1
+            if self.rng.random() < 0.5:
+                return 500, self._erro(2, 'Service temporarily unavailable', True), extras
+            return 503, {'error': {'message': 'Service Unavailable', 'code': 1}}, extras
+
+        if caminho[0].startswith('act_') and caminho[1:] == ['insights']:
+            intervalo = json.loads(parametros['time_range'])
+            desde, ate = date.fromisoformat(intervalo['since']), date.fromisoformat(intervalo['until'])
+            if metodo == 'POST':
+                relatorio = f'{len(self.relatorios) + 1}{self.rng.randrange(10 ** 9):09d}'
+                self.relatorios[relatorio] = {'conta': conta, 'desde': desde, 'ate': ate, 'pollings': 0}
+                return 200, {'report_run_id': relatorio}, extras
+            return 200, self._pagina(partes.path, parametros, linhas_insights(conta, desde, ate)), extras
+
+        relatorio = self.relatorios.get(caminho[0])
+        if relatorio is None:
+            return 400, self._erro(100, f'Unknown path {partes.path}'), extras
+
+        if len(caminho) == 1:
+            relatorio['pollings'] += 1
+            concluido = relatorio['pollings'] > POLLINGS_ATE_CONCLUIR
+            return 200, {
+                'id': caminho[0],
+                'async_status': 'Job Completed' if concluido else 'Job Running',
+                'async_percent_completion': 100 if concluido else 50,
+            }, extras
+
+        linhas = linhas_insights(relatorio['conta'], relatorio['desde'], relatorio['ate'])
+        return 200, self._pagina(partes.path, parametros, linhas), extras
+
+    def _pagina(self, caminho, parametros, linhas):
+        """Fatia `linhas` pelo cursor `after` (posição codificada em hex)"""
+        limite = int(parametros.get('limit', 25))
+        inicio = int(parametros.get('after', '0'), 16)
+        pagina = {'data': linhas[inicio:inicio + limite], 'paging': {'cursors': {'before': format(inicio, 'x')}}}
+        if inicio + limite < len(linhas):
+            proximo = dict(parametros, after=format(inicio + limite, 'x'))
+            pagina['paging']['cursors']['after'] = proximo['after']
+            pagina['paging']['next'] = f'{self.base_url}{caminho}?{urlencode(proximo)}'
+        return pagina
+
+
+async def _servir(porta, token, falhas, limite_chamadas):
+    stub = StubGraphAPI(token, falhas, limite_chamadas)
+    await stub.iniciar('127.0.0.1', porta)
+    print(f"🧪 Stub da Graph API em {stub.base_url} (token: {token})")
+    async with stub.servidor:
+        await stub.servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local da Graph API para testar a ingestão")
+    parser.add_argument('--porta', type=int, default=8899)
+    parser.add_argument('--token', default='teste')
+    parser.add_argument('--falhas', type=float, default=0.0, help="fração de respostas com erro transitório")
+    parser.add_argument('--limite-chamadas', type=int, default=0, help="erro 80000 a cada N chamadas por conta")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_servir(args.porta, args.token, args.falhas, args.limite_chamadas))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+MOTOR DE TENDÊNCIAS POR CAMPANHA
+Arquitetura de Performance - ruas.dev.br
+
+Compara janelas de dias corridos (ex.: últimos 3 dias vs 3 dias anteriores)
+para todas as campanhas de uma vez. As métricas são pivotadas em matrizes
+dias x campanhas sobre um calendário contínuo; as somas móveis saem de
+somas acumuladas no eixo dos dias, então CAC, CTR e Taxa_Conversao de cada
+campanha em cada dia são calculados em uma única passada vetorizada.
+"""
+
+import numpy as np
+import pandas as pd
+
+METRICAS_BASE = ['Gasto', 'Leads', 'Cliques', 'Impressoes']
+
+# Taxa: (numerador, denominador, multiplicador)
+TAXAS = {
+    'CAC': ('Gasto', 'Leads', 1),
+    'CTR': ('Cliques', 'Impressoes', 100),
+    'Taxa_Conversao': ('Leads', 'Cliques', 100),
+}
+
+
+def _dividir(numerador, denominador, multiplicador=1):
+    """Divisão elemento a elemento com NaN onde o denominador é zero"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominador > 0, numerador / denominador * multiplicador, np.nan)
+
+
+def _variacao(atual, anterior):
+    """Variação percentual; NaN quando não há base de comparação"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(anterior > 0, (atual - anterior) / anterior * 100, np.nan)
+
+
+def matrizes_diarias(dados, dias_historico=None):
+    """Pivota as métricas em matrizes (dias x campanhas) num calendário contínuo
+
+    Retorna (datas, campanhas, {métrica: matriz}). Com `dias_historico` só os
+    últimos N dias dos dados entram nas matrizes.
+    """
+    dias = pd.to_datetime(dados['Data'], errors='coerce').to_numpy().astype('datetime64[D]')
+    validos = ~np.isnat(dias)
+    if not validos.any():
+        return np.array([], dtype='datetime64[D]'), pd.Index([]), {}
+
+    if 'Campanha' in dados.columns:
+        codigos, campanhas = pd.factorize(dados['Campanha'].to_numpy()[validos], use_na_sentinel=False)
+    else:
+        codigos, campanhas = np.zeros(validos.sum(), dtype=np.int64), pd.Index(['(todas)'])
+
+    dias = dias[validos]
+    fim = dias.max()
+    inicio = dias.min()
+    if dias_historico:
+        inicio = max(inicio, fim - np.timedelta64(dias_historico - 1, 'D'))
+
+    dentro = dias >= inicio
+    posicoes = (dias[dentro] - inicio).astype(np.int64)
+    codigos = codigos[dentro]
+    n_dias = int((fim - inicio).astype(int)) + 1
+    n_campanhas = len(campanhas)
+
+    # Índice plano dia * n_campanhas + campanha -> uma bincount por métrica
+    plano = posicoes * n_campanhas + codigos
+    matrizes = {}
+    for metrica in METRICAS_BASE:
+        if metrica not in dados.columns:
+            continue
+        valores = dados[metrica].to_numpy(dtype=np.float64)[validos][dentro]
+        matrizes[metrica] = np.bincount(plano, weights=valores, minlength=n_dias * n_campanhas).reshape(n_dias, n_campanhas)
+
+    datas = inicio + np.arange(n_dias).astype('timedelta64[D]')
+    return datas, pd.Index(campanhas, name='Campanha'), matrizes
+
+
+def somas_moveis(matriz, janela):
+    """Soma dos últimos `janela` dias para cada dia e campanha (eixo 0)"""
+    acumulado = np.vstack([np.zeros((1, matriz.shape[1])), np.cumsum(matriz, axis=0)])
+    return acumulado[janela:] - acumulado[:-janela]
+
+
+def tendencias_moveis(dados, janela_dias=3, dias_historico=None):
+    """Taxas e variações móveis para todos os dias e campanhas
+
+    Para cada dia d (a partir do dia 2*janela) compara a janela que termina em
+    d com a janela imediatamente anterior. Retorna (datas, campanhas, dict)
+    com matrizes '<taxa>_atual', '<taxa>_anterior' e '<taxa>_variacao'.
+    """
+    datas, campanhas, matrizes = matrizes_diarias(dados, dias_historico)
+    if len(datas) < 2 * janela_dias:
+        return datas[:0], campanhas, {}
+
+    moveis = {m: somas_moveis(matriz, janela_dias) for m, matriz in matrizes.items()}
+    resultado = {}
+    for metrica, matriz in moveis.items():
+        resultado[f'{metrica}_atual'] = matriz[janela_dias:]
+
+    for taxa, (numerador, denominador, multiplicador) in TAXAS.items():
+        if numerador not in moveis or denominador not in moveis:
+            continue
+        taxa_movel = _dividir(moveis[numerador], moveis[denominador], multiplicador)
+        atual, anterior = taxa_movel[janela_dias:], taxa_movel[:-janela_dias]
+        resultado[f'{taxa}_atual'] = atual
+        resultado[f'{taxa}_anterior'] = anterior
+        resultado[f'{taxa}_variacao'] = _variacao(atual, anterior)
+
+    return datas[2 * janela_dias - 1:], campanhas, resultado
+
+
+def calcular_tendencias(dados, janela_dias=3):
+    """Tendência mais recente de cada campanha (um DataFrame por campanha)
+
+    Só os últimos 2*janela dias são pivotados, então o custo não depende do
+    tamanho do histórico.
+    """
+    datas, campanhas, moveis = tendencias_moveis(dados, janela_dias, dias_historico=2 * janela_dias)
+    if not moveis:
+        return pd.DataFrame(index=campanhas)
+
+    tabela = pd.DataFrame({nome: matriz[-1] for nome, matriz in moveis.items()}, index=campanhas)
+    tabela.attrs['referencia'] = pd.Timestamp(datas[-1])
+    return tabela
+
+
+def tendencia_global(dados, janela_dias=3):
+    """Mesma comparação somando todas as campanhas (um valor por taxa)"""
+    datas, _, matrizes = matrizes_diarias(dados, dias_historico=2 * janela_dias)
+    if len(datas) < 2 * janela_dias:
+        return {}
+
+    totais = {m: matriz.sum(axis=1) for m, matriz in matrizes.items()}
+    atual = {m: serie[janela_dias:].sum() for m, serie in totais.items()}
+    anterior = {m: serie[:janela_dias].sum() for m, serie in totais.items()}
+
+    resultado = {}
+    for taxa, (numerador, denominador, multiplicador) in TAXAS.items():
+        if numerador not in totais or denominador not in totais:
+            continue
+        taxa_atual = _dividir(atual[numerador], atual[denominador], multiplicador)
+        taxa_anterior = _dividir(anterior[numerador], anterior[denominador], multiplicador)
+        resultado[taxa] = {
+            'atual': float(taxa_atual),
+            'anterior': float(taxa_anterior),
+            'variacao': float(_variacao(taxa_atual, taxa_anterior)),
+        }
+    return resultado
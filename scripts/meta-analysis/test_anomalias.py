@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+TESTES DO DETECTOR DE ANOMALIAS
+Arquitetura de Performance - ruas.dev.br
+
+Uso:
+    python -m pytest test_anomalias.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from anomalias import DetectorAnomalias, detectar_anomalias
+
+CAMPANHAS = 10
+DIAS = 300
+
+
+def _exportacao(decrescente=True):
+    """3000 linhas Campanha x dia com um pico de CAC por campanha, mais recentes primeiro"""
+    rng = np.random.default_rng(7)
+    datas = pd.date_range('2025-01-01', periods=DIAS, freq='D')
+    linhas = []
+    for c in range(CAMPANHAS):
+        leads = rng.poisson(40, DIAS)
+        gasto = leads * rng.normal(12, 0.6, DIAS)
+        gasto[200 + c] *= 6
+        linhas.append(pd.DataFrame({
+            'Data': datas,
+            'Campanha': f'Campanha {c}',
+            'Gasto': gasto,
+            'Leads': leads,
+            'Cliques': rng.poisson(400, DIAS),
+            'Impressoes': rng.poisson(12000, DIAS),
+        }))
+    dados = pd.concat(linhas, ignore_index=True)
+    return dados.sort_values(['Data', 'Campanha'], ascending=not decrescente, ignore_index=True)
+
+
+def _blocos(dados, tamanho=333):
+    return [dados.iloc[i:i + tamanho] for i in range(0, len(dados), tamanho)]
+
+
+def _chaves(detector):
+    tabela = detector.anomalias()
+    return set(zip(tabela['Data'], tabela['Campanha'], tabela['Metrica']))
+
+
+def test_blocos_em_ordem_decrescente_acumulados_equivalem_ao_lote_inteiro():
+    dados = _exportacao()
+    inteiro = detectar_anomalias(dados)
+
+    detector = DetectorAnomalias()
+    for bloco in _blocos(dados):
+        detector.acumular(bloco)
+    detector.descarregar()
+    detector.finalizar()
+
+    assert detector.linhas_atrasadas == 0
+    assert detector.dias_avaliados == CAMPANHAS * DIAS
+    assert _chaves(detector) == _chaves(inteiro)
+    assert len(_chaves(detector)) >= CAMPANHAS
+
+
+def test_finalizar_descarrega_blocos_pendentes():
+    dados = _exportacao()
+    detector = DetectorAnomalias()
+    for bloco in _blocos(dados):
+        detector.acumular(bloco)
+    detector.finalizar()
+
+    assert detector.dias_avaliados == CAMPANHAS * DIAS
+    assert _chaves(detector) == _chaves(detectar_anomalias(dados))
+
+
+def test_atualizar_conta_dias_atrasados():
+    # Sem acumular, cada bloco fecha seus dias e os blocos seguintes (mais antigos) ficam para trás
+    dados = _exportacao()
+    detector = DetectorAnomalias()
+    for bloco in _blocos(dados):
+        detector.atualizar(bloco)
+    detector.finalizar()
+
+    assert detector.linhas_atrasadas > 0
+    assert detector.linhas_atrasadas + detector.dias_avaliados == CAMPANHAS * DIAS
+
+
+def test_blocos_crescentes_com_atualizar_equivalem_ao_lote_inteiro():
+    dados = _exportacao(decrescente=False)
+    detector = DetectorAnomalias()
+    for bloco in _blocos(dados):
+        detector.atualizar(bloco)
+    detector.finalizar()
+
+    assert detector.linhas_atrasadas == 0
+    assert _chaves(detector) == _chaves(detectar_anomalias(dados))
+
+
+def test_blocos_crescentes_acumulados_fecham_dias_sem_esperar_o_fim():
+    dados = _exportacao(decrescente=False)
+    detector = DetectorAnomalias()
+    for bloco in _blocos(dados):
+        detector.acumular(bloco)
+        # Só o último dia lido de cada campanha fica pendente
+        assert sum(len(dias) for _, dias, _ in detector._pendentes) <= CAMPANHAS
+    assert detector.dias_avaliados > 0
+    detector.descarregar()
+    detector.finalizar()
+
+    assert detector.linhas_atrasadas == 0
+    assert detector.dias_avaliados == CAMPANHAS * DIAS
+    assert _chaves(detector) == _chaves(detectar_anomalias(dados))
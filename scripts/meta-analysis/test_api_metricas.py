@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+TESTES DA API LOCAL DE MÉTRICAS
+Arquitetura de Performance - ruas.dev.br
+
+Uso:
+    python -m pytest test_api_metricas.py
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from api_metricas import LIMITE_CORPO, ServicoMetricas
+
+DADOS_TESTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_teste.csv')
+
+
+async def _requisicoes(brutas):
+    """Envia cada requisição crua numa conexão nova; devolve a linha de status (ou b'')"""
+    servico = ServicoMetricas(arquivo_csv=DADOS_TESTE)
+    servidor = await servico.iniciar('127.0.0.1', 0)
+    porta = servidor.sockets[0].getsockname()[1]
+    try:
+        respostas = []
+        for bruta in brutas:
+            leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+            escritor.write(bruta)
+            await escritor.drain()
+            respostas.append((await asyncio.wait_for(leitor.readline(), 5)).strip())
+            escritor.close()
+        return respostas
+    finally:
+        servico._vigia.cancel()
+        servidor.close()
+        await servidor.wait_closed()
+
+
+@pytest.mark.parametrize('tamanho', ['abc', '-5', '1e3', '²'])
+def test_content_length_invalido_responde_400(tamanho):
+    erros = []
+    async def executar():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, contexto: erros.append(contexto))
+        return await _requisicoes([
+            f"POST /metricas HTTP/1.1\r\nHost: x\r\nContent-Length: {tamanho}\r\n\r\n".encode('utf-8'),
+            b"GET /metricas HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+        ])
+
+    invalida, valida = asyncio.run(executar())
+    assert invalida == b'HTTP/1.1 400 Bad Request'
+    assert valida == b'HTTP/1.1 200 OK'
+    assert not erros
+
+
+def test_corpo_grande_demais_responde_413():
+    respostas = asyncio.run(_requisicoes([
+        f"POST /metricas HTTP/1.1\r\nHost: x\r\nContent-Length: {LIMITE_CORPO + 1}\r\n\r\n".encode(),
+    ]))
+    assert respostas == [b'HTTP/1.1 413 Content Too Large']
+
+
+def test_corpo_valido_e_descartado():
+    respostas = asyncio.run(_requisicoes([
+        b"POST /metricas HTTP/1.1\r\nHost: x\r\nContent-Length: 4\r\nConnection: close\r\n\r\nabcd",
+    ]))
+    assert respostas == [b'HTTP/1.1 405 Method Not Allowed']
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+TESTES DA INGESTÃO PELA GRAPH API (CONTRA O STUB LOCAL)
+Arquitetura de Performance - ruas.dev.br
+
+Uso:
+    python -m pytest test_ingestao_api.py
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from ingestao_api import IngestorGraphAPI, leads_das_acoes
+from stub_graph_api import StubGraphAPI, totais_esperados
+
+CONTAS = ['act_101', 'act_202']
+DESDE, ATE = date(2025, 3, 1), date(2025, 3, 20)
+
+
+@pytest.mark.parametrize('acoes, leads', [
+    ([{'action_type': 'lead', 'value': '7'},
+      {'action_type': 'onsite_conversion.lead_grouped', 'value': '4'},
+      {'action_type': 'offsite_conversion.fb_pixel_lead', 'value': '3'}], 7),
+    ([{'action_type': 'onsite_conversion.lead_grouped', 'value': '4'},
+      {'action_type': 'offsite_conversion.fb_pixel_lead', 'value': '3'}], 7),
+    ([{'action_type': 'link_click', 'value': '50'}], 0),
+    (None, 0),
+])
+def test_leads_das_acoes_nao_soma_o_total_com_as_parciais(acoes, leads):
+    assert leads_das_acoes(acoes) == leads
+
+
+@pytest.mark.parametrize('assincrono', [True, False])
+def test_ingestao_reproduz_os_totais_do_stub(assincrono):
+    async def ingerir():
+        stub = StubGraphAPI(token='teste')
+        await stub.iniciar()
+        try:
+            ingestor = IngestorGraphAPI('teste', base_url=stub.base_url, assincrono=assincrono)
+            return await ingestor.dataframe(CONTAS, DESDE, ATE)
+        finally:
+            await stub.fechar()
+
+    dados = asyncio.run(ingerir())
+    esperado = totais_esperados(CONTAS, DESDE, ATE)
+
+    assert len(dados) == esperado['linhas']
+    assert dados['Leads'].sum() == esperado['Leads']
+    assert dados['Cliques'].sum() == esperado['Cliques']
+    assert dados['Gasto'].sum() == pytest.approx(esperado['Gasto'])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+TESTES DO MOTOR DE REGRAS
+Arquitetura de Performance - ruas.dev.br
+
+Uso:
+    python -m pytest test_regras.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from analisador_profissional import AnalisadorMetaProfissional
+from regras import carregar_regras
+
+
+def _dados(gasto=300.0, leads=10.0, cliques=40.0, impressoes=1000.0):
+    """Duas campanhas, 30 dias até hoje: CAC 30 e CTR 4% (regras padrão sem resumo)"""
+    datas = pd.date_range(end=pd.Timestamp.today().normalize(), periods=30)
+    return pd.DataFrame({
+        'Data': np.tile(datas, 2),
+        'Campanha': np.repeat(['Campanha A', 'Campanha B'], len(datas)),
+        'Gasto': gasto,
+        'Leads': leads,
+        'Cliques': cliques,
+        'Impressoes': impressoes,
+        'Alcance': impressoes * 0.9,
+    })
+
+
+def test_regras_sem_resumo_ficam_nulas():
+    tabela = carregar_regras().avaliar(_dados())
+    conta = tabela[tabela['Nivel'] == 'conta'].set_index('Regra')
+
+    assert {'cac_razoavel', 'ctr_alto'} <= set(conta.index)
+    assert conta.loc[['cac_razoavel', 'ctr_alto'], 'Resumo'].isna().all()
+    assert not tabela['Resumo'].isin(['None', 'nan', '<NA>']).any()
+
+
+def test_metricas_chave_sem_linhas_none(tmp_path):
+    analisador = AnalisadorMetaProfissional()
+    analisador.dados = analisador._adicionar_colunas_calculadas(_dados())
+    arquivo = tmp_path / 'metricas_chave.txt'
+
+    assert analisador.salvar_metricas_chave(str(arquivo))
+    texto = arquivo.read_text(encoding='utf-8')
+    assert '- None' not in texto
+    assert '- nan' not in texto